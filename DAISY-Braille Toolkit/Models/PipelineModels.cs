@@ -34,11 +34,15 @@ public sealed class StepState
     public DateTime? StartedUtc { get; set; }
     public DateTime? FinishedUtc { get; set; }
     public string? Error { get; set; }
+
+    // Resume: hash af trinnets input og de filer det lavede (skrives også af Python-scriptet)
+    public string? InputsHash { get; set; }
+    public List<string> Outputs { get; set; } = new();
 }
 
 public sealed class JobManifest
 {
-    public string SchemaVersion { get; set; } = "1.1";
+    public string SchemaVersion { get; set; } = "1.2";
     public Guid JobId { get; set; } = Guid.NewGuid();
     public DateTime CreatedUtc { get; set; } = DateTime.UtcNow;
 
@@ -58,6 +62,9 @@ public sealed class JobManifest
     public TtsJobState? Tts { get; set; }
 
     public Dictionary<PipelineStep, StepState> Steps { get; set; } = new();
+
+    // Volume labels reserveret til jobbet (genbruges ved resume)
+    public List<string> VolumeLabels { get; set; } = new();
 }
 
 public sealed class TtsJobState
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark: bufret filsæt-skriver (daisy_fileset) mod den gamle build_simple_daisy.
+
+Laver en syntetisk bog (standard 10.000 afsnit) med små dummy-MP3'er og bygger
+DAISY-filsættet med begge implementeringer. Den gamle builder (fra v15-scriptet,
+der nu er en shim til daisy_pipeline) ligger her som legacy_build_simple_daisy.
+
+    python bench_fileset.py [--segments 10000] [--pars-per-smil 1] [--repeat 3]
+"""
+
+import argparse, html, shutil, tempfile, time
+from pathlib import Path
+
+import daisy_fileset
+
+
+def legacy_build_simple_daisy(book_name: str, audio_dir: Path, daisy_dir: Path, text_chunks: list[str], lang: str = ""):
+    # v15: én write pr. linje, én SMIL-fil og én kopi pr. afsnit
+    daisy_dir.mkdir(parents=True, exist_ok=True)
+    mp3_files = sorted(audio_dir.glob("chapter_*.mp3"))
+    if not mp3_files:
+        raise FileNotFoundError(f"Ingen chapter_*.mp3 fundet i {audio_dir}")
+    n = min(len(mp3_files), len(text_chunks))
+
+    ncc_path = daisy_dir / "ncc.html"
+    with ncc_path.open("w", encoding="utf-8") as ncc:
+        ncc.write("<!DOCTYPE html>\n")
+        ncc.write("<html" + (f' lang="{html.escape(lang)}"' if lang else "") + ">\n<head>\n")
+        ncc.write('  <meta charset="utf-8"/>\n')
+        ncc.write(f"  <title>{html.escape(book_name)}</title>\n")
+        if lang:
+            ncc.write(f'  <meta name="dc:language" content="{html.escape(lang)}"/>\n')
+        ncc.write("</head>\n<body>\n")
+        ncc.write(f"  <h1>{html.escape(book_name)}</h1>\n")
+        ncc.write("  <h2>Indhold</h2>\n")
+        for i in range(1, n+1):
+            ncc.write(f'  <div><a href="chapter_{i:03}.smil#par{i:03}">Afsnit {i}</a></div>\n')
+        ncc.write("  <hr/>\n")
+        ncc.write("  <h2>Tekst</h2>\n")
+        for i in range(1, n+1):
+            txt = (text_chunks[i-1] or "").strip()
+            ncc.write(f'  <p id="p{i:03}"><a href="chapter_{i:03}.smil#par{i:03}">{html.escape(txt)}</a></p>\n')
+        ncc.write("</body>\n</html>\n")
+
+    for i in range(1, n+1):
+        mp3_path = mp3_files[i-1]
+        shutil.copy2(mp3_path, daisy_dir / mp3_path.name)
+        smil_path = daisy_dir / f"chapter_{i:03}.smil"
+        with smil_path.open("w", encoding="utf-8") as smil:
+            smil.write('<?xml version="1.0" encoding="utf-8"?>\n')
+            smil.write("<smil>\n  <body>\n    <seq>\n")
+            smil.write(f'      <par id="par{i:03}">\n')
+            smil.write(f'        <text src="ncc.html#p{i:03}"/>\n')
+            smil.write(f'        <audio src="{html.escape(mp3_path.name)}" clip-begin="0s"/>\n')
+            smil.write("      </par>\n")
+            smil.write("    </seq>\n  </body>\n</smil>\n")
+
+
+def make_synthetic_book(root: Path, segments: int, mp3_bytes: int = 2048) -> list[str]:
+    audio_dir = root / "audio"
+    audio_dir.mkdir(parents=True, exist_ok=True)
+    payload = b"\xff\xfb" + b"\0" * (mp3_bytes - 2)
+    chunks = []
+    for i in range(1, segments + 1):
+        (audio_dir / f"chapter_{i:03}.mp3").write_bytes(payload)
+        chunks.append(f"Afsnit {i}. " + "Dette er en syntetisk tekst til benchmark. " * 8)
+    return chunks
+
+
+def _time(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--segments", type=int, default=10000)
+    ap.add_argument("--pars-per-smil", type=int, default=1)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    legacy = legacy_build_simple_daisy
+
+    root = Path(tempfile.mkdtemp(prefix="daisy_bench_"))
+    try:
+        chunks = make_synthetic_book(root, args.segments)
+        audio_dir = root / "audio"
+
+        def run_legacy():
+            out = root / "legacy"
+            shutil.rmtree(out, ignore_errors=True)
+            legacy("BENCH", audio_dir, out, chunks, lang="da")
+
+        def run_buffered():
+            out = root / "buffered"
+            shutil.rmtree(out, ignore_errors=True)
+            daisy_fileset.build_fileset("BENCH", audio_dir, out, chunks, lang="da",
+                                        pars_per_smil=args.pars_per_smil)
+
+        t_old = _time(run_legacy, args.repeat)
+        t_new = _time(run_buffered, args.repeat)
+        n_files = sum(1 for _ in (root / "buffered").iterdir())
+        print(f"Afsnit: {args.segments}, pars pr. SMIL: {args.pars_per_smil}, filer: {n_files}")
+        print(f"  build_simple_daisy (v15): {t_old:8.3f} s")
+        print(f"  daisy_fileset          : {t_new:8.3f} s  ({t_old / t_new:.1f}x)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
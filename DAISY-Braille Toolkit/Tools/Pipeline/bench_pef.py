@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark: TXT -> PEF med liblouis i processen (pef_native) mod Pipeline 2 html-to-pef.
+
+Laver en syntetisk tekst (standard 2.000 afsnit) og konverterer den med begge
+veje via make_pef_from_txt i daisy_pipeline. Pipeline 2 køres som CLI
+(--pipeline-cmd) eller web-service (--ws-url); uden nogen af dem måles kun den
+native vej.
+
+    python bench_pef.py [--paragraphs 2000] [--table da-dk-g16.ctb] [--pipeline-cmd dp2] [--ws-url URL]
+
+--layout-only erstatter liblouis med en triviel oversætter og måler kun
+ombrydning/side-layout/XML-streaming (når python-modulet `louis` mangler).
+"""
+
+import argparse, shutil, tempfile, time
+from pathlib import Path
+
+import dp2_client
+import pef_native
+from daisy_pipeline import engine
+
+
+def make_synthetic_text(path: Path, paragraphs: int):
+    words = "dette er en syntetisk tekst til benchmark af punktskrift med æbler og øer på ålandsk".split()
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(paragraphs):
+            n = 20 + (i * 7) % 60
+            f.write(f"Afsnit {i + 1}. " + " ".join(words[(i + k) % len(words)] for k in range(n)) + "\n\n")
+
+
+def _time(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--paragraphs", type=int, default=2000)
+    ap.add_argument("--table", default="da-dk-g16.ctb")
+    ap.add_argument("--pipeline-cmd", default="")
+    ap.add_argument("--ws-url", default="")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--layout-only", action="store_true")
+    args = ap.parse_args()
+
+    root = Path(tempfile.mkdtemp(prefix="pef_bench_"))
+    try:
+        txt = root / "book.txt"
+        make_synthetic_text(txt, args.paragraphs)
+        print(f"Afsnit: {args.paragraphs}, tabel: {args.table}, tekst: {txt.stat().st_size // 1024} KB")
+
+        if args.layout_only:
+            trivial = lambda s: s.replace(" ", pef_native.BLANK)
+            t = _time(lambda: pef_native.text_to_pef(txt, root / "layout.pef", args.table, translate=trivial),
+                      args.repeat)
+            print(f"  pef_native (kun layout)  : {t:8.3f} s")
+        elif pef_native.available():
+            t_native = _time(lambda: engine.make_pef_from_txt(txt, root / "native.pef", None, args.table, root,
+                                                              lang="da", engine="native"), args.repeat)
+            print(f"  pef_native (liblouis)    : {t_native:8.3f} s")
+        else:
+            print("  pef_native: python-modulet 'louis' er ikke installeret (brug --layout-only)")
+
+        pipeline = None
+        if args.ws_url:
+            pipeline = dp2_client.get_client(args.ws_url)
+        elif args.pipeline_cmd:
+            pipeline = args.pipeline_cmd
+        if pipeline is not None:
+            def run_pipeline():
+                shutil.rmtree(root / "pef_out", ignore_errors=True)
+                engine.make_pef_from_txt(txt, root / "pipeline.pef", pipeline, args.table, root,
+                                         lang="da", engine="pipeline")
+            print(f"  Pipeline 2 html-to-pef   : {_time(run_pipeline, args.repeat):8.3f} s")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
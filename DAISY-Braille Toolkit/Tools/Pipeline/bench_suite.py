@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Benchmark-suite: hele process_one_file headless på syntetiske bøger, offline.
+
+Korpusser (genereres deterministisk i en temp-mappe):
+    small    20 afsnit, som .txt og .docx
+    300p     ca. 300 sider (.docx, ~540.000 tegn)
+    stress   .docx på ca. 50 MB (300 sider tekst + indlejrede billeder)
+TTS går til elevenlabs_stub_server og Pipeline 2 til dp2_stub_server (begge på
+127.0.0.1), så kørslen er reproducerbar og kræver hverken net, nøgle eller Java.
+Hvert trin (Import, DtBook, Tts, Tts/api, Tts/cache, DaisyBuild, PefBuild,
+IsoAndCsv) måles med stage_profiler; bedste tid over --repeat kørsler gemmes.
+
+    python bench_suite.py [--corpus small,300p] [--mode both] [--repeat 3] [--out resultat.json]
+                          [--baseline bench_baseline.json] [--save-baseline]
+                          [--latency 0.02] [--concurrency 0] [--throttle-every 0] [--kbps 64]
+
+Med --baseline sammenlignes pr. korpus og trin: langsommere end baseline
++ --tolerance (og mindst --min-delta sekunder) er en regression -> exitkode 1.
+--script måler en anden scriptversion med samme headless process_one_file (v15.1+).
+"""
+
+import argparse, datetime, json, os, platform, random, shutil, sys, tempfile, zipfile
+from pathlib import Path
+
+import daisy_batch
+import dp2_stub_server
+import elevenlabs_stub_server
+import stage_profiler
+
+CORPORA = ("small", "300p", "stress")
+CHARS_PER_PAGE = 1800
+STRESS_MB = 50
+EXIT_OK, EXIT_REGRESSION, EXIT_ERROR = 0, 1, 2
+# det suiten kalder i scriptet (v15.1+; ældre versioner spørger interaktivt)
+HEADLESS_API = ("process_one_file", "reserve_volume_labels", "configure_elevenlabs", "load_metadata_template")
+_WORDS = ("bogen lyd punkt skrift afsnit kapitel side læser stemme tekst æble øen ålen "
+          "dansk nyhed fortælling sommer vinter hus skov vej by land hav himmel").split()
+
+
+# --- syntetiske bøger ---
+def synthetic_paragraphs(chars: int, *, seed: int = 1) -> list[str]:
+    rnd = random.Random(seed)
+    paras, total, n = [], 0, 0
+    while total < chars:
+        n += 1
+        words = [rnd.choice(_WORDS) for _ in range(rnd.randint(15, 180))]
+        p = f"Afsnit {n}. " + " ".join(words).capitalize() + "."
+        paras.append(p)
+        total += len(p) + 2
+    return paras
+
+
+def write_txt(path: Path, paras: list[str]):
+    path.write_text("\n\n".join(paras), encoding="utf-8")
+
+
+def write_docx(path: Path, paras: list[str], *, media_bytes: int = 0, seed: int = 1):
+    """Minimal, gyldig .docx (python-docx kan åbne den); media_bytes lægger ukomprimerbare billeder ved."""
+    from xml.sax.saxutils import escape
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(p)}</w:t></w:r></w:p>' for p in paras)
+    document = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{body}</w:body></w:document>')
+    images = []
+    rnd = random.Random(seed)
+    chunk = 4 << 20
+    while media_bytes > 0:
+        size = min(chunk, media_bytes)
+        images.append(b"\x89PNG\r\n\x1a\n" + rnd.randbytes(max(0, size - 8)))
+        media_bytes -= size
+    rels = "".join(f'<Relationship Id="rIdImg{i}" Target="media/image{i}.png" '
+                   'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"/>'
+                   for i in range(1, len(images) + 1))
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                   '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Default Extension="png" ContentType="image/png"/>'
+                   '<Override PartName="/word/document.xml" ContentType="application/'
+                   'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        z.writestr("_rels/.rels",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Target="word/document.xml" Type="http://schemas.openxmlformats.org/'
+                   'officeDocument/2006/relationships/officeDocument"/></Relationships>')
+        z.writestr("word/_rels/document.xml.rels",
+                   '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                   '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   f'{rels}</Relationships>')
+        z.writestr("word/document.xml", document)
+        for i, data in enumerate(images, start=1):
+            z.writestr(zipfile.ZipInfo(f"word/media/image{i}.png"), data, compress_type=zipfile.ZIP_STORED)
+
+
+def make_corpus(name: str, root: Path, *, stress_mb: int = STRESS_MB) -> list[Path]:
+    folder = root / name
+    folder.mkdir(parents=True, exist_ok=True)
+    if name == "small":
+        paras = synthetic_paragraphs(6000, seed=1)[:20]
+        write_txt(folder / "small_txt.txt", paras)
+        write_docx(folder / "small_docx.docx", paras)
+        return [folder / "small_txt.txt", folder / "small_docx.docx"]
+    paras = synthetic_paragraphs(300 * CHARS_PER_PAGE, seed=2)
+    if name == "300p":
+        write_docx(folder / "bog_300s.docx", paras)
+        return [folder / "bog_300s.docx"]
+    if name == "stress":
+        path = folder / f"stress_{stress_mb}mb.docx"
+        write_docx(path, paras, media_bytes=stress_mb * 1_000_000, seed=3)
+        return [path]
+    raise ValueError(f"ukendt korpus: {name}")
+
+
+# --- kørsel ---
+def bench_settings(tmp: Path, *, tts_url: str, dp2_url: str, tts_cache: Path | None) -> dict:
+    return {
+        "ELEVEN_API_BASE": tts_url,
+        "DAISY_PIPELINE_MODE": "server",
+        "DAISY_PIPELINE_WS_URL": dp2_url,
+        "PEF_ENGINE": "pipeline",
+        "USE_PEF_CACHE": False,
+        "USE_TTS_CACHE": tts_cache is not None,
+        "BRAILLE_TABLE_BY_LANG": {"da": "da-dk-g16.ctb"},
+        "ISO_CMD": "native",
+        "CACHE_DIR": str(tts_cache or tmp / "tts_cache"),
+        "JOB_ROOT": str(tmp / "jobs"),
+        "COUNTER_DB_PATH": str(tmp / "counter.sqlite"),
+        "REGISTRY_DB_PATH": str(tmp / "registry.sqlite"),
+    }
+
+
+def run_corpus(script, script_dir: Path, books: list[Path], *, mode: str, repeat: int, tmp: Path,
+               tts: "elevenlabs_stub_server.StubServer", dp2_url: str, tts_cache: bool) -> dict:
+    voice = elevenlabs_stub_server.VOICES[0]
+    runs = []
+    for k in range(repeat):
+        run_dir = tmp / f"run_{k}"
+        shutil.rmtree(run_dir, ignore_errors=True)
+        # TTS-cachen ligger uden for run_dir, så den er varm fra anden gentagelse
+        settings = bench_settings(run_dir, tts_url=tts.base_url, dp2_url=dp2_url,
+                                  tts_cache=tmp / "tts_cache" if tts_cache else None)
+        options = daisy_batch.engine_options(script, script_dir, settings, "bench-key")
+        labels = script.reserve_volume_labels(script_dir, settings, len(books))
+        before = tts.stats()
+        profiler = stage_profiler.Profiler(run_dir / "profile", sample_ms=0).start()
+        try:
+            entries = [daisy_batch.run_job({"input": book, "mode": mode, "lang": "da", "voice_id": voice["voice_id"],
+                                            "voice_name": voice["name"], "out_dir": run_dir / "out", "metadata": {}},
+                                           label, script=script, options=options)
+                       for book, label in zip(books, labels)]
+        finally:
+            profiler.stop(write=False)
+        failed = [e for e in entries if e["status"] != "ok"]
+        if failed:
+            raise RuntimeError("; ".join(f"{Path(e['input']).name}: {e['error']}" for e in failed))
+        stages: dict[str, dict] = {}
+        for (_, name), (count, wall, cpu, nbytes, _) in profiler.totals.items():
+            st = stages.setdefault(name, {"count": 0, "wall": 0.0, "cpu": 0.0, "bytes": 0})
+            st["count"] += count
+            st["wall"] += wall
+            st["cpu"] += cpu
+            st["bytes"] += nbytes
+        after = tts.stats()
+        runs.append({"total": profiler.wall, "cpu": profiler.cpu, "stages": stages,
+                     "tts": {key: after[key] - before[key] for key in ("requests", "throttled", "bytes", "connections")}})
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    # bedste kørsel pr. trin (min over gentagelser er mindst påvirket af støj)
+    best = {name: {"count": runs[0]["stages"][name]["count"],
+                   "wall": round(min(r["stages"][name]["wall"] for r in runs), 4),
+                   "cpu": round(min(r["stages"][name]["cpu"] for r in runs), 4),
+                   "bytes": runs[0]["stages"][name]["bytes"]}
+            for name in runs[0]["stages"]}
+    return {"books": [b.name for b in books], "input_bytes": sum(b.stat().st_size for b in books),
+            "total": round(min(r["total"] for r in runs), 4), "cpu": round(min(r["cpu"] for r in runs), 4),
+            "runs": [round(r["total"], 4) for r in runs], "stages": best, "tts": runs[-1]["tts"]}
+
+
+# --- sammenligning ---
+def compare(result: dict, baseline: dict, *, tolerance: float, min_delta: float) -> list[str]:
+    """Linjer med regressioner (tom liste = ingen)."""
+    if baseline.get("params") != result.get("params"):
+        print("ADVARSEL: baseline er målt med andre parametre - sammenligningen er vejledende.")
+    regressions = []
+    print(f"\n{'Korpus':8} {'Trin':12} {'Baseline s':>11} {'Nu s':>9} {'Ændring':>9}")
+    for corpus, cur in result["corpora"].items():
+        base = (baseline.get("corpora") or {}).get(corpus)
+        if not base:
+            continue
+        rows = [("I alt", base["total"], cur["total"])]
+        rows += [(name, base["stages"][name]["wall"], st["wall"]) for name, st in cur["stages"].items()
+                 if name in base.get("stages", {})]
+        for name, old, new in rows:
+            change = (new - old) / old if old else 0.0
+            flag = new > old * (1 + tolerance) and new - old >= min_delta
+            print(f"{corpus:8} {name:12} {old:11.3f} {new:9.3f} {change:+8.0%}" + ("  REGRESSION" if flag else ""))
+            if flag:
+                regressions.append(f"{corpus}/{name}: {old:.3f} s -> {new:.3f} s ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--corpus", default="small,300p", help=f"kommasepareret blandt {', '.join(CORPORA)}")
+    ap.add_argument("--mode", default="both", choices=daisy_batch.MODES)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--script", default=daisy_batch.SCRIPT,
+                    help="scriptfil der måles (de gamle versioner er shims til daisy_pipeline)")
+    ap.add_argument("--out", type=Path, default=None, help="skriv resultat-JSON her (standard: stdout)")
+    ap.add_argument("--baseline", type=Path, default=None)
+    ap.add_argument("--save-baseline", action="store_true", help="gem resultatet som --baseline")
+    ap.add_argument("--tolerance", type=float, default=0.15, help="tilladt forværring (0.15 = 15 %%)")
+    ap.add_argument("--min-delta", type=float, default=0.05, help="mindste forværring i sekunder der tæller")
+    ap.add_argument("--stress-mb", type=int, default=STRESS_MB)
+    ap.add_argument("--tts-cache", action="store_true", help="brug TTS-cachen (varm efter første gentagelse)")
+    ap.add_argument("--latency", type=float, default=0.02, help="stub-TTS: sekunder pr. kald")
+    ap.add_argument("--per-char", type=float, default=0.0, help="stub-TTS: sekunder pr. tegn")
+    ap.add_argument("--concurrency", type=int, default=0, help="stub-TTS: maks. samtidige kald (0 = ubegrænset)")
+    ap.add_argument("--throttle-every", type=int, default=0, help="stub-TTS: 429 på hvert N'te kald")
+    ap.add_argument("--kbps", type=int, default=64, help="stub-TTS: MP3-bitrate (bestemmer lydfilernes størrelse)")
+    ap.add_argument("--dp2-delay", type=float, default=0.0, help="stub-Pipeline 2: sekunder pr. job")
+    args = ap.parse_args(argv)
+
+    corpora = [c.strip() for c in args.corpus.split(",") if c.strip()]
+    unknown = [c for c in corpora if c not in CORPORA]
+    if unknown or args.repeat < 1 or (args.save_baseline and not args.baseline):
+        print(f"FEJL: ukendt korpus {unknown}" if unknown else "FEJL: --repeat >= 1 og --save-baseline kræver --baseline",
+              file=sys.stderr)
+        return EXIT_ERROR
+
+    script_dir = Path(__file__).resolve().parent
+    if args.out is None:
+        sys.stdout = sys.stderr             # stdout er forbeholdt JSON
+    try:
+        script = daisy_batch._load_script(script_dir, args.script)
+    except Exception as e:              # ældre scripts kan fejle allerede ved import
+        print(f"FEJL: {args.script} kan ikke indlæses: {type(e).__name__}: {e}")
+        return EXIT_ERROR
+    missing = [n for n in HEADLESS_API if not hasattr(script, n)]
+    if missing:
+        print(f"FEJL: {args.script} har ikke det headless interface ({', '.join(missing)} mangler).")
+        return EXIT_ERROR
+    params = {"mode": args.mode, "repeat": args.repeat, "latency": args.latency, "per_char": args.per_char,
+              "concurrency": args.concurrency, "throttle_every": args.throttle_every, "kbps": args.kbps,
+              "dp2_delay": args.dp2_delay, "tts_cache": args.tts_cache, "stress_mb": args.stress_mb}
+    result = {"script": args.script, "version": getattr(script, "__version__", ""),
+              "created": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+              "params": params, "corpora": {}}
+
+    tts = elevenlabs_stub_server.serve_in_thread(latency=args.latency, per_char=args.per_char,
+                                                 concurrency=args.concurrency, throttle_every=args.throttle_every,
+                                                 kbps=args.kbps, retry_after=0.05)
+    dp2 = dp2_stub_server.serve_in_thread(delay=args.dp2_delay)
+    old_base = os.environ.pop("ELEVEN_API_BASE", None)   # stubben skal vinde over en evt. miljøvariabel
+    tmp = Path(tempfile.mkdtemp(prefix="daisy_bench_suite_"))
+    try:
+        for name in corpora:
+            books = make_corpus(name, tmp / "corpus", stress_mb=args.stress_mb)
+            print(f"[{name}] {len(books)} bøger, {sum(b.stat().st_size for b in books) / 1e6:.1f} MB, "
+                  f"{args.repeat} gentagelser ...")
+            try:
+                res = run_corpus(script, script_dir, books, mode=args.mode, repeat=args.repeat,
+                                 tmp=tmp / "work" / name, tts=tts, dp2_url=dp2.base_url, tts_cache=args.tts_cache)
+            except RuntimeError as e:
+                print(f"FEJL: [{name}] {e}")
+                return EXIT_ERROR
+            result["corpora"][name] = res
+            print(f"[{name}] {res['total']:.3f} s (" + ", ".join(f"{k} {v['wall']:.3f}"
+                                                                for k, v in res["stages"].items()) + ")")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        tts.shutdown()
+        dp2.shutdown()
+        if old_base is not None:
+            os.environ["ELEVEN_API_BASE"] = old_base
+
+    text = json.dumps(result, ensure_ascii=False, indent=2) + "\n"
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(text, encoding="utf-8")
+    else:
+        sys.__stdout__.write(text)
+
+    code = EXIT_OK
+    if args.baseline and args.save_baseline:
+        args.baseline.write_text(text, encoding="utf-8")
+        print(f"Baseline gemt: {args.baseline}")
+    elif args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, tolerance=args.tolerance, min_delta=args.min_delta)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        code = EXIT_REGRESSION if regressions else EXIT_OK
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
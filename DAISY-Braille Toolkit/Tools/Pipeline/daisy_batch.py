@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Ikke-interaktiv batchkørsel af daisy_pipeline (v15.1) ud fra et manifest (byggeserver, natkørsel).
+
+Manifestet angiver pr. bog: input, mode, sprog, stemme, metadata og output-mappe.
+Hele manifestet valideres før noget startes; derefter køres bøgerne uden
+spørgsmål, op til --jobs (BOOK_PARALLEL) ad gangen.
+
+JSON:
+    {"defaults": {"mode": "both", "lang": "da", "voice": "Mads", "output": "out",
+                  "metadata": {"produced_by": "...", "sender": "..."}},
+     "books": [{"input": "bøger/bog1.docx", "metadata": {"title": "Bog 1", "produced_for": "...",
+                                                         "fields": {"Bemærkning": "..."}}}]}
+
+CSV (; eller ,): kolonnerne input, mode, lang, voice, output, title, produced_for,
+produced_by, sender; "meta:<Kolonne>" sætter en vilkårlig kolonne i metadata-CSV'en.
+Relative stier er relative til manifestets mappe.
+
+    python daisy_batch.py manifest.json [--summary resultat.json] [--jobs 2] [--check] [--resume]
+                                        [--events fremdrift.jsonl] [--profile]
+
+Exitkoder: 0 alle bøger ok, 1 mindst én bog fejlede, 2 ugyldigt manifest/opsætning.
+Resuméet (JSON) skrives til --summary eller stdout.
+"""
+
+import argparse, csv, datetime, importlib.util, json, os, sys, time, traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import metrics
+import progress_events
+import stage_profiler
+
+SCRIPT = "daisy_iso_allinone_ISO_v15_1_modes_metadata_voices_pef_txt.py"
+MODES = ("daisy", "braille", "both")
+BOOK_KEYS = ("input", "mode", "lang", "voice", "output")
+META_KEYS = ("title", "produced_for", "produced_by", "sender")
+EXIT_OK, EXIT_FAILED, EXIT_INVALID = 0, 1, 2
+
+
+class ManifestError(Exception):
+    def __init__(self, errors: list[str]):
+        super().__init__(f"{len(errors)} fejl i manifestet")
+        self.errors = errors
+
+
+def _load_script(script_dir: Path, name: str = SCRIPT):
+    # standard: motoren i daisy_pipeline; andre filer (bench_suite --script) indlæses fra script_dir
+    if name == SCRIPT:
+        from daisy_pipeline import engine
+        return engine
+    spec = importlib.util.spec_from_file_location(f"_{Path(name).stem}", script_dir / name)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def merge_book(defaults: dict, book: dict) -> dict:
+    """Bog-felter over defaults; metadata og metadata.fields flettes felt for felt."""
+    out = {**defaults, **book}
+    meta = dict(defaults.get("metadata") or {})
+    meta.update(book.get("metadata") or {})
+    meta["fields"] = {**((defaults.get("metadata") or {}).get("fields") or {}),
+                      **((book.get("metadata") or {}).get("fields") or {})}
+    out["metadata"] = meta
+    return out
+
+
+def _read_csv(path: Path) -> list[dict]:
+    text = path.read_text(encoding="utf-8-sig")
+    delimiter = ";" if text.split("\n", 1)[0].count(";") >= text.split("\n", 1)[0].count(",") else ","
+    books = []
+    for rec in csv.DictReader(text.splitlines(), delimiter=delimiter):
+        rec = {(k or "").strip(): (v or "").strip() for k, v in rec.items()}
+        book = {k: rec[k] for k in BOOK_KEYS if rec.get(k)}
+        meta = {k: rec[k] for k in META_KEYS if rec.get(k)}
+        fields = {k[5:].strip(): v for k, v in rec.items() if k.lower().startswith("meta:")}
+        book["metadata"] = {**meta, "fields": fields}
+        books.append(book)
+    return books
+
+
+def read_manifest(path: Path) -> list[dict]:
+    """Bøgerne i manifestet (JSON eller CSV) med defaults flettet ind; stier er ikke valideret endnu."""
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        books, defaults = _read_csv(path), {}
+    else:
+        data = json.loads(path.read_text(encoding="utf-8-sig"))
+        if isinstance(data, list):
+            data = {"books": data}
+        if not isinstance(data, dict) or not isinstance(data.get("books"), list):
+            raise ManifestError(["JSON-manifestet skal have en liste 'books'"])
+        books, defaults = data["books"], data.get("defaults") or {}
+    bad = [f"bog {i}: skal være et objekt" for i, b in enumerate(books, 1) if not isinstance(b, dict)]
+    if bad:
+        raise ManifestError(bad)
+    return [merge_book(defaults, b) for b in books]
+
+
+def find_voice(voices: list[dict], wanted: str, get_voice_id):
+    wanted = wanted.strip()
+    for v in voices:
+        if get_voice_id(v) == wanted:
+            return v
+    matches = [v for v in voices if (v.get("name") or "").strip().lower() == wanted.lower()]
+    return matches[0] if len(matches) == 1 else None
+
+
+def validate(books: list[dict], *, base_dir: Path, settings: dict, voices: list[dict], api_key: str,
+             script) -> list[dict]:
+    """Tjek hele manifestet og returnér færdige jobs; rejser ManifestError med alle fejl på én gang."""
+    errors: list[str] = []
+    jobs: list[dict] = []
+    outputs: dict[Path, str] = {}
+    tables = settings.get("BRAILLE_TABLE_BY_LANG") or {}
+    if not books:
+        errors.append("manifestet indeholder ingen bøger")
+
+    for i, book in enumerate(books, 1):
+        where = f"bog {i}"
+        err = lambda msg: errors.append(f"{where}: {msg}")
+        raw_input = str(book.get("input") or "").strip()
+        if not raw_input:
+            err("'input' mangler")
+            continue
+        input_file = Path(raw_input)
+        if not input_file.is_absolute():
+            input_file = base_dir / input_file
+        input_file = input_file.resolve()
+        where = f"bog {i} ({input_file.name})"
+        if not input_file.is_file():
+            err(f"input findes ikke: {input_file}")
+        elif input_file.suffix.lower() not in (".txt", ".docx"):
+            err("input skal være .txt eller .docx")
+
+        mode = str(book.get("mode") or "").strip().lower()
+        if mode not in MODES:
+            err(f"mode skal være {', '.join(MODES)} (fik '{mode}')")
+
+        lang = str(book.get("lang") or "auto").strip().lower()
+        voice, voice_id, voice_name = None, "", ""
+        if mode in ("daisy", "both"):
+            wanted = str(book.get("voice") or "").strip()
+            if not wanted:
+                err("'voice' mangler (navn eller voice_id)")
+            else:
+                voice = find_voice(voices, wanted, script.get_voice_id)
+                if voice is None:
+                    err(f"ukendt eller tvetydig stemme '{wanted}' (findes ikke entydigt i voices.json)")
+                else:
+                    voice_id, voice_name = script.get_voice_id(voice), voice.get("name", "")
+            if not api_key:
+                err("ELEVEN_API_KEY mangler (secrets.json eller miljøvariabel)")
+        if lang == "auto":
+            vl = script._voice_langs(voice) if voice else []
+            lang = vl[0] if vl else ""
+            if not lang:
+                err("sprog kan ikke afledes - angiv 'lang'")
+        if mode in ("braille", "both") and lang and not (tables.get(lang) or "").strip():
+            err(f"ingen BRAILLE_TABLE_BY_LANG for '{lang}'")
+
+        out_dir = str(book.get("output") or "").strip()
+        out_path = None
+        if out_dir:
+            out_path = Path(out_dir) if Path(out_dir).is_absolute() else base_dir / out_dir
+            out_path = out_path.resolve()
+            if out_path.exists() and not out_path.is_dir():
+                err(f"output er ikke en mappe: {out_path}")
+        # to bøger med samme output-navn ville overskrive hinanden
+        key = ((out_path or input_file.parent) / input_file.stem).as_posix().lower()
+        if key in outputs:
+            err(f"samme output som {outputs[key]}")
+        outputs[key] = where
+
+        meta = book.get("metadata") or {}
+        if not isinstance(meta, dict) or not isinstance(meta.get("fields") or {}, dict):
+            err("'metadata' (og 'metadata.fields') skal være objekter")
+            meta = {}
+        jobs.append({"input": input_file, "mode": mode, "lang": lang, "voice_id": voice_id,
+                     "voice_name": voice_name, "out_dir": out_path, "metadata": meta})
+    if errors:
+        raise ManifestError(errors)
+    return jobs
+
+
+def _jsonable(value):
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def engine_options(script, script_dir: Path, settings: dict, api_key: str, *, resume: bool = False) -> dict:
+    """Fælles argumenter til process_one_file (alt der ikke afhænger af bogen)."""
+    script.configure_elevenlabs(settings)
+    meta_path = script_dir / "metadata daisy.txt"
+    cache_dir = (script_dir / (settings.get("CACHE_DIR") or "tts_cache")).resolve()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return {
+        "api_key": api_key,
+        "model_id": (settings.get("MODEL_ID") or script.DEFAULT_MODEL_ID).strip(),
+        "iso_cmd": (settings.get("ISO_CMD") or "native").strip(),
+        "max_tts_chars": int(settings.get("MAX_TTS_CHARS") or script.DEFAULT_MAX_TTS_CHARS),
+        "use_tts_cache": bool(settings.get("USE_TTS_CACHE", True)),
+        "cache_dir": cache_dir,
+        "settings": settings,
+        "meta_template": script.load_metadata_template(Path(settings.get("METADATA_TEMPLATE") or meta_path)),
+        "script_dir": script_dir,
+        "resume": resume,
+    }
+
+
+def run_job(job: dict, label: str, *, script, options: dict) -> dict:
+    """Én bog; fejl fanges og returneres i resumé-posten (status "ok"/"fejl")."""
+    t0 = time.perf_counter()
+    entry = {"input": str(job["input"]), "mode": job["mode"], "lang": job["lang"],
+             "voice": job["voice_name"], "status": "fejl", "error": None}
+    try:
+        result = script.process_one_file(
+            job["input"], voice_id=job["voice_id"], voice_name=job["voice_name"], lang=job["lang"],
+            mode=job["mode"], volume_label=label, metadata=job["metadata"], out_dir=job["out_dir"], **options)
+        entry.update({k: _jsonable(v) for k, v in result.items()})
+        if job["mode"] in ("braille", "both") and result.get("pef_error"):
+            entry["error"] = f"PEF: {result['pef_error']}"
+        else:
+            entry["status"] = "ok"
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+    entry["seconds"] = round(time.perf_counter() - t0, 2)
+    return entry
+
+
+def run(jobs: list[dict], *, script, script_dir: Path, settings: dict, api_key: str, workers: int,
+        resume: bool = False) -> list[dict]:
+    options = engine_options(script, script_dir, settings, api_key, resume=resume)
+    # én blok labels for hele batchen, så parallelle bøger aldrig deler nummer;
+    # ved resume trækker process_one_file kun til bøger uden gemte labels
+    labels = [""] * len(jobs) if resume else script.reserve_volume_labels(script_dir, settings, len(jobs))
+
+    print(f"{len(jobs)} bøger, {workers} ad gangen ...")
+    entries: list[dict | None] = [None] * len(jobs)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = {ex.submit(run_job, job, label, script=script, options=options): k
+                   for k, (job, label) in enumerate(zip(jobs, labels))}
+        pending = len(futures)
+        progress_events.emit("queue", source="batch", depth=pending, capacity=workers)
+        for fut in as_completed(futures):
+            entry = entries[futures[fut]] = fut.result()
+            pending -= 1
+            progress_events.emit("queue", source="batch", depth=pending, capacity=workers)
+            print(f"[{Path(entry['input']).name}] {entry['status']}"
+                  + (f": {entry['error']}" if entry["error"] else ""))
+    return entries
+
+
+def _write_summary(summary: dict, target: Path | None):
+    text = json.dumps(summary, ensure_ascii=False, indent=2)
+    if target:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text + "\n", encoding="utf-8")
+    else:
+        sys.__stdout__.write(text + "\n")
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("manifest", type=Path)
+    ap.add_argument("--summary", type=Path, default=None, help="skriv JSON-resumé her (standard: stdout)")
+    ap.add_argument("--jobs", type=int, default=0, help="bøger ad gangen (standard: BOOK_PARALLEL eller 2)")
+    ap.add_argument("--settings", type=Path, default=None, help="settings.json (standard: ved scriptet)")
+    ap.add_argument("--check", action="store_true", help="valider kun manifestet")
+    ap.add_argument("--resume", action="store_true", help="fortsæt jobmapperne fra en afbrudt kørsel")
+    ap.add_argument("--events", default=None,
+                    help="fremdrifts-events som JSON lines til denne fil ('-' = stderr; standard: PROGRESS_EVENTS)")
+    stage_profiler.add_arguments(ap)
+    args = ap.parse_args(argv)
+
+    script_dir = Path(__file__).resolve().parent
+    manifest = args.manifest.resolve()
+    summary_path = args.summary.resolve() if args.summary else None
+    started = datetime.datetime.now().isoformat(timespec="seconds")
+    summary = {"manifest": str(manifest), "started": started, "books": []}
+    # uden --summary er stdout forbeholdt JSON; log går til stderr
+    if summary_path is None:
+        sys.stdout = sys.stderr
+
+    try:
+        script = _load_script(script_dir)
+        settings = script.load_optional_json(args.settings.resolve() if args.settings
+                                             else script_dir / "settings.json", default={})
+        secrets = script.load_optional_json(script_dir / "secrets.json", default={})
+        api_key = (os.environ.get("ELEVEN_API_KEY") or secrets.get("ELEVEN_API_KEY") or "").strip()
+        voices = script.normalize_voices(script.load_optional_json(script_dir / "voices.json", default=None))
+        books = read_manifest(manifest)
+        jobs = validate(books, base_dir=manifest.parent, settings=settings, voices=voices,
+                        api_key=api_key, script=script)
+    except (ManifestError, OSError, ValueError) as e:
+        errors = e.errors if isinstance(e, ManifestError) else [str(e)]
+        for msg in errors:
+            print(f"FEJL: {msg}")
+        summary.update(status="invalid", errors=errors, exit_code=EXIT_INVALID)
+        _write_summary(summary, summary_path)
+        return EXIT_INVALID
+
+    if args.check:
+        print(f"Manifest ok: {len(jobs)} bøger.")
+        summary.update(status="valid", exit_code=EXIT_OK,
+                       books=[{k: _jsonable(v) for k, v in job.items() if k != "metadata"} for job in jobs])
+        _write_summary(summary, summary_path)
+        return EXIT_OK
+
+    if args.events:
+        progress_events.configure(args.events if args.events == "-" else Path(args.events).resolve())
+    else:
+        progress_events.configure_from_settings(settings, script_dir)
+    metrics.configure(settings, script_dir)
+    # relative stier i settings (fx CACHE_DIR) er relative til script-mappen, som i det interaktive script
+    os.chdir(script_dir)
+    workers = max(1, min(len(jobs), args.jobs or int(settings.get("BOOK_PARALLEL") or 2)))
+    profiler = stage_profiler.start_from_args(args, script_dir, settings)
+    try:
+        entries = run(jobs, script=script, script_dir=script_dir, settings=settings, api_key=api_key,
+                      workers=workers, resume=args.resume)
+        if settings.get("SHAREPOINT_SYNC"):
+            script.sync_sharepoint(script_dir, settings)
+    finally:
+        stage_profiler.finish(profiler)
+
+    failed = sum(1 for e in entries if e["status"] != "ok")
+    code = EXIT_FAILED if failed else EXIT_OK
+    summary.update(finished=datetime.datetime.now().isoformat(timespec="seconds"),
+                   status="failed" if failed else "ok", ok=len(entries) - failed, failed=failed,
+                   exit_code=code, books=entries)
+    _write_summary(summary, summary_path)
+    print(f"Færdig: {len(entries) - failed} ok, {failed} fejl.")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
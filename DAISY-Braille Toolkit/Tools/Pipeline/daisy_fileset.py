@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Bufret skriver til simple DAISY-filsæt (ncc.html + SMIL + MP3).
+
+Filsættet renderes først i hukommelsen (NCC som tekstdele, SMIL-filer som
+færdige byte-buffere) og skrives derefter i én omgang. Små filer skrives med
+ét write()-kald pr. fil, og open/close fordeles på en lille trådpulje, så
+antivirus-hooks på Windows ikke serialiserer tusindvis af filer.
+"""
+
+import datetime, html, re, shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+NCC_BLOCK_SIZE = 1 << 20          # skrivebuffer til ncc.html (1 MB)
+DEFAULT_WRITE_WORKERS = 4
+
+_CHAPTER_NO = re.compile(r"(\d+)")
+
+
+def chapter_sort_key(path: Path):
+    """Sortér chapter_NNN.mp3 numerisk (chapter_1000 kommer efter chapter_999)."""
+    m = _CHAPTER_NO.search(path.stem)
+    return (int(m.group(1)) if m else 0, path.name)
+
+
+def list_chapter_mp3s(audio_dir: Path) -> list[Path]:
+    return sorted(audio_dir.glob("chapter_*.mp3"), key=chapter_sort_key)
+
+
+def smil_name(group_no: int) -> str:
+    return f"chapter_{group_no:03}.smil"
+
+
+def smil_group_of(index: int, pars_per_smil: int) -> int:
+    """1-baseret SMIL-gruppe for afsnit nr. index (1-baseret)."""
+    return (index - 1) // pars_per_smil + 1
+
+
+def render_ncc(book_name: str, text_chunks: list[str], n: int, lang: str = "",
+               pars_per_smil: int = 1, meta: dict | None = None, first_no: int = 1) -> list[str]:
+    """Returnér ncc.html som en liste af tekstdele (skrives gennem en 1 MB-buffer).
+
+    first_no: nummeret på første afsnit (>1 for disk 2, 3, ... af en bog på flere diske).
+    """
+    esc = html.escape
+    parts = ["<!DOCTYPE html>\n",
+             "<html" + (f' lang="{esc(lang)}"' if lang else "") + ">\n<head>\n",
+             '  <meta charset="utf-8"/>\n',
+             f"  <title>{esc(book_name)}</title>\n"]
+    if lang:
+        parts.append(f'  <meta name="dc:language" content="{esc(lang)}"/>\n')
+    for name, content in (meta or {}).items():
+        parts.append(f'  <meta name="{esc(name)}" content="{esc(str(content))}"/>\n')
+    parts.append("</head>\n<body>\n")
+    parts.append(f"  <h1>{esc(book_name)}</h1>\n")
+    parts.append("  <h2>Indhold</h2>\n")
+    nos = range(first_no, first_no + n)
+    hrefs = [f"{smil_name(smil_group_of(i, pars_per_smil))}#par{i:03}" for i in nos]
+    parts.extend(f'  <div><a href="{href}">Afsnit {i}</a></div>\n' for i, href in zip(nos, hrefs))
+    parts.append("  <hr/>\n")
+    parts.append("  <h2>Tekst</h2>\n")
+    parts.extend(
+        f'  <p id="p{i:03}"><a href="{hrefs[k]}">{esc((text_chunks[k] or "").strip())}</a></p>\n'
+        for k, i in enumerate(nos)
+    )
+    parts.append("</body>\n</html>\n")
+    return parts
+
+
+def render_master_smil(meta: dict, smil_names: list[str]) -> str:
+    """master.smil med centrale <meta> felter og én <ref> pr. SMIL-fil."""
+    esc = html.escape
+    out = ['<?xml version="1.0" encoding="utf-8"?>\n', "<smil>\n  <head>\n"]
+    for name, content in meta.items():
+        out.append(f'    <meta name="{esc(name)}" content="{esc(str(content))}"/>\n')
+    out.append("  </head>\n  <body>\n")
+    for no, name in enumerate(smil_names, start=1):
+        out.append(f'    <ref src="{esc(name)}" id="ms_{no:03}"/>\n')
+    out.append("  </body>\n</smil>\n")
+    return "".join(out)
+
+
+def format_hhmmss(total_seconds: float) -> str:
+    total_seconds = max(0, int(round(float(total_seconds))))
+    return f"{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}:{total_seconds % 60:02d}"
+
+
+def render_smil(pars: list[tuple[int, str]], durations: dict[str, float] | None = None) -> str:
+    """Én SMIL-fil med et <par> pr. (afsnit nr., mp3-navn).
+
+    Kendes lydfilens varighed (durations[mp3-navn]), får <audio> også clip-end.
+    """
+    out = ['<?xml version="1.0" encoding="utf-8"?>\n', "<smil>\n  <body>\n    <seq>\n"]
+    for i, mp3_name in pars:
+        clip_end = ""
+        if durations and mp3_name in durations:
+            clip_end = f' clip-end="{durations[mp3_name]:.3f}s"'
+        out.append(f'      <par id="par{i:03}">\n')
+        out.append(f'        <text src="ncc.html#p{i:03}"/>\n')
+        out.append(f'        <audio src="{html.escape(mp3_name)}" clip-begin="0s"{clip_end}/>\n')
+        out.append("      </par>\n")
+    out.append("    </seq>\n  </body>\n</smil>\n")
+    return "".join(out)
+
+
+class DaisyFileset:
+    """Et renderet filsæt: genererede tekstfiler i hukommelsen + lyd som referencer."""
+
+    def __init__(self):
+        self.text_files: dict[str, bytes] = {}    # navn -> indhold (utf-8)
+        self.ncc_parts: list[str] = []
+        self.audio_files: list[tuple[str, Path]] = []  # (navn i filsættet, kildefil)
+        self.report = None                        # daisy_validate-rapport, når filsættet er valideret
+
+    def ncc_bytes(self) -> bytes:
+        return "".join(self.ncc_parts).encode("utf-8")
+
+    def manifest(self) -> list[tuple[str, bytes | Path]]:
+        """Virtuelt filsæt: (navn, indhold) for tekstfiler og (navn, kildefil) for lyd."""
+        out: list[tuple[str, bytes | Path]] = [("ncc.html", self.ncc_bytes())]
+        out += list(self.text_files.items())
+        out += self.audio_files
+        return out
+
+    def write(self, daisy_dir: Path, *, workers: int = DEFAULT_WRITE_WORKERS, copy_audio: bool = True):
+        """Skriv filsættet til daisy_dir (NCC bufret, SMIL/MP3 batch-vis)."""
+        daisy_dir.mkdir(parents=True, exist_ok=True)
+
+        with (daisy_dir / "ncc.html").open("wb", buffering=NCC_BLOCK_SIZE) as ncc:
+            for part in self.ncc_parts:
+                ncc.write(part.encode("utf-8"))
+
+        def _write_small(item):
+            name, data = item
+            with open(daisy_dir / name, "wb", buffering=0) as f:
+                f.write(data)
+
+        def _copy_audio(item):
+            name, src = item
+            shutil.copy2(src, daisy_dir / name)
+
+        jobs = [(_write_small, it) for it in self.text_files.items()]
+        if copy_audio:
+            jobs += [(_copy_audio, it) for it in self.audio_files]
+        if workers <= 1:
+            for fn, it in jobs:
+                fn(it)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            # list() så evt. fejl kastes her
+            list(ex.map(lambda job: job[0](job[1]), jobs))
+
+
+def render_fileset(book_name: str, mp3_files: list[Path], text_chunks: list[str],
+                   lang: str = "", *, pars_per_smil: int = 1, identifier: str = "",
+                   generator: str = "", durations: dict[str, float] | None = None,
+                   names: list[str] | None = None, first_no: int = 1, set_info: str = "") -> DaisyFileset:
+    """Render ncc.html, SMIL og master.smil for mp3_files/text_chunks uden at røre disken.
+
+    durations: varighed i sekunder pr. mp3-navn (valgfri) -> clip-end og ncc:totalTime.
+    names: lydfilernes navne i filsættet, hvis kildefilerne hedder noget andet (fx TTS-cachen).
+    first_no/set_info: ved en bog på flere diske er mp3_files/text_chunks diskens udsnit,
+    first_no det globale nummer på første afsnit (starter en SMIL-gruppe) og set_info
+    fx "2 of 3" (ncc:setInfo).
+    """
+    if not mp3_files:
+        raise FileNotFoundError("Ingen chapter_*.mp3 at bygge DAISY af")
+    pars_per_smil = max(1, int(pars_per_smil or 1))
+    if (first_no - 1) % pars_per_smil:
+        raise ValueError(f"first_no={first_no} starter ikke en SMIL-gruppe (pars_per_smil={pars_per_smil})")
+    n = min(len(mp3_files), len(text_chunks))
+    names = names or [p.name for p in mp3_files]
+    last_no = first_no + n - 1
+
+    fs = DaisyFileset()
+    for start in range(first_no, last_no + 1, pars_per_smil):
+        stop = min(last_no, start + pars_per_smil - 1)
+        pars = [(i, names[i-first_no]) for i in range(start, stop + 1)]
+        fs.text_files[smil_name(smil_group_of(start, pars_per_smil))] = render_smil(pars, durations).encode("utf-8")
+    fs.audio_files = [(names[k], mp3_files[k]) for k in range(n)]
+    smil_names = list(fs.text_files)
+
+    # ncc + master.smil + smil + mp3
+    meta = {
+        "dc:title": book_name,
+        "dc:identifier": identifier or book_name,
+        "dc:format": "Daisy 2.02",
+        "dc:date": datetime.date.today().isoformat(),
+        "ncc:charset": "utf-8",
+        "ncc:multimediaType": "audioFullText",
+        "ncc:tocItems": n,
+        "ncc:files": 2 + len(smil_names) + len(fs.audio_files),
+    }
+    if set_info:
+        meta["ncc:setInfo"] = set_info
+    if generator:
+        meta["ncc:generator"] = generator
+    if durations:
+        meta["ncc:totalTime"] = format_hhmmss(sum(durations.get(name, 0.0) for name, _ in fs.audio_files))
+
+    fs.ncc_parts = render_ncc(book_name, text_chunks, n, lang=lang, pars_per_smil=pars_per_smil, meta=meta,
+                              first_no=first_no)
+    master_meta = {k: v for k, v in meta.items() if k.startswith("dc:") or k == "ncc:totalTime"}
+    if lang:
+        master_meta["dc:language"] = lang
+    fs.text_files["master.smil"] = render_master_smil(master_meta, smil_names).encode("utf-8")
+    return fs
+
+
+def build_fileset(book_name: str, audio_dir: Path, daisy_dir: Path, text_chunks: list[str],
+                  lang: str = "", *, pars_per_smil: int = 1, identifier: str = "", generator: str = "",
+                  durations: dict[str, float] | None = None,
+                  workers: int = DEFAULT_WRITE_WORKERS) -> DaisyFileset:
+    """Byg et simpelt DAISY-filsæt i daisy_dir (ncc.html + SMIL + master.smil + MP3)."""
+    mp3_files = list_chapter_mp3s(audio_dir)
+    if not mp3_files:
+        raise FileNotFoundError(f"Ingen chapter_*.mp3 fundet i {audio_dir}")
+    fs = render_fileset(book_name, mp3_files, text_chunks, lang, pars_per_smil=pars_per_smil,
+                        identifier=identifier, generator=generator, durations=durations)
+    fs.write(daisy_dir, workers=workers)
+    return fs
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""DAISY/ISO + PEF fra .docx/.txt som importerbart bibliotek (v15.1 og frem).
+
+Trinene (stage-API'et) - samme funktioner som process_one_file, daisy_batch og
+daisy_worker bruger, så ny samtidighed, caching o.l. kun skal skrives og måles ét sted:
+
+    extract(input_file, text_file) -> str                 .docx/.txt -> ren tekst
+    segment(text, max_chars) -> list[str]                 afsnit til TTS
+    synthesise(segments, out_dir, api_key=, voice_id=)    ElevenLabs + TTS-cache -> seg_0001.mp3 ...
+    build_daisy(label, mp3_files, texts, lang)            DAISY 2.02-filsæt (valideret, i hukommelsen)
+    master_iso(fileset, iso_path, label)                  ISO (+ checksummer)
+    make_pef(input_file, pef_path, text_file=, ...)       punkt (Pipeline 2/liblouis, PEF-cache, pef_post)
+    register(script_dir, settings, headers, row, ...)     produktionsregistret
+
+process_one_file kører en hel bog med jobmappe og resume; main/cli er den interaktive
+kørsel. De gamle scriptnavne (daisy_iso_allinone_ISO_v5 ... v15_1, også i Tools/python)
+er tynde shims hertil:
+
+    python -m daisy_pipeline [--resume] [--profile]
+"""
+
+from .engine import (__version__, build_daisy, cli, extract, main, make_pef, master_iso, process_one_file,
+                     register, segment, synthesise, synthesise_segment)
+
+__all__ = ["__version__", "build_daisy", "cli", "extract", "main", "make_pef", "master_iso", "process_one_file",
+           "register", "segment", "synthesise", "synthesise_segment"]
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+"""python -m daisy_pipeline: den interaktive kørsel (som v15.1-scriptet)."""
+
+from .engine import cli
+
+cli()
@@ -0,0 +1,1517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Motoren bag daisy_pipeline: v15.1-scriptets trin, process_one_file og den interaktive main.
+
+Søstermodulerne (daisy_fileset, iso_writer, job_store ...) ligger i Tools/Pipeline og
+importeres absolut; mappen er på sys.path, når et script eller en shim derfra kører.
+"""
+
+import argparse, os, sys, subprocess, tempfile, shutil, json, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import datetime
+from pathlib import Path
+
+import daisy_fileset
+import daisy_validate
+import disc_planner
+import iso_manifest
+import iso_writer
+import job_store
+import metrics
+import pef_cache
+import pef_native
+import pef_post
+import progress_events
+import stage_profiler
+import production_counter
+import production_registry
+
+# Tunge moduler indlæses først i det trin, der bruger dem (kold start, når GUI'en starter
+# scriptet til små jobs): requests (TTS/stemmer), dp2_client (Pipeline 2 som web-service),
+# sharepoint_sync, docx og mutagen.
+
+__version__ = "v15.1-out-permission-fix"
+
+# én HTTP-session pr. proces: forbindelsen til ElevenLabs genbruges (keep-alive) mellem afsnit og bøger
+_http = None
+_http_lock = threading.Lock()
+
+# ===== Defaults =====
+DEFAULT_ROOT = r"C:\DAISY-BOOKS\originaldokumenter"
+DEFAULT_MODEL_ID = "eleven_multilingual_v2"
+DEFAULT_MAX_TTS_CHARS = 4800
+DEFAULT_ELEVEN_API_BASE = "https://api.elevenlabs.io"
+# ELEVEN_API_BASE (miljø eller settings.json) kan pege på elevenlabs_stub_server (test/benchmark offline)
+ELEVEN_API_BASE = (os.environ.get("ELEVEN_API_BASE") or DEFAULT_ELEVEN_API_BASE).rstrip("/")
+ELEVEN_RETRIES = 4
+
+def http_session():
+    """requests.Session til ElevenLabs (requests indlæses ved første kald)."""
+    global _http
+    with _http_lock:
+        if _http is None:
+            try:
+                import requests
+            except ImportError:
+                print("FEJL: 'requests' mangler. Installer med: pip install requests")
+                raise
+            _http = requests.Session()
+        return _http
+
+# ===== JSON helpers =====
+def load_json(path: Path) -> dict:
+    with path.open("r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+def load_optional_json(path: Path, default):
+    try:
+        if path.exists():
+            return load_json(path)
+    except Exception:
+        return default
+    return default
+
+def save_json(path: Path, obj):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+def load_or_create_secrets(secrets_path: Path) -> dict:
+    if secrets_path.exists():
+        return load_json(secrets_path)
+
+    print(f"FEJL: Mangler fil: {secrets_path}")
+    print("Jeg kan oprette den for dig nu.")
+    api_key = ""
+    try:
+        import getpass
+        api_key = (getpass.getpass("Indsæt ELEVEN_API_KEY (skjult input): ") or "").strip()
+    except Exception:
+        api_key = (input("Indsæt ELEVEN_API_KEY: ") or "").strip()
+
+    if not api_key:
+        raise RuntimeError("Ingen ELEVEN_API_KEY angivet.")
+
+    save_json(secrets_path, {"ELEVEN_API_KEY": api_key})
+    print("OK: secrets.json oprettet.")
+    return {"ELEVEN_API_KEY": api_key}
+
+# ===== UI helpers =====
+def choose_from_list(title: str, items, render=lambda x: str(x)):
+    print("\n" + title)
+    for i, it in enumerate(items):
+        print(f"[{i}] {render(it)}")
+    while True:
+        raw = (input(f"Vælg nummer (0-{len(items)-1}): ") or "").strip()
+        if raw.isdigit():
+            idx = int(raw)
+            if 0 <= idx < len(items):
+                return items[idx]
+        print("Ugyldigt valg. Prøv igen.")
+
+def list_subfolders(root: Path):
+    return sorted([p for p in root.iterdir() if p.is_dir()], key=lambda p: p.name.lower())
+
+def list_files(folder: Path):
+    return sorted([p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in (".txt", ".docx")],
+                  key=lambda p: p.name.lower())
+
+# ===== Language / mode =====
+LANG_NAMES = {
+    "auto": "Auto (afled af stemme)",
+    "da": "Dansk",
+    "en": "English",
+    "de": "Deutsch",
+    "sv": "Svenska",
+    "no": "Norsk",
+}
+
+def _voice_langs(v) -> list[str]:
+    raw = (v.get("languages") or "").strip()
+    if not raw:
+        return []
+    return [x.strip().lower() for x in raw.split(",") if x.strip()]
+
+def choose_language_from_voices(voices):
+    langs = sorted({l for v in voices for l in _voice_langs(v)})
+    items = ["auto"] + langs
+    return choose_from_list(
+        "Vælg sprog (bogen er 1-sprogs):",
+        items,
+        lambda c: f"{c} ({LANG_NAMES.get(c, c)})"
+    )
+
+def choose_output_mode():
+    modes = [
+        ("daisy", "Kun DAISY/ISO (+ metadata CSV)"),
+        ("braille", "Kun Punkt (PEF) (+ metadata CSV)"),
+        ("both", "Begge dele: DAISY/ISO + PEF (+ metadata CSV)")
+    ]
+    picked = choose_from_list("Hvad vil du lave?", modes, lambda x: x[1])
+    return picked[0]
+
+# ===== voices.json update via PowerShell (optional) =====
+def maybe_update_voices_via_powershell(script_dir: Path, secrets_path: Path, voices_path: Path):
+    ps = script_dir / "Export-ElevenLabsVoices_v12_1.ps1"
+    if not ps.exists():
+        return
+
+    if voices_path.exists():
+        ans = (input("Opdatér voices.json nu? (j/N): ").strip().lower() or "n")
+        if ans != "j":
+            return
+    else:
+        ans = (input("voices.json mangler. Vil du generere den nu? (j/N): ").strip().lower() or "n")
+        if ans != "j":
+            return
+
+    try:
+        subprocess.run([
+            "powershell", "-NoProfile", "-ExecutionPolicy", "Bypass",
+            "-File", str(ps),
+            "-SecretsPath", str(secrets_path),
+            "-RebuildVoicesJson"
+        ], check=True)
+        print("voices.json opdateret.")
+    except Exception as e:
+        print("ADVARSEL: Kunne ikke opdatere voices.json via PowerShell.")
+        print(f"Fejl: {e}")
+
+def normalize_voices(raw):
+    # raw kan være list eller dict med "voices"
+    if raw is None:
+        return []
+    if isinstance(raw, list):
+        return raw
+    if isinstance(raw, dict):
+        if "voices" in raw and isinstance(raw["voices"], list):
+            return raw["voices"]
+        # hvis PS-scriptet skriver liste direkte
+    return []
+
+def get_voice_id(v):
+    return (v.get("voice_id") or v.get("voiceId") or v.get("id") or "").strip()
+
+def fetch_voices_from_api(api_key: str):
+    # fallback hvis voices.json mangler
+    url = f"{ELEVEN_API_BASE}/v1/voices"
+    r = http_session().get(url, headers={"xi-api-key": api_key}, timeout=60)
+    r.raise_for_status()
+    data = r.json()
+    vs = data.get("voices") or []
+    out = []
+    for v in vs:
+        out.append({
+            "name": v.get("name",""),
+            "voice_id": v.get("voice_id",""),
+            "languages": ",".join([x.get("language","") for x in (v.get("labels") or [])]) if isinstance(v.get("labels"), list) else ""
+        })
+    return out
+
+# ===== Metadata template + CSV =====
+def load_metadata_template(meta_path: Path) -> dict:
+    if not meta_path.exists():
+        return {"fields": [], "options": {}, "produced_for": []}
+
+    raw = meta_path.read_text(encoding="utf-8-sig", errors="ignore")
+    lines = [l.strip() for l in raw.splitlines()]
+
+    # fields
+    fields = []
+    try:
+        start = lines.index("Data der skal i CSV filen") + 1
+    except ValueError:
+        start = 0
+
+    i = start
+    while i < len(lines):
+        if lines[i].startswith("..."):
+            i += 1
+            break
+        if lines[i]:
+            fields.append(lines[i])
+        i += 1
+
+    # produced_for options (linjer efter "..." indtil næste "* liste")
+    produced_for = []
+    j = i
+    while j < len(lines):
+        if lines[j].lower().endswith("liste"):
+            break
+        if lines[j]:
+            produced_for.append(lines[j])
+        j += 1
+
+    # parse "* liste" sections
+    options = {}
+    k = j
+    while k < len(lines):
+        if not lines[k]:
+            k += 1
+            continue
+        if lines[k].lower().endswith("liste"):
+            section = lines[k]
+            k += 1
+            vals = []
+            while k < len(lines) and lines[k] and not lines[k].lower().endswith("liste"):
+                vals.append(lines[k])
+                k += 1
+            if vals:
+                options[section] = vals
+        else:
+            k += 1
+
+    return {"fields": fields, "options": options, "produced_for": produced_for}
+
+def write_metadata_csv(headers: list[str], row: list[str], csv_path: Path):
+    import csv
+    csv_path.parent.mkdir(parents=True, exist_ok=True)
+    with csv_path.open("w", encoding="utf-8-sig", newline="") as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(headers)
+        w.writerow(row)
+
+def set_csv_field(headers: list[str], row: list[str], name: str, value: str):
+    """Sæt kolonnen name i rækken (tilføjes sidst, hvis skabelonen ikke har den)."""
+    if name in headers:
+        row[headers.index(name)] = value
+    else:
+        headers.append(name)
+        row.append(value)
+
+def register(script_dir: Path, settings: dict, headers: list[str], row: list[str], csv_path: Path,
+             status: str) -> None:
+    """Skriv metadata-rækken i produktionsregistret (production_registry), så labels kan slås op."""
+    if not settings.get("USE_REGISTRY", True):
+        return
+    try:
+        with production_registry.open_registry(script_dir, settings) as reg:
+            reg.record(headers, row, status=status, csv_path=csv_path)
+    except Exception as e:
+        print(f"ADVARSEL: produktionen blev ikke registreret: {e}")
+
+
+def sync_sharepoint(script_dir: Path, settings: dict):
+    """Register + tællere til/fra SharePoint-listerne (sharepoint_sync), én gang pr. kørsel."""
+    try:
+        import sharepoint_sync
+        sp = sharepoint_sync.from_settings(script_dir, settings)
+        try:
+            result = sp.sync()
+        finally:
+            sp.registry.close()
+    except Exception as e:
+        print(f"ADVARSEL: SharePoint-synkronisering fejlede: {e}")
+        return
+    push = result["push"]
+    print(f"SharePoint: {push['productions']['sendt']} produktioner og {push['counters']['sendt']} tællere sendt, "
+          f"{result['pull']['productions']['nye']} nye hentet ({result['requests']} requests).")
+
+
+def _join_address(lines_list: list[str]) -> str:
+    return ", ".join([x.strip() for x in lines_list if x.strip()])
+
+def prompt_metadata(template: dict, *, title_default: str, voice_name: str, lang: str,
+                    original_names: list[str], iso_name: str, volume_label: str, length_str: str):
+    options = template.get("options") or {}
+    produced_for_opts = template.get("produced_for") or []
+
+    def pick_or_input(label: str, opts: list[str], default: str = "") -> str:
+        if opts:
+            items = opts + ["(indtast selv)"]
+            pick = choose_from_list(label, items, lambda x: x)
+            if pick == "(indtast selv)":
+                return (input(f"{label} (indtast): ").strip() or default)
+            return pick
+        return (input(f"{label} (indtast): ").strip() or default)
+
+    produced_for = pick_or_input("Pruduceret for", produced_for_opts, default="")
+    title = input(f"Titel (Enter = {title_default}): ").strip() or title_default
+
+    prod_by_opts = options.get("Pruduceret af liste", [])
+    produced_by = pick_or_input("Pruduceret af", prod_by_opts, default=(prod_by_opts[0] if prod_by_opts else ""))
+
+    sender_lines = options.get("Afsender liste", [])
+    sender_default = _join_address(sender_lines) if sender_lines else ""
+    sender = input(f"Afsender (Enter = {sender_default}): ").strip() or sender_default
+
+    return metadata_row(template, title=title, produced_for=produced_for, produced_by=produced_by, sender=sender,
+                        voice_name=voice_name, lang=lang, original_names=original_names, iso_name=iso_name,
+                        volume_label=volume_label, length_str=length_str)
+
+def metadata_row(template: dict, *, title: str, voice_name: str, lang: str, original_names: list[str],
+                 iso_name: str, volume_label: str, length_str: str, produced_for: str = "",
+                 produced_by: str | None = None, sender: str | None = None, overrides: dict | None = None):
+    """headers + række efter skabelonen, uden spørgsmål (prompt_metadata og batch-manifestet).
+
+    produced_by/sender: None = første værdi i skabelonens lister.
+    overrides: {kolonnenavn: værdi} - ukendte kolonner tilføjes sidst.
+    """
+    options = template.get("options") or {}
+    if produced_by is None:
+        prod_by_opts = options.get("Pruduceret af liste", [])
+        produced_by = prod_by_opts[0] if prod_by_opts else ""
+    if sender is None:
+        sender_lines = options.get("Afsender liste", [])
+        sender = _join_address(sender_lines) if sender_lines else ""
+    fields = template.get("fields") or []
+
+    now = datetime.datetime.now()
+    date_str = now.strftime("%d%m%y")
+    time_str = now.strftime("%H:%M:%S")
+
+    # map values by (partial) field names from template
+    values = {}
+    for f in fields:
+        fl = f.lower()
+        if fl.startswith("lengte"):
+            values[f] = length_str
+        elif fl.startswith("stemme"):
+            values[f] = voice_name
+        elif fl.startswith("sprog"):
+            values[f] = lang
+        elif "pruduceret for" in fl:
+            values[f] = produced_for
+        elif fl.startswith("titel"):
+            values[f] = title
+        elif "dato" in fl and "intale" in fl:
+            values[f] = date_str
+        elif "tid" in fl and "intale" in fl:
+            values[f] = time_str
+        elif "pruduceret af" in fl:
+            values[f] = produced_by
+        elif "daisy vertion" in fl:
+            values[f] = "DAISY (simpel ncc.html + smil)"
+        elif "orginal" in fl and "dokomenter" in fl:
+            values[f] = ";".join(original_names)
+        elif fl.startswith("afsender"):
+            values[f] = sender
+        elif fl.startswith("volume label"):
+            values[f] = volume_label
+        elif fl.startswith("write data"):
+            values[f] = iso_name
+        else:
+            values[f] = ""
+
+    if not fields:
+        # fallback hvis template mangler
+        fields = ["Lengte","Stemme","Sprog","Titel","Dato","Tid","Orginal","Volume label","Write data"]
+        values = {k:"" for k in fields}
+
+    headers, row = list(fields), [values.get(h,"") for h in fields]
+    for name, value in (overrides or {}).items():
+        set_csv_field(headers, row, name, str(value))
+    return headers, row
+
+# ===== Text conversion =====
+def docx_to_text(input_file: Path, text_file: Path):
+    suf = input_file.suffix.lower()
+    if suf == ".txt":
+        text_file.write_text(input_file.read_text(encoding="utf-8", errors="ignore"), encoding="utf-8")
+        return
+    if suf == ".docx":
+        try:
+            import docx  # python-docx
+            d = docx.Document(str(input_file))
+            paras = []
+            for p in d.paragraphs:
+                txt = (p.text or "").strip()
+                if txt:
+                    paras.append(txt)
+            text_file.write_text("\n\n".join(paras), encoding="utf-8")
+            return
+        except Exception:
+            # fallback pandoc
+            pandoc = shutil.which("pandoc")
+            if not pandoc:
+                raise
+            subprocess.run([pandoc, "-t", "plain", str(input_file), "-o", str(text_file)], check=True)
+
+def split_text_into_chunks(text: str, max_chars: int):
+    paras = [p.strip() for p in text.split("\n\n") if p.strip()]
+    out = []
+    for p in paras:
+        if len(p) <= max_chars:
+            out.append(p)
+            continue
+        # split long paragraph
+        start = 0
+        while start < len(p):
+            out.append(p[start:start+max_chars])
+            start += max_chars
+    if not out:
+        out = [text.strip()] if text.strip() else []
+    return out
+
+# ===== ElevenLabs TTS + cache =====
+def sha256_hex(s: str) -> str:
+    import hashlib
+    return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+def tts_cache_path(cache_dir: Path, voice_id: str, model_id: str, text: str) -> Path:
+    h = sha256_hex(f"{voice_id}|{model_id}|{text}")
+    return cache_dir / voice_id / model_id / f"{h}.mp3"
+
+def legacy_tts_cache_path(cache_dir: Path, voice_id: str, model_id: str, text: str) -> Path:
+    """Nøglen fra v10-v14 (_tts_cache_paths): sha256 af kompakt JSON, mappe voice_id/(model_id or "default")."""
+    payload = json.dumps({"voice_id": voice_id, "model_id": model_id, "text": (text or "").strip()},
+                         ensure_ascii=False, separators=(",", ":"))
+    return cache_dir / voice_id / (model_id or "default") / f"{sha256_hex(payload)}.mp3"
+
+def configure_elevenlabs(settings: dict):
+    global ELEVEN_API_BASE
+    ELEVEN_API_BASE = (os.environ.get("ELEVEN_API_BASE") or settings.get("ELEVEN_API_BASE")
+                       or DEFAULT_ELEVEN_API_BASE).rstrip("/")
+
+def _retry_after(value, attempt: int) -> float:
+    try:
+        return min(60.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return min(30.0, 0.5 * 2 ** attempt)
+
+def elevenlabs_tts_mp3(api_key: str, voice_id: str, model_id: str, text: str) -> bytes:
+    url = f"{ELEVEN_API_BASE}/v1/text-to-speech/{voice_id}"
+    headers = {
+        "xi-api-key": api_key,
+        "Content-Type": "application/json",
+        "accept": "audio/mpeg",
+    }
+    payload = {
+        "text": text,
+        "model_id": model_id,
+    }
+    http = http_session()
+    import requests
+    # throttling (429) og midlertidigt nede (503): vent Retry-After og prøv igen
+    for attempt in range(ELEVEN_RETRIES + 1):
+        t0 = time.perf_counter()
+        try:
+            r = http.post(url, headers=headers, json=payload, timeout=120)
+        except requests.RequestException:
+            metrics.tts_requests.inc(status="error")
+            raise
+        metrics.tts_latency.observe(time.perf_counter() - t0)
+        if r.status_code == 429:
+            metrics.tts_throttled.inc()
+        metrics.tts_requests.inc(status="ok" if r.ok else "throttled" if r.status_code == 429 else "error")
+        if r.status_code not in (429, 503) or attempt == ELEVEN_RETRIES:
+            break
+        time.sleep(_retry_after(r.headers.get("Retry-After"), attempt))
+    r.raise_for_status()
+    metrics.tts_characters.inc(len(text))
+    metrics.tts_bytes.inc(len(r.content), source="api")
+    return r.content
+
+# ===== DAISY builder =====
+def build_simple_daisy(book_name: str, audio_dir: Path, daisy_dir: Path, text_chunks: list[str], lang: str = "",
+                       pars_per_smil: int = 1, durations: dict | None = None):
+    # Bufret skrivning (se daisy_fileset.py): NCC i store blokke, SMIL/MP3 batch-vis.
+    # pars_per_smil > 1 samler flere <par> i færre SMIL-filer (settings: SMIL_PARS_PER_FILE).
+    return daisy_fileset.build_fileset(book_name, audio_dir, daisy_dir, text_chunks, lang=lang,
+                                       pars_per_smil=pars_per_smil, generator=f"AI Daisy {__version__}",
+                                       durations=durations)
+
+# ===== ISO creation (native / IMAPI2 / oscdimg / mkisofs) =====
+def _choose_writable_output_path(path: Path) -> Path:
+    try:
+        if path.exists():
+            try:
+                path.unlink()
+            except PermissionError:
+                ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                alt = path.with_name(f"{path.stem}_{ts}{path.suffix}")
+                print(f"ADVARSEL: Kan ikke overskrive {path} (låst af en anden proces).")
+                print("Tip: Luk Stifinder-preview, unmount ISO, eller slet/omdøb filen og prøv igen.")
+                print(f"Jeg skriver ISO til: {alt}")
+                return alt
+    except Exception:
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        alt = path.with_name(f"{path.stem}_{ts}{path.suffix}")
+        print(f"ADVARSEL: Problem med output-stien {path}. Jeg skriver ISO til: {alt}")
+        return alt
+    return path
+
+def create_iso_via_powershell_imapi2(source_dir: Path, iso_path: Path, volume_name: str):
+    src = str(source_dir.resolve()).replace("'", "''")
+    dst = str(iso_path.resolve()).replace("'", "''")
+    vol = iso_writer.sanitize_volume_label(volume_name)
+
+    import textwrap
+    # ImageStream kopieres i blokke via en lille .NET-helper (ikke $stream.Read($stream.Size),
+    # som lægger hele imaget i hukommelsen).
+    ps = textwrap.dedent(f"""
+    $ErrorActionPreference = "Stop"
+    $src = '{src}'
+    $dst = '{dst}'
+    $vol = '{vol}'
+
+    if (-not ('IsoStreamCopy' -as [type])) {{
+    Add-Type -TypeDefinition @'
+    using System;
+    using System.IO;
+    using System.Runtime.InteropServices;
+    using System.Runtime.InteropServices.ComTypes;
+    public static class IsoStreamCopy {{
+        public static void Save(object comStream, string path) {{
+            IntPtr unk = Marshal.GetIUnknownForObject(comStream);
+            IntPtr pcbRead = Marshal.AllocHGlobal(sizeof(int));
+            try {{
+                var istream = (IStream)Marshal.GetTypedObjectForIUnknown(unk, typeof(IStream));
+                byte[] buffer = new byte[1048576];
+                using (var fs = new FileStream(path, FileMode.Create, FileAccess.Write, FileShare.None, 1048576)) {{
+                    while (true) {{
+                        istream.Read(buffer, buffer.Length, pcbRead);
+                        int read = Marshal.ReadInt32(pcbRead);
+                        if (read <= 0) break;
+                        fs.Write(buffer, 0, read);
+                    }}
+                }}
+            }} finally {{
+                Marshal.FreeHGlobal(pcbRead);
+                Marshal.Release(unk);
+            }}
+        }}
+    }}
+    '@ | Out-Null
+    }}
+
+    $fsi = New-Object -ComObject IMAPI2FS.MsftFileSystemImage
+    $fsi.FileSystemsToCreate = 7  # ISO9660 + Joliet + UDF
+    $fsi.VolumeName = $vol
+    $fsi.ChooseImageDefaultsForMediaType(12) | Out-Null  # 12 = IMAPI_MEDIA_PHYSICAL_TYPE_DISK
+    $fsi.Root.AddTree($src, $false)
+
+    $result = $fsi.CreateResultImage()
+    [IsoStreamCopy]::Save($result.ImageStream, $dst)
+    """).strip()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".ps1", delete=False, encoding="utf-8-sig") as tf:
+        tf.write(ps)
+        ps_path = tf.name
+
+    try:
+        subprocess.run(["powershell", "-NoProfile", "-ExecutionPolicy", "Bypass", "-File", ps_path], check=True)
+    finally:
+        try:
+            os.remove(ps_path)
+        except Exception:
+            pass
+
+def is_native_iso_cmd(iso_cmd: str) -> bool:
+    return (iso_cmd or "native").strip().lower() in ("native", "python", "auto", "")
+
+def create_iso(iso_cmd: str, source_dir: Path, iso_path: Path, volume_name: str, *, hasher=None):
+    # ISO_CMD i settings.json:
+    #   "native" (standard): ren Python ISO 9660 + Joliet + UDF (iso_writer.py), også på Linux
+    #   "powershell-imapi2": Windows IMAPI2 via PowerShell
+    #   "oscdimg" / "mkisofs" / "genisoimage" (eller fuld sti til værktøjet)
+    # hasher (iso_manifest.ImageHasher) bruges kun af "native"; de eksterne værktøjer ignorerer den.
+    cmd = (iso_cmd or "native").strip()
+    low = cmd.lower()
+    vol = iso_writer.sanitize_volume_label(volume_name)
+
+    if is_native_iso_cmd(cmd):
+        iso_writer.create_iso_native(source_dir, iso_path, vol, hasher=hasher)
+        return
+    if low in ("powershell-imapi2", "imapi2", "powershell"):
+        create_iso_via_powershell_imapi2(source_dir, iso_path, vol)
+        return
+
+    exe = shutil.which(cmd) or cmd
+    base = os.path.basename(low)
+    if base in ("oscdimg", "oscdimg.exe"):
+        subprocess.run([exe, "-m", "-o", "-u2", "-udfver102", f"-l{vol}", str(source_dir), str(iso_path)], check=True)
+    elif base in ("mkisofs", "mkisofs.exe", "genisoimage", "genisoimage.exe"):
+        subprocess.run([exe, "-V", vol, "-J", "-R", "-o", str(iso_path), str(source_dir)], check=True)
+    else:
+        raise FileNotFoundError(f"Ukendt ISO_CMD: {iso_cmd!r}. Brug 'native', 'powershell-imapi2', oscdimg eller mkisofs.")
+
+def master_iso(fileset: "daisy_fileset.DaisyFileset", iso_path: Path, volume_label: str, *, iso_cmd: str = "native",
+               direct: bool = True, staging_dir: Path | None = None, capacity: int | None = None,
+               checksums: bool = True) -> dict | None:
+    """Mastr ét DAISY-filsæt til iso_path. Returnerer checksummer (iso_manifest) eller None.
+
+    direct: filsættet lægges virtuelt i ISO'en (kun ISO_CMD "native"); ellers skrives det
+    først til staging_dir/<label> (standard: mappen ved siden af iso_path).
+    capacity: mediets sektorer (standard: cd).
+    """
+    if capacity is None:
+        capacity = disc_planner.capacity_sectors("cd")
+    staging_dir = Path(staging_dir) if staging_dir else iso_path.parent
+    hasher = iso_manifest.ImageHasher() if checksums else None
+    staging = None
+    try:
+        if direct:
+            layout = iso_writer.plan_layout(iso_writer.entries_from_manifest(fileset.manifest()), volume_label)
+            if layout.total_sectors > capacity:
+                raise RuntimeError(f"{volume_label}: {layout.total_sectors} sektorer > mediets {capacity}")
+            iso_writer.write_layout(layout, iso_path, hasher=hasher)
+        else:
+            staging = staging_dir / volume_label
+            fileset.write(staging)
+            create_iso(iso_cmd, staging, iso_path, volume_name=volume_label, hasher=hasher)
+            if iso_path.stat().st_size > capacity * iso_writer.SECTOR:
+                raise RuntimeError(f"{volume_label}: {iso_path.name} er større end mediet")
+    finally:
+        if hasher:
+            hasher.close()
+    if not checksums:
+        return None
+    # beregnet under mastring; eksterne værktøjer: læs imaget igen
+    sums = hasher.result() if hasher.size else iso_manifest.hash_existing(iso_path, staging)
+    iso_manifest.write_manifest(iso_path, sums, volume_label=volume_label)
+    return sums
+
+# ===== Volume label counter =====
+def reserve_volume_labels(script_dir: Path, settings: dict, count: int, *, max_seq: int = 999) -> list[str]:
+    """count fortløbende labels <PREFIX>_DDMMYY_NNN (løbenr pr. prefix+dato) i én transaktion.
+
+    - Prefix hentes fra settings['VOLUME_PREFIX'] (fallback: DBS)
+    - Tælleren ligger i SQLite (production_counter): COUNTER_DB_PATH, COUNTER_SHARED
+    - NNN: 000..999 (fejl når dagens numre er brugt op)
+    """
+    if count < 1:
+        return []
+    prefix = (settings.get('VOLUME_PREFIX') or 'DBS').strip()
+    date_key = datetime.datetime.now().strftime('%d%m%y')
+    key = f"{prefix}_{date_key}"
+    first = production_counter.open_store(script_dir, settings).reserve(key, count, max_seq=max_seq)
+    return [f"{key}_{no:03d}" for no in range(first, first + count)]
+
+def next_volume_label(script_dir: Path, settings: dict, *, max_seq: int = 999) -> str:
+    return reserve_volume_labels(script_dir, settings, 1, max_seq=max_seq)[0]
+
+# ===== PEF via DAISY Pipeline 2 =====
+def resolve_pipeline_cmd(settings: dict, script_dir: Path) -> str:
+    cmd = (settings.get("DAISY_PIPELINE_CMD") or "").strip()
+    if cmd:
+        p = Path(cmd)
+        if p.exists():
+            return str(p)
+        p2 = script_dir / cmd
+        if p2.exists():
+            return str(p2)
+        return cmd
+    if (script_dir / "dp2.exe").exists():
+        return str(script_dir / "dp2.exe")
+    return "pipeline2"
+
+def resolve_pipeline(settings: dict, script_dir: Path):
+    """dp2-kommando (str), eller en delt Dp2Client når Pipeline 2 kører som web-service.
+
+    settings: DAISY_PIPELINE_MODE ("cli"/"server"), DAISY_PIPELINE_WS_URL,
+    DAISY_PIPELINE_SERVER_CMD (startes dovent hvis serveren ikke svarer),
+    DAISY_PIPELINE_AUTH_ID/DAISY_PIPELINE_SECRET (hvis serveren kræver signering).
+    """
+    mode = (settings.get("DAISY_PIPELINE_MODE") or "").strip().lower()
+    url = (settings.get("DAISY_PIPELINE_WS_URL") or "").strip()
+    server_cmd = settings.get("DAISY_PIPELINE_SERVER_CMD") or None
+    if mode == "server" or (not mode and (url or server_cmd)):
+        import dp2_client
+        return dp2_client.get_client(url or dp2_client.DEFAULT_URL, server_cmd=server_cmd,
+                                     auth_id=settings.get("DAISY_PIPELINE_AUTH_ID") or "",
+                                     secret=settings.get("DAISY_PIPELINE_SECRET") or "")
+    return resolve_pipeline_cmd(settings, script_dir)
+
+def is_pipeline_client(pipeline) -> bool:
+    # resolve_pipeline giver en dp2-kommando (str) eller en Dp2Client; dp2_client er kun
+    # indlæst i det sidste tilfælde
+    return not isinstance(pipeline, str)
+
+def run_pipeline(pipeline, script: str, *, source: Path, options: dict | None = None, out_dir: Path,
+                 context_dir: Path | None = None):
+    """Kør et Pipeline 2-script: via web-service (Dp2Client) eller som `dp2 <script> ... -o out_dir`."""
+    options = options or {}
+    if is_pipeline_client(pipeline):
+        pipeline.run(script, inputs={"source": source}, options=options, out_dir=out_dir, context_dir=context_dir)
+        return
+    args = [script, "--source", str(source)]
+    for name, value in options.items():
+        args += [f"--{name}", str(value)]
+    subprocess.run([pipeline] + args + ["-o", str(out_dir)], check=True)
+
+def pipeline_version(pipeline, settings: dict | None = None) -> str:
+    """Versions-id til PEF-cachen - uden at starte Pipeline 2 (tom streng = ukendt, cache springes over)."""
+    pinned = ((settings or {}).get("DAISY_PIPELINE_VERSION") or "").strip()
+    if pinned:
+        return pinned
+    if is_pipeline_client(pipeline):
+        if pipeline.server_cmd:
+            return "ws:" + pef_cache.file_fingerprint(pipeline.server_cmd)
+        return f"ws:{pipeline.version}" if pipeline.alive() and pipeline.version else ""
+    return "cli:" + pef_cache.file_fingerprint(pipeline)
+
+def find_dtbook_xml(dtbook_out: Path) -> Path:
+    hits = list(dtbook_out.rglob("dtbook.xml"))
+    if hits:
+        return hits[0]
+    xmls = list(dtbook_out.rglob("*.xml"))
+    if not xmls:
+        raise FileNotFoundError(f"Kunne ikke finde dtbook.xml i {dtbook_out}")
+    return xmls[0]
+
+def make_pef_from_docx(docx_path: Path, pef_path: Path, pipeline, braille_table: str, work: Path,
+                       *, cache: "pef_cache.PefCache | None" = None, version: str = ""):
+    # cache/version: se pef_cache og pipeline_version (tom version = ingen cache)
+    key = ""
+    if cache and version:
+        key = cache.key(pef_cache.source_digest(docx_path), braille_table, version, "word-to-dtbook+dtbook-to-pef")
+        if cache.get(key, pef_path):
+            print(f"PEF fra cache: {pef_path.name}")
+            return
+
+    dtbook_out = work / "dtbook_out"
+    pef_out = work / "pef_out"
+    dtbook_out.mkdir(parents=True, exist_ok=True)
+    pef_out.mkdir(parents=True, exist_ok=True)
+
+    run_pipeline(pipeline, "word-to-dtbook", source=docx_path, out_dir=dtbook_out)
+    dtbook_xml = find_dtbook_xml(dtbook_out)
+
+    run_pipeline(pipeline, "dtbook-to-pef", source=dtbook_xml,
+                 options={"braille-code": f"(liblouis-table:{braille_table})"},
+                 out_dir=pef_out, context_dir=dtbook_xml.parent)
+
+    pefs = list(pef_out.rglob("*.pef"))
+    if not pefs:
+        raise FileNotFoundError("Pipeline lavede ingen .pef")
+    shutil.copy2(pefs[0], pef_path)
+    if key:
+        cache.put(key, pef_path, source=docx_path.name, table=braille_table, version=version,
+                  script="word-to-dtbook+dtbook-to-pef")
+
+def _text_to_simple_html(text: str, lang: str = "") -> str:
+    import html
+    paras = [p.strip() for p in text.split("\n\n") if p.strip()]
+    parts = []
+    parts.append("<!DOCTYPE html>")
+    parts.append("<html" + (f' lang="{html.escape(lang)}"' if lang else "") + ">")
+    parts.append("<head><meta charset=\"utf-8\"/></head><body>")
+    for p in paras:
+        parts.append(f"<p>{html.escape(p)}</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def make_pef_from_txt(text_path: Path, pef_path: Path, pipeline, braille_table: str, work: Path, lang: str = "",
+                      *, engine: str = "auto", layout: "pef_native.PefLayout | None" = None,
+                      cache: "pef_cache.PefCache | None" = None, version: str = ""):
+    # engine: "auto" = liblouis i processen når muligt, ellers Pipeline 2; "native"; "pipeline"
+    # cache/version: se pef_cache og pipeline_version (tom version = ingen cache for Pipeline 2)
+    text = text_path.read_text(encoding="utf-8", errors="ignore")
+    engine = (engine or "auto").strip().lower()
+    digest = pef_cache.source_digest(text_path) if cache else ""
+
+    def cached(key: str) -> bool:
+        if key and cache.get(key, pef_path):
+            print(f"PEF fra cache: {pef_path.name}")
+            return True
+        return False
+
+    if engine == "native" or (engine == "auto" and pef_native.available()
+                              and not pef_native.needs_full_formatting(text)):
+        try:
+            layout = layout or pef_native.PefLayout()
+            key = cache.key(digest, braille_table, pef_native.version(), "pef_native",
+                            f"{lang}|{layout.signature()}") if cache else ""
+            if cached(key):
+                return
+            pef_native.text_to_pef(text_path, pef_path, braille_table, lang=lang, layout=layout)
+            if key:
+                cache.put(key, pef_path, source=text_path.name, table=braille_table, script="pef_native")
+            return
+        except Exception as e:
+            if engine == "native":
+                raise
+            print(f"liblouis fejlede ({e}) - bruger Pipeline 2.")
+
+    key = cache.key(digest, braille_table, version, "html-to-pef", lang) if cache and version else ""
+    if cached(key):
+        return
+
+    pef_out = work / "pef_out"
+    pef_out.mkdir(parents=True, exist_ok=True)
+    html_path = work / "input.html"
+    html_path.write_text(_text_to_simple_html(text, lang=lang), encoding="utf-8")
+
+    run_pipeline(pipeline, "html-to-pef", source=html_path,
+                 options={"braille-code": f"(liblouis-table:{braille_table})"}, out_dir=pef_out)
+
+    pefs = list(pef_out.rglob("*.pef"))
+    if not pefs:
+        raise FileNotFoundError("Pipeline lavede ingen .pef (html-to-pef)")
+    shutil.copy2(pefs[0], pef_path)
+    if key:
+        cache.put(key, pef_path, source=text_path.name, table=braille_table, version=version, script="html-to-pef")
+
+def open_pef_cache(settings: dict, script_dir: Path) -> "pef_cache.PefCache | None":
+    if not settings.get("USE_PEF_CACHE", True):
+        return None
+    return pef_cache.PefCache(script_dir / (settings.get("PEF_CACHE_DIR") or "pef_cache"),
+                              max_bytes=int(settings.get("PEF_CACHE_MAX_MB") or 2048) << 20)
+
+def make_pef_for_book(input_file: Path, text_file: Path, pef_path: Path, pipeline, braille_table: str, work: Path,
+                      *, lang: str, settings: dict, cache: "pef_cache.PefCache | None" = None, version: str = ""):
+    """DOCX via word-to-dtbook + dtbook-to-pef, ellers TXT (liblouis eller html-to-pef).
+
+    Bagefter valgfri efterbehandling (pef_post): bind-opdeling og BRF.
+    """
+    if input_file.suffix.lower() == ".docx":
+        make_pef_from_docx(input_file, pef_path, pipeline, braille_table, work, cache=cache, version=version)
+    else:
+        make_pef_from_txt(text_file, pef_path, pipeline, braille_table, work, lang=lang,
+                          engine=settings.get("PEF_ENGINE") or "auto",
+                          layout=pef_native.layout_from_settings(settings),
+                          cache=cache, version=version)
+    for extra in pef_post.postprocess(pef_path, settings):
+        print(f"[{input_file.name}] {extra.suffix[1:].upper()}: {extra}")
+
+def make_pef_batch(files: list[Path], *, lang: str, settings: dict, script_dir: Path) -> dict[Path, str]:
+    """Punkt for mange bøger i én Pipeline 2-session.
+
+    Serveren startes/varmes op én gang, og op til PEF_BATCH_SLOTS bøger er i gang
+    samtidig. Hver .pef skrives, så snart dens job er færdigt, og fejl rapporteres
+    pr. fil. Returnerer {fil: fejlbesked} for de bøger der fejlede.
+    """
+    braille_table = braille_table_for(settings, lang)
+    if not braille_table:
+        print(f"PEF springes over (ingen BRAILLE_TABLE_BY_LANG for '{lang}').")
+        return {}
+    pipeline = resolve_pipeline(settings, script_dir)
+    if is_pipeline_client(pipeline):
+        pipeline.ensure_running()
+    else:
+        print("Bemærk: Pipeline 2 køres som CLI, så hvert job starter sin egen JVM "
+              "(sæt DAISY_PIPELINE_MODE=server for én fælles session).")
+    cache = open_pef_cache(settings, script_dir)
+    version = pipeline_version(pipeline, settings) if cache else ""
+    slots = max(1, min(len(files), int(settings.get("PEF_BATCH_SLOTS") or 4)))
+
+    def one(input_file: Path) -> Path:
+        work = Path(tempfile.mkdtemp(prefix="pef_work_"))
+        try:
+            text_file = work / "input.txt"
+            if input_file.suffix.lower() != ".docx":
+                docx_to_text(input_file, text_file)
+            out_pef = input_file.with_suffix(".pef")
+            t0, ok = time.perf_counter(), False
+            try:
+                with stage_profiler.stage(input_file.name, "PefBuild"):
+                    make_pef_for_book(input_file, text_file, out_pef, pipeline, braille_table, work,
+                                      lang=lang, settings=settings, cache=cache, version=version)
+                    if stage_profiler.enabled():
+                        stage_profiler.add_bytes(stage_profiler.file_bytes([out_pef]))
+                ok = True
+            finally:
+                metrics.step_seconds.observe(time.perf_counter() - t0, step="PefBuild", status="ok" if ok else "failed")
+            return out_pef
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print(f"PEF for {len(files)} filer ({slots} samtidige jobs) ...")
+    errors: dict[Path, str] = {}
+    with ThreadPoolExecutor(max_workers=slots) as ex:
+        futures = {ex.submit(one, f): f for f in files}
+        pending = len(futures)
+        progress_events.emit("queue", source="pef_batch", depth=pending, capacity=slots)
+        for fut in as_completed(futures):
+            f = futures[fut]
+            pending -= 1
+            progress_events.emit("queue", source="pef_batch", depth=pending, capacity=slots)
+            try:
+                print(f"[{f.name}] PEF: {fut.result()}")
+            except Exception as e:
+                errors[f] = str(e)
+                print(f"[{f.name}] PEF fejl: {e}")
+    print(f"PEF færdig: {len(files) - len(errors)} ok, {len(errors)} fejl.")
+    return errors
+
+# ===== Stage-API (daisy_pipeline) =====
+# Trinene som process_one_file, daisy_batch og daisy_worker bygger på; de kan også kaldes
+# enkeltvis (benchmark, nye motorer). Jobmappe, resume og fremdrift ligger i process_one_file.
+def extract(input_file: Path, text_file: Path) -> str:
+    """.docx/.txt -> ren tekst i text_file (DtBook-trinnet). Returnerer teksten."""
+    docx_to_text(input_file, text_file)
+    return text_file.read_text(encoding="utf-8", errors="ignore")
+
+def segment(text: str, max_chars: int = DEFAULT_MAX_TTS_CHARS) -> list[str]:
+    """Afsnit til TTS; afsnit over max_chars deles."""
+    return split_text_into_chunks(text, max_chars)
+
+def synthesise_segment(text: str, out_path: Path, *, api_key: str, voice_id: str, model_id: str = DEFAULT_MODEL_ID,
+                       cache_dir: Path | None = None, book: str = "") -> int:
+    """Ét TTS-segment til out_path (fra TTS-cachen eller ElevenLabs). Returnerer hentede bytes (0 = cache).
+
+    out_path skrives atomisk (hårdt link til cachen, hvis den bruges).
+    """
+    cpath = tts_cache_path(cache_dir, voice_id, model_id, text) if cache_dir else None
+    if cpath and not cpath.exists():
+        # cache fra v10-v14: linkes én gang over på den nye nøgle (de gamle scripts rammer stadig deres egen)
+        legacy = legacy_tts_cache_path(cache_dir, voice_id, model_id, text)
+        if legacy.is_file() and legacy.stat().st_size > 0:
+            cpath.parent.mkdir(parents=True, exist_ok=True)
+            job_store.link_or_copy(legacy, cpath)
+    mp3_bytes = b""
+    if cpath and cpath.exists():
+        metrics.tts_cache_hits.inc()
+        metrics.tts_bytes.inc(cpath.stat().st_size, source="cache")
+    else:
+        metrics.tts_cache_misses.inc()
+        with stage_profiler.stage(book, "Tts/api"):
+            mp3_bytes = elevenlabs_tts_mp3(api_key, voice_id, model_id, text)
+            stage_profiler.add_bytes(len(mp3_bytes))
+        with stage_profiler.stage(book, "Tts/cache"):
+            if cpath:
+                cpath.parent.mkdir(parents=True, exist_ok=True)
+                job_store.write_atomic(cpath, mp3_bytes)
+            else:
+                job_store.write_atomic(out_path, mp3_bytes)
+            stage_profiler.add_bytes(len(mp3_bytes))
+    if cpath:
+        with stage_profiler.stage(book, "Tts/cache"):
+            job_store.link_or_copy(cpath, out_path)
+            if stage_profiler.enabled():
+                stage_profiler.add_bytes(stage_profiler.file_bytes([out_path]))
+    return len(mp3_bytes)
+
+def synthesise(segments: list[str], out_dir: Path, *, api_key: str, voice_id: str, model_id: str = DEFAULT_MODEL_ID,
+               cache_dir: Path | None = None, book: str = "") -> list[Path]:
+    """Alle segmenter til out_dir/seg_0001.mp3 ...; filer der findes i forvejen genbruges."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, text in enumerate(segments, start=1):
+        path = out_dir / f"seg_{i:04d}.mp3"
+        if not path.exists():
+            synthesise_segment(text, path, api_key=api_key, voice_id=voice_id, model_id=model_id,
+                               cache_dir=cache_dir, book=book)
+        paths.append(path)
+    return paths
+
+class InvalidFilesetError(RuntimeError):
+    def __init__(self, report: "daisy_validate.ValidationReport"):
+        super().__init__(f"DAISY-filsættet er ugyldigt ({len(report.errors)} fejl) - ISO laves ikke.")
+        self.report = report
+
+def build_daisy(label: str, mp3_files: list[Path], texts: list[str], lang: str = "", *, pars_per_smil: int = 1,
+                durations: dict[str, float] | None = None, names: list[str] | None = None, first_no: int = 1,
+                set_info: str = "") -> "daisy_fileset.DaisyFileset":
+    """DAISY 2.02-filsættet til én disk (i hukommelsen), valideret før det returneres (rapporten i .report).
+
+    InvalidFilesetError (en RuntimeError) hvis filsættet er ugyldigt, så en defekt disk aldrig bliver mastret.
+    """
+    fileset = daisy_fileset.render_fileset(
+        label, mp3_files, texts, lang, pars_per_smil=pars_per_smil, generator=f"AI Daisy {__version__}",
+        durations=durations, names=names, first_no=first_no, set_info=set_info)
+    report = fileset.report = daisy_validate.validate_manifest(fileset.manifest(), durations=durations, label=label)
+    if report.warnings or not report.ok:
+        print(report.summary())
+    if not report.ok:
+        raise InvalidFilesetError(report)
+    return fileset
+
+def braille_table_for(settings: dict, lang: str) -> str:
+    """Punkttabellen for sproget (BRAILLE_TABLE_BY_LANG); tom streng = ingen PEF."""
+    return ((settings.get("BRAILLE_TABLE_BY_LANG") or {}).get(lang) or "").strip()
+
+def make_pef(input_file: Path, pef_path: Path, *, text_file: Path, lang: str, settings: dict, script_dir: Path,
+             work: Path) -> Path | None:
+    """PEF for én bog (PEF_ENGINE, PEF-cache, pef_post). None hvis sproget ikke har en punkttabel."""
+    braille_table = braille_table_for(settings, lang)
+    if not braille_table:
+        return None
+    pipeline = resolve_pipeline(settings, script_dir)
+    cache = open_pef_cache(settings, script_dir)
+    version = pipeline_version(pipeline, settings) if cache else ""
+    make_pef_for_book(input_file, text_file, pef_path, pipeline, braille_table, work,
+                      lang=lang, settings=settings, cache=cache, version=version)
+    return pef_path
+
+# ===== Processing =====
+def process_one_file(input_file: Path, *,
+                     api_key: str,
+                     voice_id: str,
+                     voice_name: str,
+                     model_id: str,
+                     iso_cmd: str,
+                     max_tts_chars: int,
+                     cache_dir: Path,
+                     use_tts_cache: bool,
+                     lang: str,
+                     mode: str,
+                     settings: dict,
+                     meta_template: dict,
+                     script_dir: Path,
+                     defer_pef: bool = False,
+                     volume_label: str = "",
+                     metadata: dict | None = None,
+                     out_dir: Path | None = None,
+                     resume: bool = False) -> dict:
+    # defer_pef: PEF laves bagefter for hele batchen (make_pef_batch)
+    # volume_label: forhåndsreserveret label (batch); tom = jobbets gemte label, ellers trækkes et nyt
+    # metadata: felter til metadata_row (title, produced_for, produced_by, sender, fields={kolonne: værdi});
+    #           None = spørg interaktivt
+    # out_dir: mappe til ISO/PEF/CSV (standard: ved siden af input)
+    # resume: fortsæt jobmappen fra sidst (færdige trin og TTS-segmenter springes over)
+    # Returnerer {"csv", "isos", "labels", "pef", "pef_error"}
+
+    make_daisy = (mode in ("daisy", "both"))
+    make_braille = (mode in ("braille", "both")) and not defer_pef
+
+    out_base = (Path(out_dir) / input_file.stem) if out_dir else input_file.with_suffix("")
+    if out_dir:
+        Path(out_dir).mkdir(parents=True, exist_ok=True)
+    result = {"csv": None, "isos": [], "labels": [], "pef": None, "pef_error": None}
+
+    # persistent jobmappe (job.json som GUI'ens JobStore): en fejl i ISO/PEF smider ikke lyd og tekst væk
+    job = job_store.open_job(job_store.job_root(script_dir, settings), input_file, mode=mode,
+                             voice_id=voice_id, language=lang, resume=resume)
+    work = job.dir
+    status = "fejl"
+    t_job = time.monotonic()
+    progress_events.emit("job_start", book=input_file.name, mode=mode, resume=resume)
+    try:
+        book_name = input_file.stem
+        # resume: bogen beholder sine labels (ingen nye numre)
+        volume_label = (job.volume_labels or [volume_label])[0] or next_volume_label(script_dir, settings)
+        if not job.volume_labels:
+            job.set_volume_labels([volume_label])
+
+        input_hash = job_store.file_sha256(input_file)
+        if job.is_done("Import", input_hash):
+            progress_events.skipped(input_file.name, "Import")
+        else:
+            with job.run_step("Import", input_hash) as st:
+                input_copy = Path(job.data["InputPath"])
+                shutil.copy2(input_file, input_copy)
+                st["Outputs"] = [input_copy]
+        text_file = work / "dtbook" / "fulltext.txt"
+        if job.is_done("DtBook", input_hash):
+            progress_events.skipped(input_file.name, "DtBook")
+        else:
+            with job.run_step("DtBook", input_hash) as st:
+                extract(input_file, text_file)
+                st["Outputs"] = [text_file]
+        text = text_file.read_text(encoding="utf-8", errors="ignore")
+        paragraphs = segment(text, max_tts_chars)
+
+        # ISO path (kun hvis DAISY); et færdigt ISO-trin slettes ikke før DAISY-grenen ved om det skal laves om
+        output_iso = out_base.with_suffix(".iso")
+        if make_daisy and not job.completed("IsoAndCsv"):
+            output_iso = _choose_writable_output_path(output_iso)
+
+        # --- Metadata CSV ---
+        length_str = f"{len(text)} chars"
+        iso_name_for_csv = ""
+        if make_daisy:
+            iso_name_for_csv = output_iso.name
+
+        if metadata is None:
+            headers, row = prompt_metadata(
+                meta_template,
+                title_default=book_name,
+                voice_name=voice_name,
+                lang=lang,
+                original_names=[input_file.name],
+                iso_name=iso_name_for_csv,
+                volume_label=volume_label,
+                length_str=length_str
+            )
+        else:
+            headers, row = metadata_row(
+                meta_template,
+                title=metadata.get("title") or book_name,
+                produced_for=metadata.get("produced_for") or "",
+                produced_by=metadata.get("produced_by"),
+                sender=metadata.get("sender"),
+                voice_name=voice_name,
+                lang=lang,
+                original_names=[input_file.name],
+                iso_name=iso_name_for_csv,
+                volume_label=volume_label,
+                length_str=length_str,
+                overrides=metadata.get("fields")
+            )
+        output_csv = out_base.with_suffix(".csv")
+        write_metadata_csv(headers, row, output_csv)
+        print(f"[{input_file.name}] CSV: {output_csv}")
+        result.update(csv=output_csv, labels=[volume_label])
+
+        # --- Braille/PEF ---
+        def braille_branch():
+            # fejl her (også tabelopslaget) stopper ikke DAISY-grenen; egen undermappe, så intet kolliderer med lyd/ISO
+            try:
+                braille_table = braille_table_for(settings, lang)
+                if not braille_table:
+                    print(f"[{input_file.name}] PEF springes over (ingen BRAILLE_TABLE_BY_LANG for '{lang}').")
+                    return
+                out_pef = out_base.with_suffix(".pef")
+                pef_work = work / "braille"
+                pef_hash = job_store.hash_inputs(input_hash, braille_table, lang, str(out_pef),
+                                                 *(settings.get(k) for k in ("PEF_ENGINE", "PEF_SPLIT_PAGES",
+                                                                             "PEF_EXPORT")))
+                if job.is_done("PefBuild", pef_hash):
+                    print(f"[{input_file.name}] PEF er lavet i forvejen (resume): {out_pef}")
+                    progress_events.skipped(input_file.name, "PefBuild")
+                else:
+                    with job.run_step("PefBuild", pef_hash) as st:
+                        shutil.rmtree(pef_work, ignore_errors=True)
+                        pef_work.mkdir(parents=True, exist_ok=True)
+                        make_pef(input_file, out_pef, text_file=text_file, lang=lang, settings=settings,
+                                 script_dir=script_dir, work=pef_work)
+                        st["Outputs"] = [out_pef]
+                    print(f"[{input_file.name}] PEF: {out_pef}")
+                result["pef"] = out_pef
+            except Exception as e:
+                print(f"[{input_file.name}] PEF fejl: {e}")
+                result["pef_error"] = str(e)
+
+        # --- DAISY/ISO ---
+        def daisy_branch():
+            # direkte mastring: filsættet lægges virtuelt i ISO'en uden staging-mappe
+            direct_iso = is_native_iso_cmd(iso_cmd) and bool(settings.get("ISO_DIRECT", True))
+
+            # TTS: ét segment pr. afsnit i jobmappens tts/ (seg_0001.mp3 ...); færdige segmenter genbruges
+            cache_keys = [sha256_hex(f"{voice_id}|{model_id}|{chunk}") for chunk in paragraphs]
+            tts_hash = job_store.hash_inputs(cache_keys)
+            segments = job.tts_segments(paragraphs, cache_keys, model_id=model_id, max_chars=max_tts_chars)
+            reused = sum(1 for seg in segments if seg["Status"] == job_store.COMPLETED)
+            if reused:
+                print(f"[{input_file.name}] TTS: {reused}/{len(segments)} segmenter genbruges fra jobmappen.")
+
+            # (navn i filsættet, kildefil)
+            mp3_sources: list[tuple[str, Path]] = []
+            done, total = reused, len(segments)
+            progress_events.emit("segment", book=input_file.name, done=done, total=total, bytes=0, cached=bool(reused))
+            with job.run_step("Tts", tts_hash) as st:
+                for seg, chunk in zip(segments, paragraphs):
+                    seg_path = job.segment_path(seg["Index"])
+                    mp3_sources.append((f"chapter_{seg['Index']:03}.mp3", seg_path))
+                    if seg["Status"] == job_store.COMPLETED:
+                        continue
+                    try:
+                        fetched = synthesise_segment(chunk, seg_path, api_key=api_key, voice_id=voice_id,
+                                                     model_id=model_id, cache_dir=cache_dir if use_tts_cache else None,
+                                                     book=input_file.name)
+                    except Exception as e:
+                        job.segment_done(seg, error=str(e))
+                        raise
+                    job.segment_done(seg)
+                    done += 1
+                    progress_events.emit("segment", book=input_file.name, done=done, total=total,
+                                         bytes=fetched, cached=not fetched)
+                st["Outputs"] = [src for _, src in mp3_sources]
+
+            # opdater length hvis muligt (best effort)
+            durations = {}
+            try:
+                from mutagen.mp3 import MP3  # optional
+                for name, src in mp3_sources:
+                    durations[name] = float(MP3(str(src)).info.length)
+                total_sec = sum(durations.values())
+                # overskriv "Lengte" i CSV hvis felt findes
+                if headers and row:
+                    for idx, h in enumerate(headers):
+                        if h.lower().startswith("lengte"):
+                            row[idx] = f"{total_sec:.1f}s"
+                    write_metadata_csv(headers, row, output_csv)
+            except Exception:
+                durations = {}
+
+            pars_per_smil = max(1, int(settings.get("SMIL_PARS_PER_FILE") or 1))
+            medium = settings.get("DISC_MEDIUM") or "cd"
+            capacity = disc_planner.capacity_sectors(medium)
+            n = min(len(mp3_sources), len(paragraphs))
+            if n == 0:
+                raise FileNotFoundError(f"Ingen chapter_*.mp3 at bygge DAISY af ({input_file.name} har ingen tekst)")
+
+            # for stor til ét medie? -> del ved SMIL-grænser, én volume label pr. disk
+            spans = disc_planner.plan_volumes([src.stat().st_size for _, src in mp3_sources[:n]],
+                                              paragraphs[:n], pars_per_smil, capacity)
+            if not spans:
+                raise RuntimeError(f"[{input_file.name}] diskplanen er tom")
+            discs = len(spans)
+            # gemte labels genbruges (også når antallet af diske ændrer sig); kun manglende trækkes
+            saved = job.volume_labels
+            if len(saved) < discs:
+                saved += reserve_volume_labels(script_dir, settings, discs - len(saved))
+                job.set_volume_labels(saved)
+            labels = saved[:discs]
+            if discs == 1:
+                iso_names = [output_iso]
+            else:
+                print(f"[{input_file.name}] Bogen er for stor til én {medium}: deles på {discs} diske.")
+                iso_names = [output_iso.with_name(f"{output_iso.stem}_{k}af{discs}.iso") for k in range(1, discs + 1)]
+            want_checksums = bool(settings.get("ISO_CHECKSUMS", True))
+            iso_hash = job_store.hash_inputs(tts_hash, labels, [str(p) for p in iso_names], pars_per_smil, medium,
+                                             iso_cmd, direct_iso, want_checksums, __version__)
+
+            filesets = []
+            with job.run_step("DaisyBuild", job_store.hash_inputs(tts_hash, labels, pars_per_smil, lang)):
+                for k, ((first, last), label) in enumerate(zip(spans, labels), start=1):
+                    part = mp3_sources[first-1:last]
+                    filesets.append(build_daisy(
+                        label, [src for _, src in part], paragraphs[first-1:last], lang,
+                        pars_per_smil=pars_per_smil, durations=durations or None, names=[name for name, _ in part],
+                        first_no=first, set_info=f"{k} of {discs}" if discs > 1 else ""))
+
+            if job.is_done("IsoAndCsv", iso_hash):
+                # resume: ISO'erne (og deres checksummer) er lavet i forvejen
+                isos = iso_names
+                print(f"[{input_file.name}] ISO er lavet i forvejen (resume).")
+                progress_events.skipped(input_file.name, "IsoAndCsv")
+                results = [iso_manifest.load_manifest(iso_manifest.manifest_path_for(p)) if want_checksums else None
+                           for p in isos]
+            else:
+                isos = [_choose_writable_output_path(p) for p in iso_names]
+                print(f"[{input_file.name}] Laver ISO ..." if discs == 1 else f"[{input_file.name}] Laver {discs} ISO'er ...")
+                workers = max(1, min(discs, int(settings.get("ISO_PARALLEL") or 4)))
+                with job.run_step("IsoAndCsv", iso_hash) as st:
+                    with ThreadPoolExecutor(max_workers=workers) as ex:
+                        futures = [ex.submit(master_iso, fs, iso_path, label, iso_cmd=iso_cmd, direct=direct_iso,
+                                             staging_dir=work / "daisy", capacity=capacity, checksums=want_checksums)
+                                   for fs, iso_path, label in zip(filesets, isos, labels)]
+                        results = [f.result() for f in futures]
+                    st["Outputs"] = isos + ([iso_manifest.manifest_path_for(p) for p in isos] if want_checksums else [])
+
+            # én række i CSV'en: flere diske listes kommasepareret
+            for idx, h in enumerate(headers):
+                hl = h.lower()
+                if hl.startswith("volume label"):
+                    row[idx] = ", ".join(labels)
+                elif hl.startswith("write data"):
+                    row[idx] = ", ".join(p.name for p in isos)
+            if want_checksums:
+                set_csv_field(headers, row, "ISO SHA-256", ", ".join(r["sha256"] for r in results))
+                set_csv_field(headers, row, "ISO MD5", ", ".join(r["md5"] for r in results))
+                for iso_path, r in zip(isos, results):
+                    print(f"[{input_file.name}] {iso_path.name} SHA-256: {r['sha256']}  MD5: {r['md5']}")
+            write_metadata_csv(headers, row, output_csv)
+            for iso_path in isos:
+                print(f"FÆRDIG: {iso_path}")
+            result.update(isos=isos, labels=labels)
+
+        # begge dele: Pipeline 2 (CPU/JVM) og TTS (netværk) overlapper, så de køres samtidig;
+        # jobmappen ryddes først når begge grene er færdige
+        try:
+            if make_braille and make_daisy:
+                with ThreadPoolExecutor(max_workers=2) as ex:
+                    braille_job = ex.submit(braille_branch)
+                    daisy_job = ex.submit(daisy_branch)
+                daisy_job.result()
+                braille_job.result()
+            elif make_braille:
+                braille_branch()
+            elif make_daisy:
+                daisy_branch()
+            status = "ok"
+        finally:
+            register(script_dir, settings, headers, row, output_csv, status)
+
+    finally:
+        progress_events.emit("job_end", book=input_file.name, mode=mode, status=status,
+                             pef_error=result["pef_error"], seconds=round(time.monotonic() - t_job, 3))
+        metrics.books.inc(mode=mode, status="ok" if status == "ok" and not result["pef_error"] else "failed")
+        metrics.flush()
+        if status == "ok" and not result["pef_error"] and not settings.get("JOB_KEEP"):
+            shutil.rmtree(work, ignore_errors=True)
+        else:
+            print(f"[{input_file.name}] Jobmappe: {work}" + ("" if status == "ok" else " (fortsæt med --resume)"))
+    return result
+
+def main(argv=None, *, script_dir: Path | None = None):
+    """Interaktiv kørsel. script_dir: mappen med settings.json/secrets.json (standard: Tools/Pipeline)."""
+    ap = argparse.ArgumentParser(description="DAISY/ISO + PEF fra .docx/.txt (interaktiv)")
+    ap.add_argument("--resume", action="store_true",
+                    help="fortsæt bøgernes jobmapper (færdige trin og TTS-segmenter genbruges)")
+    stage_profiler.add_arguments(ap)
+    args = ap.parse_args(argv)
+
+    script_dir = Path(script_dir or Path(__file__).resolve().parents[1]).resolve()
+    # Sørg for at relative stier (fx 'out') peger på script-mappen
+    os.chdir(script_dir)
+    secrets_path = script_dir / "secrets.json"
+    settings_path = script_dir / "settings.json"
+    voices_path = script_dir / "voices.json"
+    meta_path = script_dir / "metadata daisy.txt"
+
+    secrets = load_or_create_secrets(secrets_path)
+    settings = load_optional_json(settings_path, default={})
+    progress_events.configure_from_settings(settings, script_dir)
+    configure_elevenlabs(settings)
+    metrics.configure(settings, script_dir)
+    meta_template = load_metadata_template(Path(settings.get("METADATA_TEMPLATE") or meta_path))
+
+    maybe_update_voices_via_powershell(script_dir, secrets_path, voices_path)
+
+    raw_voices = load_optional_json(voices_path, default=None)
+    voices = normalize_voices(raw_voices)
+    if not voices:
+        print("ADVARSEL: voices.json mangler/er tom. Henter stemmer fra ElevenLabs API (fallback).")
+        voices = fetch_voices_from_api(secrets["ELEVEN_API_KEY"])
+
+    # vælg sprog + mode
+    lang = choose_language_from_voices(voices)
+    mode = choose_output_mode()
+
+    # filtrér stemmer efter sprog (hvis ikke auto)
+    voices_for_lang = voices
+    if lang != "auto":
+        vf = [v for v in voices if lang in _voice_langs(v)]
+        if vf:
+            voices_for_lang = vf
+
+    selected_voice = choose_from_list(
+        "Vælg stemme:",
+        voices_for_lang,
+        lambda v: f"{v.get('name','(uden navn)')} (voice_id: {get_voice_id(v)})"
+    )
+    voice_id = get_voice_id(selected_voice)
+    voice_name = selected_voice.get("name","")
+
+    # afled sprog hvis auto
+    if lang == "auto":
+        vl = _voice_langs(selected_voice)
+        lang = vl[0] if vl else ""
+
+    # paths/settings
+    api_key = (secrets.get("ELEVEN_API_KEY") or "").strip()
+    if not api_key:
+        raise RuntimeError("ELEVEN_API_KEY mangler i secrets.json")
+
+    default_root = Path(settings.get("DEFAULT_ROOT") or DEFAULT_ROOT)
+    model_id = (settings.get("MODEL_ID") or DEFAULT_MODEL_ID).strip()
+    iso_cmd = (settings.get("ISO_CMD") or "native").strip()
+    max_tts_chars = int(settings.get("MAX_TTS_CHARS") or DEFAULT_MAX_TTS_CHARS)
+    use_tts_cache = bool(settings.get("USE_TTS_CACHE", True))
+    cache_dir = (script_dir / (settings.get("CACHE_DIR") or "tts_cache")).resolve()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # vælg projektmappe og fil
+    if not default_root.exists():
+        print(f"ADVARSEL: DEFAULT_ROOT findes ikke: {default_root}")
+        root_str = input("Indtast sti til projekt-root: ").strip().strip('"')
+        default_root = Path(root_str)
+
+    folders = list_subfolders(default_root)
+    if not folders:
+        raise FileNotFoundError(f"Ingen undermapper i {default_root}")
+
+    project = choose_from_list(f"Vælg mappe i {default_root}:", folders, lambda p: p.name)
+    files = list_files(project)
+    if not files:
+        raise FileNotFoundError(f"Ingen .txt/.docx i {project}")
+
+    print(f"\nVælg fil i {project}:")
+    for i,f in enumerate(files):
+        print(f"[{i}] {f.name}")
+    print("[a] Alle filer")
+
+    choice = (input("Vælg nummer eller 'a': ") or "").strip().lower()
+    if choice == "a":
+        selected_files = files
+    else:
+        if not choice.isdigit():
+            raise ValueError("Ugyldigt valg.")
+        idx = int(choice)
+        if idx < 0 or idx >= len(files):
+            raise ValueError("Ugyldigt valg.")
+        selected_files = [files[idx]]
+
+    # kun punkt for flere filer: metadata først, derefter alle PEF'er i én Pipeline 2-session
+    pef_batch = (mode == "braille" and len(selected_files) > 1 and bool(settings.get("PEF_BATCH", True)))
+    # én blok labels for hele batchen (ekstra diske ved opdeling trækkes undervejs);
+    # ved --resume trækker process_one_file kun til bøger uden gemte labels
+    labels = ([""] * len(selected_files) if args.resume
+              else reserve_volume_labels(script_dir, settings, len(selected_files)))
+
+    # --profile måler først herfra (ikke tiden ved menuerne)
+    profiler = stage_profiler.start_from_args(args, script_dir, settings)
+    try:
+        for f, label in zip(selected_files, labels):
+            process_one_file(
+                f,
+                api_key=api_key,
+                voice_id=voice_id,
+                voice_name=voice_name,
+                model_id=model_id,
+                iso_cmd=iso_cmd,
+                max_tts_chars=max_tts_chars,
+                cache_dir=cache_dir,
+                use_tts_cache=use_tts_cache,
+                lang=lang,
+                mode=mode,
+                settings=settings,
+                meta_template=meta_template,
+                script_dir=script_dir,
+                defer_pef=pef_batch,
+                volume_label=label,
+                resume=args.resume
+            )
+        if pef_batch:
+            make_pef_batch(selected_files, lang=lang, settings=settings, script_dir=script_dir)
+        if settings.get("SHAREPOINT_SYNC"):
+            sync_sharepoint(script_dir, settings)
+    finally:
+        stage_profiler.finish(profiler)
+
+    # kun pause når nogen sidder ved konsollen (ikke-interaktivt: daisy_batch.py)
+    if sys.stdin.isatty():
+        input("\nTryk Enter for at afslutte...")
+
+class _TeeTextIO:
+    """Skriver både til konsol og til en logfil."""
+    def __init__(self, console, logfile):
+        self.console = console
+        self.logfile = logfile
+
+    def write(self, s):
+        for stream in (self.console, self.logfile):
+            try:
+                stream.write(s)
+            except Exception:
+                pass
+        return len(s) if isinstance(s, str) else 0
+
+    def flush(self):
+        for stream in (self.console, self.logfile):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+
+def _setup_logfile(script_dir: Path) -> tuple[Path, object]:
+    logs_dir = script_dir / "logs"
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_path = logs_dir / f"daisy_run_{ts}.log"
+    return log_path, open(log_path, "w", encoding="utf-8", errors="replace")
+
+def cli(argv=None, *, script_dir: Path | None = None, logfile: bool = False):
+    """Kommandolinjen (python -m daisy_pipeline og de gamle scriptnavne): fejl vises før konsollen lukker.
+
+    logfile: stdout/stderr tees også til logs/daisy_run_<tid>.log i script_dir (som v11-v14).
+    """
+    log_path = log_fh = None
+    if logfile:
+        log_path, log_fh = _setup_logfile(Path(script_dir) if script_dir else Path(__file__).resolve().parents[1])
+        old_out, old_err = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = _TeeTextIO(old_out, log_fh), _TeeTextIO(old_err, log_fh)
+        print(f"Logfil: {log_path}")
+    try:
+        main(argv, script_dir=script_dir)
+    except Exception as e:
+        print("\nFEJL:", e)
+        if log_fh:
+            import traceback
+            traceback.print_exc()
+            print(f"\nDetaljer er gemt i logfilen: {log_path}")
+        if sys.stdin.isatty():
+            input("Tryk Enter for at afslutte...")
+        raise
+    finally:
+        if log_fh:
+            sys.stdout, sys.stderr = old_out, old_err
+            log_fh.close()
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Hurtig validering af et simpelt DAISY 2.02-filsæt (ncc.html + SMIL + MP3).
+
+Hver fil scannes præcis én gang: id'er samles i et indeks, og alle referencer
+(NCC -> SMIL#par, SMIL -> ncc.html#p, SMIL -> lyd, master.smil -> SMIL) gemmes
+og slås op bagefter. Valideringen er dermed lineær i filsættets størrelse.
+
+    python daisy_validate.py <daisy-mappe>
+"""
+
+import re, sys
+from pathlib import Path
+
+REQUIRED_META = ("dc:title", "dc:identifier", "dc:format", "ncc:charset", "ncc:tocItems", "ncc:files")
+RECOMMENDED_META = ("dc:language", "dc:date", "ncc:generator", "ncc:multimediaType")
+CLIP_TOLERANCE_S = 0.5
+
+_TAG = re.compile(r"<([A-Za-z][\w:.-]*)\b([^>]*)>")
+_ATTR = re.compile(r'([\w:.-]+)\s*=\s*"([^"]*)"')
+_CLOCK = re.compile(r"^(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)$")
+
+
+def parse_clock(value: str) -> float | None:
+    """SMIL-tid ('npt=12.3s', '12.3s', '1500ms', 'hh:mm:ss.sss') -> sekunder."""
+    v = (value or "").strip()
+    if v.startswith("npt="):
+        v = v[4:]
+    try:
+        if v.endswith("ms"):
+            return float(v[:-2]) / 1000.0
+        if v.endswith("s"):
+            return float(v[:-1])
+        if v.endswith("h"):
+            return float(v[:-1]) * 3600.0
+        m = _CLOCK.match(v)
+        if m:
+            h, mi, sec = m.groups()
+            return int(h or 0) * 3600 + int(mi) * 60 + float(sec)
+        return float(v)
+    except ValueError:
+        return None
+
+
+def _split_ref(ref: str) -> tuple[str, str]:
+    name, _, frag = (ref or "").partition("#")
+    return name, frag
+
+
+class ValidationReport:
+    def __init__(self, daisy_dir: Path):
+        self.daisy_dir = daisy_dir
+        self.errors: list[str] = []
+        self.warnings: list[str] = []
+        self.files_checked = 0
+        self.refs_checked = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def error(self, msg: str):
+        self.errors.append(msg)
+
+    def warn(self, msg: str):
+        self.warnings.append(msg)
+
+    def summary(self, limit: int = 20) -> str:
+        lines = [f"DAISY-validering af {self.daisy_dir}: {self.files_checked} filer, "
+                 f"{self.refs_checked} referencer, {len(self.errors)} fejl, {len(self.warnings)} advarsler"]
+        lines += [f"  FEJL: {e}" for e in self.errors[:limit]]
+        if len(self.errors) > limit:
+            lines.append(f"  ... og {len(self.errors) - limit} fejl mere")
+        lines += [f"  ADVARSEL: {w}" for w in self.warnings[:limit]]
+        return "\n".join(lines)
+
+
+def _scan(data: str):
+    """Én gennemgang af en fil -> liste af (tag, attrs)."""
+    for m in _TAG.finditer(data):
+        yield m.group(1).lower(), dict(_ATTR.findall(m.group(2)))
+
+
+def _audio_duration(path: Path) -> float | None:
+    try:
+        from mutagen.mp3 import MP3  # valgfri
+    except Exception:
+        return None
+    try:
+        return float(MP3(str(path)).info.length)
+    except Exception:
+        return None
+
+
+def validate_manifest(manifest: list[tuple[str, bytes | Path]], *,
+                      durations: dict[str, float] | None = None, label: str = "(manifest)") -> ValidationReport:
+    """Validér et virtuelt filsæt (se DaisyFileset.manifest) uden at skrive det til disk."""
+    texts, audio = {}, {}
+    for name, content in manifest:
+        if isinstance(content, (bytes, bytearray)):
+            texts[name] = bytes(content).decode("utf-8", errors="replace")
+        else:
+            audio[name] = Path(content)
+    return validate_fileset(Path(label), durations=durations, read_texts=texts, audio_paths=audio, on_disk=False)
+
+
+def validate_fileset(daisy_dir: Path, *, durations: dict[str, float] | None = None,
+                     read_texts: dict[str, str] | None = None,
+                     audio_paths: dict[str, Path] | None = None, on_disk: bool = True) -> ValidationReport:
+    """Validér filsættet i daisy_dir.
+
+    durations: kendte lydvarigheder (sek.) pr. filnavn; ellers læses de med mutagen hvis muligt.
+    read_texts: genererede tekstfiler i hukommelsen (navn -> indhold), så de ikke læses fra disk.
+    audio_paths: lydfiler der ligger uden for daisy_dir (navn -> kildefil).
+    on_disk: False = kun read_texts/audio_paths (daisy_dir er bare et navn i rapporten og læses ikke).
+    """
+    rep = ValidationReport(daisy_dir)
+    read_texts = read_texts or {}
+    audio_paths = audio_paths or {}
+    durations = dict(durations or {})
+
+    existing = {p.name for p in daisy_dir.iterdir() if p.is_file()} if on_disk and daisy_dir.is_dir() else set()
+    existing.update(read_texts)
+    existing.update(name for name, p in audio_paths.items() if p.is_file())
+
+    def read(name: str) -> str | None:
+        if name in read_texts:
+            return read_texts[name]
+        if not on_disk:
+            return None
+        try:
+            return (daisy_dir / name).read_text(encoding="utf-8", errors="replace")
+        except OSError:
+            return None
+
+    ids: dict[str, set[str]] = {}           # fil -> id'er
+    refs: list[tuple[str, str, str]] = []   # (fra-fil, mål-fil, fragment)
+    clips: list[tuple[str, str, float | None, float | None]] = []  # (smil, lyd, begin, end)
+
+    ncc = read("ncc.html")
+    if ncc is None:
+        rep.error("ncc.html mangler")
+        return rep
+
+    # --- NCC ---
+    meta = {}
+    smil_queue = []
+    ncc_ids = ids.setdefault("ncc.html", set())
+    for tag, attrs in _scan(ncc):
+        if "id" in attrs:
+            ncc_ids.add(attrs["id"])
+        if tag == "meta" and "name" in attrs:
+            meta[attrs["name"]] = attrs.get("content", "")
+        elif tag == "a" and "href" in attrs:
+            target, frag = _split_ref(attrs["href"])
+            if target and "://" not in target:
+                refs.append(("ncc.html", target, frag))
+                if target.lower().endswith(".smil") and target not in ids:
+                    ids[target] = set()
+                    smil_queue.append(target)
+    rep.files_checked += 1
+
+    for name in REQUIRED_META:
+        if not (meta.get(name) or "").strip():
+            rep.error(f"ncc.html mangler påkrævet metadata '{name}'")
+    for name in RECOMMENDED_META:
+        if not (meta.get(name) or "").strip():
+            rep.warn(f"ncc.html mangler metadata '{name}'")
+
+    # --- master.smil (valgfri) ---
+    if "master.smil" in existing:
+        for tag, attrs in _scan(read("master.smil") or ""):
+            if tag == "ref" and "src" in attrs:
+                target, frag = _split_ref(attrs["src"])
+                refs.append(("master.smil", target, frag))
+                if target not in ids:
+                    ids[target] = set()
+                    smil_queue.append(target)
+        rep.files_checked += 1
+
+    # --- SMIL ---
+    audio_used = set()
+    for smil in smil_queue:
+        data = read(smil)
+        if data is None:
+            continue  # rapporteres som brudt reference nedenfor
+        smil_ids = ids[smil]
+        for tag, attrs in _scan(data):
+            if "id" in attrs:
+                smil_ids.add(attrs["id"])
+            if tag == "text" and "src" in attrs:
+                target, frag = _split_ref(attrs["src"])
+                refs.append((smil, target, frag))
+            elif tag == "audio" and "src" in attrs:
+                src = attrs["src"]
+                refs.append((smil, src, ""))
+                audio_used.add(src)
+                begin = parse_clock(attrs["clip-begin"]) if "clip-begin" in attrs else 0.0
+                end = parse_clock(attrs["clip-end"]) if "clip-end" in attrs else None
+                if begin is None or ("clip-end" in attrs and end is None):
+                    rep.error(f"{smil}: ugyldig clip-tid for {src}")
+                    continue
+                clips.append((smil, src, begin, end))
+        rep.files_checked += 1
+
+    # --- Referencer (opslag i id-indekset) ---
+    for src_file, target, frag in refs:
+        rep.refs_checked += 1
+        if target not in existing:
+            rep.error(f"{src_file}: peger på manglende fil '{target}'")
+            continue
+        if frag and frag not in ids.get(target, ()):
+            rep.error(f"{src_file}: '{target}#{frag}' findes ikke")
+
+    # --- Clip-grænser mod lydvarighed ---
+    for smil, src, begin, end in clips:
+        if src not in existing:
+            continue
+        if end is not None and end < begin:
+            rep.error(f"{smil}: clip-end ({end:.3f}s) før clip-begin ({begin:.3f}s) for {src}")
+        if src not in durations:
+            path = audio_paths.get(src) or (daisy_dir / src if on_disk else None)
+            d = _audio_duration(path) if path else None
+            if d is None:
+                continue
+            durations[src] = d
+        dur = durations[src]
+        if begin > dur + CLIP_TOLERANCE_S or (end is not None and end > dur + CLIP_TOLERANCE_S):
+            rep.error(f"{smil}: clip ({begin:.3f}-{end if end is not None else begin:.3f}s) "
+                      f"ud over lydens længde {dur:.3f}s for {src}")
+    rep.files_checked += len(audio_used & existing)
+
+    # --- ncc:files mod faktisk antal ---
+    declared = (meta.get("ncc:files") or "").strip()
+    if declared.isdigit():
+        actual = 1 + ("master.smil" in existing) + len(smil_queue) + len(audio_used)
+        if int(declared) != actual:
+            rep.warn(f"ncc:files={declared}, men filsættet refererer {actual} filer")
+
+    return rep
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Brug: python daisy_validate.py <daisy-mappe>")
+        return 2
+    rep = validate_fileset(Path(argv[0]))
+    print(rep.summary())
+    return 0 if rep.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
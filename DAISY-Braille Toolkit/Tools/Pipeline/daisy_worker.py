@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Resident Python-worker: JSON-RPC 2.0 over stdin/stdout til GUI'en (eller andre værter).
+
+Processen startes én gang og holder v15.1-scriptet, requests-sessionen (keep-alive
+til ElevenLabs), python-docx/mutagen, liblouis, voices.json/settings.json og
+Pipeline 2-forbindelsen varme mellem jobs - opstartstiden betales kun én gang.
+
+Protokol: én JSON-besked pr. linje (UTF-8) i begge retninger.
+    -> {"jsonrpc": "2.0", "id": 1, "method": "process", "params": {...}}
+    <- {"jsonrpc": "2.0", "method": "log", "params": {"id": 1, "text": "[bog.docx] CSV: ..."}}
+    <- {"jsonrpc": "2.0", "id": 1, "result": {...}}
+Ved start sendes notifikationen "ready" ({"version", "pid"}). Alt scriptet
+printer, sendes som "log" med id'et på det kald det hører til, og
+progress_events sendes som "progress" ({"id", "event", "t", ...}). Op til
+WORKER_THREADS (standard 2) kald køres samtidig; svar kommer når kaldet er færdigt.
+
+Metoder (params):
+    ping      -                                          -> version, pid, aktive kald
+    reload    -                                          genlæs settings/voices/secrets
+    process   som en bog i daisy_batch-manifestet (input, mode, lang, voice, output,
+              metadata) + resume                         -> resumé-post som daisy_batch
+    extract   input, [output], [max_chars]               -> tekst (eller fil) og afsnit
+    tts       text, voice, output, [model]               -> mp3 (via TTS-cachen)
+    build     label, audio[], texts[], output, [lang], [pars_per_smil]
+                                                         -> DAISY 2.02-filsæt + validering
+    iso       source, output, label                      -> ISO + checksummer
+    pef       input, output, lang, [table]               -> PEF (+ evt. opdeling/BRF)
+    shutdown  -                                          afslut når aktive kald er færdige
+
+    python daisy_worker.py [--settings settings.json]
+"""
+
+import argparse, io, json, os, shutil, sys, tempfile, threading, time, traceback
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import daisy_batch
+import iso_manifest
+import metrics
+import progress_events
+
+PARSE_ERROR, INVALID_REQUEST, METHOD_NOT_FOUND, INVALID_PARAMS = -32700, -32600, -32601, -32602
+JOB_FAILED = -32000
+DEFAULT_THREADS = 2
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data=None):
+        super().__init__(message)
+        self.code = code
+        self.data = data
+
+
+class _LogStream(io.TextIOBase):
+    """Erstatter sys.stdout: hele linjer sendes som "log"-notifikationer (stdout er protokollen)."""
+
+    def __init__(self, worker: "Worker"):
+        self.worker = worker
+        self._local = threading.local()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        buf = getattr(self._local, "buf", "") + s
+        *lines, self._local.buf = buf.split("\n")
+        for line in lines:
+            self.worker.notify("log", id=self.worker.current_id(), text=line)
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+def _param(params: dict, name: str, default=None, *, required: bool = False):
+    value = params.get(name, default)
+    if required and (value is None or value == ""):
+        raise RpcError(INVALID_PARAMS, f"'{name}' mangler")
+    return value
+
+
+class Worker:
+    def __init__(self, script_dir: Path, settings_path: Path | None, out, *, base_dir: Path):
+        self.script_dir = script_dir
+        self.settings_path = settings_path or script_dir / "settings.json"
+        self.base_dir = base_dir
+        self._out = out
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._active: set = set()
+        self._active_lock = threading.Lock()
+        self.started = time.monotonic()
+        self.stopping = threading.Event()
+        self.script = daisy_batch._load_script(script_dir)
+        self.reload()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, int(self.settings.get("WORKER_THREADS") or DEFAULT_THREADS)))
+
+    # --- tilstand ---
+    def reload(self):
+        s = self.script
+        self.settings = s.load_optional_json(self.settings_path, default={})
+        secrets = s.load_optional_json(self.script_dir / "secrets.json", default={})
+        self.api_key = (os.environ.get("ELEVEN_API_KEY") or secrets.get("ELEVEN_API_KEY") or "").strip()
+        self.voices = s.normalize_voices(s.load_optional_json(self.script_dir / "voices.json", default=None))
+        self.options = daisy_batch.engine_options(s, self.script_dir, self.settings, self.api_key)
+
+    def current_id(self):
+        rid = getattr(self._local, "id", None)
+        if rid is None:
+            # print fra en hjælpetråd (fx DAISY/PEF-grenene): entydigt hvis kun ét kald er i gang
+            with self._active_lock:
+                if len(self._active) == 1:
+                    rid = next(iter(self._active))
+        return rid
+
+    # --- I/O ---
+    def send(self, msg: dict):
+        data = (json.dumps(msg, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+        with self._write_lock:
+            self._out.write(data)
+            self._out.flush()
+
+    def notify(self, method: str, **params):
+        self.send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def progress(self, rec: dict):
+        self.notify("progress", id=self.current_id(), **rec)
+
+    def _reply(self, rid, result=None, error: RpcError | None = None):
+        if rid is None:
+            return                      # notifikation fra værten: intet svar
+        msg = {"jsonrpc": "2.0", "id": rid}
+        if error is None:
+            msg["result"] = result
+        else:
+            msg["error"] = {"code": error.code, "message": str(error)}
+            if error.data is not None:
+                msg["error"]["data"] = error.data
+        self.send(msg)
+
+    def handle_line(self, line: str):
+        try:
+            msg = json.loads(line)
+        except ValueError as e:
+            return self.send({"jsonrpc": "2.0", "id": None,
+                              "error": {"code": PARSE_ERROR, "message": f"ugyldig JSON: {e}"}})
+        if not isinstance(msg, dict) or not isinstance(msg.get("method"), str):
+            return self.send({"jsonrpc": "2.0", "id": msg.get("id") if isinstance(msg, dict) else None,
+                              "error": {"code": INVALID_REQUEST, "message": "forventer et objekt med 'method'"}})
+        rid, method, params = msg.get("id"), msg["method"], msg.get("params") or {}
+        fn = getattr(self, "rpc_" + method, None)
+        if fn is None:
+            return self._reply(rid, error=RpcError(METHOD_NOT_FOUND, f"ukendt metode: {method}"))
+        if not isinstance(params, dict):
+            return self._reply(rid, error=RpcError(INVALID_PARAMS, "params skal være et objekt"))
+        if method in ("ping", "shutdown"):
+            return self._run(rid, fn, params)          # svar med det samme, også når alle tråde er optaget
+        self.pool.submit(self._run, rid, fn, params)
+
+    def _run(self, rid, fn, params: dict):
+        self._local.id = rid
+        with self._active_lock:
+            self._active.add(rid)
+        try:
+            result = fn(params)
+        except RpcError as e:
+            self._reply(rid, error=e)
+        except daisy_batch.ManifestError as e:
+            self._reply(rid, error=RpcError(INVALID_PARAMS, str(e), e.errors))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            self._reply(rid, error=RpcError(JOB_FAILED, f"{type(e).__name__}: {e}"))
+        else:
+            self._reply(rid, result)
+        finally:
+            with self._active_lock:
+                self._active.discard(rid)
+            self._local.id = None
+
+    def serve(self, inp):
+        self.notify("ready", version=self.script.__version__, pid=os.getpid())
+        for raw in inp:
+            line = raw.decode("utf-8-sig").strip()
+            if line:
+                self.handle_line(line)
+            if self.stopping.is_set():
+                break
+        self.pool.shutdown(wait=True)
+
+    # --- metoder ---
+    def _path(self, value) -> Path:
+        p = Path(value)
+        return p if p.is_absolute() else (self.base_dir / p).resolve()
+
+    def _voice(self, wanted: str):
+        voice = daisy_batch.find_voice(self.voices, wanted, self.script.get_voice_id)
+        if voice is None:
+            raise RpcError(INVALID_PARAMS, f"ukendt eller tvetydig stemme '{wanted}'")
+        return voice
+
+    def rpc_ping(self, params: dict) -> dict:
+        with self._active_lock:
+            active = len(self._active) - 1
+        return {"version": self.script.__version__, "pid": os.getpid(),
+                "uptime": round(time.monotonic() - self.started, 1), "active": active}
+
+    def rpc_reload(self, params: dict) -> dict:
+        self.reload()
+        return {"voices": len(self.voices)}
+
+    def rpc_shutdown(self, params: dict) -> dict:
+        self.stopping.set()
+        return {"ok": True}
+
+    def rpc_process(self, params: dict) -> dict:
+        book = daisy_batch.merge_book({}, params)
+        jobs = daisy_batch.validate([book], base_dir=self.base_dir, settings=self.settings, voices=self.voices,
+                                    api_key=self.api_key, script=self.script)
+        options = dict(self.options, resume=bool(params.get("resume")))
+        # label trækkes i process_one_file (resume genbruger jobbets gemte)
+        return daisy_batch.run_job(jobs[0], "", script=self.script, options=options)
+
+    def rpc_extract(self, params: dict) -> dict:
+        src = self._path(_param(params, "input", required=True))
+        out = params.get("output")
+        work = None if out else Path(tempfile.mkdtemp(prefix="extract_"))
+        text_file = self._path(out) if out else work / "input.txt"
+        try:
+            text = self.script.extract(src, text_file)
+        finally:
+            if work:
+                shutil.rmtree(work, ignore_errors=True)
+        paragraphs = self.script.segment(text, int(params.get("max_chars") or self.options["max_tts_chars"]))
+        result = {"chars": len(text), "paragraphs": paragraphs}
+        if out:
+            result["output"] = str(text_file)
+        else:
+            result["text"] = text
+        return result
+
+    def rpc_tts(self, params: dict) -> dict:
+        s, text = self.script, _param(params, "text", required=True)
+        voice_id = s.get_voice_id(self._voice(_param(params, "voice", required=True)))
+        model_id = params.get("model") or self.options["model_id"]
+        out = self._path(_param(params, "output", required=True))
+        if not self.api_key:
+            raise RpcError(INVALID_PARAMS, "ELEVEN_API_KEY mangler")
+        out.parent.mkdir(parents=True, exist_ok=True)
+        fetched = s.synthesise_segment(text, out, api_key=self.api_key, voice_id=voice_id, model_id=model_id,
+                                       cache_dir=self.options["cache_dir"] if self.options["use_tts_cache"] else None)
+        return {"output": str(out), "cached": not fetched, "bytes": out.stat().st_size}
+
+    def rpc_build(self, params: dict) -> dict:
+        audio = [self._path(p) for p in _param(params, "audio", required=True)]
+        texts = _param(params, "texts", required=True)
+        if len(audio) != len(texts):
+            raise RpcError(INVALID_PARAMS, f"{len(audio)} lydfiler men {len(texts)} tekster")
+        label = _param(params, "label", required=True)
+        out = self._path(_param(params, "output", required=True))
+        try:
+            fileset = self.script.build_daisy(
+                label, audio, texts, params.get("lang") or "",
+                pars_per_smil=int(params.get("pars_per_smil") or self.settings.get("SMIL_PARS_PER_FILE") or 1))
+        except self.script.InvalidFilesetError as e:
+            report = e.report
+        else:
+            report = fileset.report
+            fileset.write(out)
+        return {"output": str(out), "ok": report.ok, "errors": report.errors, "warnings": report.warnings}
+
+    def rpc_iso(self, params: dict) -> dict:
+        src = self._path(_param(params, "source", required=True))
+        out = self._path(_param(params, "output", required=True))
+        label = _param(params, "label", required=True)
+        hasher = iso_manifest.ImageHasher()
+        try:
+            self.script.create_iso(self.options["iso_cmd"], src, out, label, hasher=hasher)
+        finally:
+            hasher.close()
+        sums = hasher.result() if hasher.size else iso_manifest.hash_existing(out, src)
+        iso_manifest.write_manifest(out, sums, volume_label=label)
+        return {"output": str(out), "sha256": sums["sha256"], "md5": sums["md5"], "size": sums["size"]}
+
+    def rpc_pef(self, params: dict) -> dict:
+        s = self.script
+        src = self._path(_param(params, "input", required=True))
+        out = self._path(_param(params, "output", required=True))
+        lang = _param(params, "lang", required=True)
+        settings = self.settings
+        if params.get("table"):
+            # eksplicit tabel til dette kald: som om settings havde den for sproget
+            tables = dict(settings.get("BRAILLE_TABLE_BY_LANG") or {}, **{lang: params["table"]})
+            settings = dict(settings, BRAILLE_TABLE_BY_LANG=tables)
+        if not s.braille_table_for(settings, lang):
+            raise RpcError(INVALID_PARAMS, f"ingen BRAILLE_TABLE_BY_LANG for '{lang}'")
+        work = Path(tempfile.mkdtemp(prefix="pef_work_"))
+        try:
+            text_file = work / "input.txt"
+            if src.suffix.lower() != ".docx":
+                s.extract(src, text_file)
+            # make_pef deler Pipeline 2-klienten pr. URL (dp2_client.get_client), så sessionen forbliver varm
+            s.make_pef(src, out, text_file=text_file, lang=lang, settings=settings, script_dir=self.script_dir,
+                       work=work)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+        return {"output": str(out)}
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--settings", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    script_dir = Path(__file__).resolve().parent
+    base_dir = Path.cwd()
+    settings_path = args.settings.resolve() if args.settings else None
+    # relative stier i settings (fx CACHE_DIR) er relative til script-mappen
+    os.chdir(script_dir)
+    worker = Worker(script_dir, settings_path, sys.stdout.buffer, base_dir=base_dir)
+    sys.stdout = _LogStream(worker)
+    progress_events.configure(worker.progress)
+    metrics.configure(worker.settings, script_dir)
+    worker.serve(sys.stdin.buffer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
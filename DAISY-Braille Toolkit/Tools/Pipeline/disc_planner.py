@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Kapacitetsplanlægning: fordel en DAISY-bog på flere diske, før der mastres.
+
+Imagets størrelse forudsiges ud fra lydfilernes bytestørrelser og teksternes
+længde (NCC/SMIL) plus ISO/Joliet/UDF-overhead pr. fil. Er bogen for stor til
+mediet, deles den ved SMIL-grænser, så hver disk er et gyldigt filsæt, og
+diskene udlignes, så den sidste ikke bliver en næsten tom rest.
+"""
+
+import html, math
+
+from iso_writer import SECTOR, plan_layout
+
+# skrivbare sektorer (2048 bytes) pr. medie
+MEDIA_SECTORS = {
+    "cd74": 333_000,          # 650 MB
+    "cd": 359_846,            # 700 MB / 80 min
+    "dvd": 2_295_104,         # DVD±R 4.7 GB
+    "dvd-dl": 4_171_712,      # DVD-R DL 8.5 GB
+    "bd": 12_219_392,         # BD-R 25 GB
+    "bd-dl": 24_438_784,      # BD-R DL 50 GB
+}
+SAFETY_SECTORS = 1024         # 2 MB luft til afrunding/metadata
+
+FILE_RECORD_BYTES = 384       # ISO 9660 + Joliet dir-record + UDF FID pr. fil (rundet op)
+NCC_BYTES_PER_SEGMENT = 220   # <div><a ...> + <p id><a ...> uden selve teksten
+SMIL_BYTES_PER_PAR = 220
+SMIL_BYTES_PER_FILE = 120
+MASTER_BYTES_PER_REF = 48
+
+_fixed_sectors = None
+
+
+def capacity_sectors(medium) -> int:
+    """'cd' / 'dvd' / 'bd' ... eller et antal bytes -> brugbare sektorer (minus sikkerhedsmargin)."""
+    if isinstance(medium, str) and medium.strip().lower() in MEDIA_SECTORS:
+        total = MEDIA_SECTORS[medium.strip().lower()]
+    else:
+        try:
+            total = int(medium) // SECTOR
+        except (TypeError, ValueError):
+            raise ValueError(f"Ukendt medie: {medium!r}. Brug {', '.join(MEDIA_SECTORS)} eller et antal bytes.")
+    return total - SAFETY_SECTORS
+
+
+def _fixed() -> int:
+    """Overhead uden filer (system area, volume descriptors, UDF-ankre, rodmapper)."""
+    global _fixed_sectors
+    if _fixed_sectors is None:
+        _fixed_sectors = plan_layout([], "X").total_sectors + 4   # + ncc/master-mapper i værste fald
+    return _fixed_sectors
+
+
+def _sectors(n: float) -> int:
+    return int(math.ceil(n / SECTOR))
+
+
+def group_costs(mp3_sizes: list[int], text_chunks: list[str], pars_per_smil: int) -> list[tuple[int, int, int, int]]:
+    """(første, sidste, sektorer, ncc-bytes) pr. SMIL-gruppe (afsnit er 1-baserede)."""
+    n = min(len(mp3_sizes), len(text_chunks))
+    out = []
+    for first in range(1, n + 1, pars_per_smil):
+        last = min(n, first + pars_per_smil - 1)
+        sectors = 0
+        ncc_bytes = 0
+        smil_bytes = SMIL_BYTES_PER_FILE
+        for i in range(first, last + 1):
+            sectors += _sectors(mp3_sizes[i-1]) + 1          # data + UDF file entry
+            text = html.escape((text_chunks[i-1] or "").strip())
+            ncc_bytes += len(text.encode("utf-8")) + NCC_BYTES_PER_SEGMENT
+            smil_bytes += SMIL_BYTES_PER_PAR
+        # SMIL-filen selv + dir-records for lyd og SMIL + ref i master.smil
+        sectors += _sectors(smil_bytes) + 1
+        sectors += _sectors((last - first + 2) * FILE_RECORD_BYTES + MASTER_BYTES_PER_REF)
+        out.append((first, last, sectors, ncc_bytes))
+    return out
+
+
+def _estimate(group_sectors: int, ncc_bytes: int) -> int:
+    # ncc.html (metadata + overskrifter + tekst) og master.smil, hver med UDF file entry
+    return _fixed() + group_sectors + _sectors(4096 + ncc_bytes) + 1 + 2
+
+
+def estimate_sectors(groups: list[tuple[int, int, int, int]]) -> int:
+    """Forudsagt imagestørrelse (sektorer) for en disk med disse grupper."""
+    return _estimate(sum(g[2] for g in groups), sum(g[3] for g in groups))
+
+
+def _split(groups, limit: int) -> list[list]:
+    """Grådig opdeling: fyld hver disk op til limit sektorer."""
+    discs, cur = [], []
+    sectors = ncc = 0
+    for g in groups:
+        if cur and _estimate(sectors + g[2], ncc + g[3]) > limit:
+            discs.append(cur)
+            cur, sectors, ncc = [], 0, 0
+        cur.append(g)
+        sectors += g[2]
+        ncc += g[3]
+    if cur:
+        discs.append(cur)
+    return discs
+
+
+def plan_volumes(mp3_sizes: list[int], text_chunks: list[str], pars_per_smil: int,
+                 capacity: int) -> list[tuple[int, int]]:
+    """Del bogen i (første, sidste) afsnit pr. disk, så hver disk holder sig under capacity sektorer."""
+    pars_per_smil = max(1, int(pars_per_smil or 1))
+    groups = group_costs(mp3_sizes, text_chunks, pars_per_smil)
+    if not groups:
+        return []
+    for g in groups:
+        if estimate_sectors([g]) > capacity:
+            raise ValueError(f"Afsnit {g[0]}-{g[1]} fylder alene mere end mediet ({capacity} sektorer)")
+
+    discs = _split(groups, capacity)
+    if len(discs) > 1:
+        # udlign: mindste grænse der stadig giver samme antal diske
+        lo, hi = estimate_sectors(groups) // len(discs), capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if len(_split(groups, mid)) <= len(discs):
+                hi = mid
+            else:
+                lo = mid + 1
+        discs = _split(groups, lo)
+    return [(d[0][0], d[-1][1]) for d in discs]
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Klient til DAISY Pipeline 2 som web-service (/ws), i stedet for dp2 pr. kald.
+
+Hvert `dp2 <script>`-kald betaler JVM/Pipeline-opstart (ofte 10-30 s). Her
+startes serveren højst én gang (dovent, ved første job) og genbruges for hele
+batchen; jobs sendes med POST /ws/jobs, status polles, og resultat-zip'en
+hentes og pakkes ud i output-mappen. Har serveren adgang til det lokale
+filsystem (localfs), sendes stier som file://-URI'er, ellers uploades input
+som zip (multipart).
+
+Kun standardbiblioteket bruges. Til test: dp2_stub_server.py.
+"""
+
+import atexit, base64, datetime, hashlib, hmac, io, os, secrets, shlex, subprocess, threading, time, uuid, zipfile
+import urllib.error, urllib.parse, urllib.request
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+NS = "http://www.daisy.org/ns/pipeline/data"
+DEFAULT_URL = "http://localhost:8181/ws"
+START_TIMEOUT_S = 180
+POLL_MIN_S, POLL_MAX_S = 0.2, 2.0
+DONE_STATES = ("SUCCESS", "DONE", "ERROR", "FAIL")
+
+_clients: dict[str, "Dp2Client"] = {}
+_clients_lock = threading.Lock()
+
+
+class Dp2Error(RuntimeError):
+    pass
+
+
+def _q(tag: str) -> str:
+    return f"{{{NS}}}{tag}"
+
+
+class Dp2Client:
+    """Forbindelse til én Pipeline 2-server. Thread-safe; serveren startes ved behov."""
+
+    def __init__(self, base_url: str = DEFAULT_URL, *, server_cmd: str | list[str] | None = None,
+                 auth_id: str = "", secret: str = "", start_timeout: float = START_TIMEOUT_S,
+                 job_timeout: float | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.server_cmd = server_cmd
+        self.auth_id = auth_id
+        self.secret = secret
+        self.start_timeout = start_timeout
+        self.job_timeout = job_timeout
+        self.localfs = False
+        self.version = ""
+        self._proc: subprocess.Popen | None = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    # ----- HTTP -----
+    def _url(self, path: str, query: dict | None = None) -> str:
+        url = path if path.startswith("http") else self.base_url + path
+        params = dict(query or {})
+        if self.auth_id and self.secret:
+            params.update(authid=self.auth_id,
+                          time=datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                          nonce=secrets.token_hex(15))
+        if params:
+            url += ("&" if "?" in url else "?") + urllib.parse.urlencode(params)
+        if self.auth_id and self.secret:
+            sign = hmac.new(self.secret.encode(), url.encode(), hashlib.sha1).digest()
+            url += "&" + urllib.parse.urlencode({"sign": base64.b64encode(sign).decode()})
+        return url
+
+    def _request(self, method: str, path: str, *, data: bytes | None = None, content_type: str = "",
+                 timeout: float = 60) -> tuple[int, dict, bytes]:
+        req = urllib.request.Request(self._url(path), data=data, method=method)
+        if content_type:
+            req.add_header("Content-Type", content_type)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return resp.status, dict(resp.headers), resp.read()
+        except urllib.error.HTTPError as e:
+            body = e.read().decode("utf-8", errors="replace")[:500]
+            raise Dp2Error(f"Pipeline 2 {method} {path}: HTTP {e.code} {body}") from None
+
+    # ----- Server -----
+    def alive(self) -> bool:
+        try:
+            _, _, body = self._request("GET", "/alive", timeout=5)
+        except (OSError, Dp2Error):
+            return False
+        try:
+            root = ET.fromstring(body)
+            self.version = root.get("version") or ""
+            self.localfs = (root.get("localfs") or "").lower() == "true" or \
+                (root.get("mode") == "local" and root.get("localfs") is None)
+        except ET.ParseError:
+            pass
+        return True
+
+    def ensure_running(self):
+        """Start serveren første gang der er brug for den (hvis den ikke allerede kører)."""
+        with self._lock:
+            if self._ready:
+                return
+            if not self.alive():
+                if not self.server_cmd:
+                    raise Dp2Error(f"Pipeline 2-serveren svarer ikke på {self.base_url} "
+                                   f"(og DAISY_PIPELINE_SERVER_CMD er ikke sat)")
+                cmd = self.server_cmd
+                if isinstance(cmd, str):
+                    cmd = shlex.split(cmd, posix=(os.name != "nt"))
+                flags = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+                self._proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                              stderr=subprocess.DEVNULL, creationflags=flags)
+                atexit.register(self.shutdown)
+                deadline = time.monotonic() + self.start_timeout
+                while not self.alive():
+                    if self._proc.poll() is not None:
+                        raise Dp2Error(f"Pipeline 2-serveren stoppede under opstart (exit {self._proc.returncode})")
+                    if time.monotonic() > deadline:
+                        raise Dp2Error(f"Pipeline 2-serveren startede ikke inden for {self.start_timeout:.0f} s")
+                    time.sleep(0.5)
+            self._ready = True
+
+    def shutdown(self):
+        """Stop serveren, hvis det var os der startede den."""
+        proc, self._proc = self._proc, None
+        self._ready = False
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    # ----- Jobs -----
+    def _job_request(self, script: str, inputs: dict[str, str], options: dict[str, str]) -> bytes:
+        root = ET.Element(_q("jobRequest"))
+        ET.SubElement(root, _q("scriptHref")).text = f"{self.base_url}/scripts/{script}"
+        ET.SubElement(root, _q("nicename")).text = script
+        ET.SubElement(root, _q("priority")).text = "medium"
+        for name, value in inputs.items():
+            el = ET.SubElement(root, _q("input"), name=name)
+            ET.SubElement(el, _q("item"), value=value)
+        for name, value in options.items():
+            ET.SubElement(root, _q("option"), name=name).text = str(value)
+        return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+    def submit(self, script: str, *, inputs: dict[str, Path], options: dict[str, str] | None = None,
+               context_dir: Path | None = None) -> str:
+        """Opret et job og returnér dets id.
+
+        context_dir: mappe der uploades med (fx billeder ved siden af en DTBook), når
+        serveren ikke kan læse det lokale filsystem.
+        """
+        self.ensure_running()
+        options = options or {}
+        if self.localfs:
+            refs = {name: Path(p).resolve().as_uri() for name, p in inputs.items()}
+            status, headers, body = self._request("POST", "/jobs", data=self._job_request(script, refs, options),
+                                                  content_type="application/xml")
+        else:
+            buf = io.BytesIO()
+            refs = {}
+            with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+                for name, p in inputs.items():
+                    p = Path(p)
+                    base = Path(context_dir) if context_dir else p.parent
+                    refs[name] = p.relative_to(base).as_posix()
+                    if context_dir:
+                        for f in sorted(base.rglob("*")):
+                            if f.is_file():
+                                z.write(f, f.relative_to(base).as_posix())
+                    else:
+                        z.write(p, refs[name])
+            boundary = uuid.uuid4().hex
+            parts = []
+            for field, ctype, payload in (("job-request", "application/xml", self._job_request(script, refs, options)),
+                                          ("job-data", "application/zip", buf.getvalue())):
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{field}"\r\n'
+                             f"Content-Type: {ctype}\r\n\r\n".encode() + payload + b"\r\n")
+            data = b"".join(parts) + f"--{boundary}--\r\n".encode()
+            status, headers, body = self._request("POST", "/jobs", data=data,
+                                                  content_type=f"multipart/form-data; boundary={boundary}")
+        try:
+            job_id = ET.fromstring(body).get("id")
+        except ET.ParseError:
+            job_id = None
+        if not job_id:
+            raise Dp2Error(f"Pipeline 2 returnerede intet job-id (HTTP {status})")
+        return job_id
+
+    def status(self, job_id: str) -> tuple[str, list[str]]:
+        """(status, fejlbeskeder) for jobbet."""
+        _, _, body = self._request("GET", f"/jobs/{job_id}")
+        root = ET.fromstring(body)
+        errors = [m.get("content") or (m.text or "") for m in root.iter(_q("message"))
+                  if (m.get("level") or "").upper() in ("ERROR", "FATAL")]
+        return (root.get("status") or "").upper(), errors
+
+    def wait(self, job_id: str) -> str:
+        delay = POLL_MIN_S
+        deadline = time.monotonic() + self.job_timeout if self.job_timeout else None
+        while True:
+            state, errors = self.status(job_id)
+            if state in DONE_STATES:
+                if state not in ("SUCCESS", "DONE"):
+                    detail = "; ".join(e for e in errors if e)[:1000] or "ingen detaljer"
+                    raise Dp2Error(f"Pipeline 2-job {job_id} fejlede ({state}): {detail}")
+                return state
+            if deadline and time.monotonic() > deadline:
+                raise Dp2Error(f"Pipeline 2-job {job_id} blev ikke færdigt inden for {self.job_timeout:.0f} s")
+            time.sleep(delay)
+            delay = min(POLL_MAX_S, delay * 1.5)
+
+    def download(self, job_id: str, out_dir: Path):
+        """Hent resultat-zip'en og pak den ud i out_dir."""
+        _, _, body = self._request("GET", f"/jobs/{job_id}/result", timeout=600)
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(io.BytesIO(body)) as z:
+            for info in z.infolist():
+                target = (out_dir / info.filename).resolve()
+                if out_dir.resolve() not in target.parents and target != out_dir.resolve():
+                    raise Dp2Error(f"Ugyldig sti i resultat-zip: {info.filename}")
+            z.extractall(out_dir)
+
+    def delete(self, job_id: str):
+        try:
+            self._request("DELETE", f"/jobs/{job_id}")
+        except (OSError, Dp2Error):
+            pass   # oprydning er best effort
+
+    def run(self, script: str, *, inputs: dict[str, Path], options: dict[str, str] | None = None,
+            out_dir: Path, context_dir: Path | None = None):
+        """submit + wait + download + delete - svarer til `dp2 <script> ... -o out_dir`."""
+        job_id = self.submit(script, inputs=inputs, options=options, context_dir=context_dir)
+        try:
+            self.wait(job_id)
+            self.download(job_id, out_dir)
+        finally:
+            self.delete(job_id)
+
+
+def get_client(base_url: str = DEFAULT_URL, **kwargs) -> Dp2Client:
+    """Delt klient pr. URL, så serveren startes én gang pr. proces/batch."""
+    key = base_url.rstrip("/")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = Dp2Client(base_url, **kwargs)
+        return client
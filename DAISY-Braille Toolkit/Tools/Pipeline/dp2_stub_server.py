@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Lokal stand-in for DAISY Pipeline 2's web-service (til test uden Java/Pipeline).
+
+Implementerer den del af /ws som dp2_client bruger: alive, scripts, jobs (XML
+eller multipart med zip), status, resultat-zip og delete. Scripts "kører" på
+en baggrundstråd og laver simple, men gyldige resultater:
+
+    word-to-dtbook            -> output-dir/dtbook.xml
+    dtbook-to-pef/html-to-pef -> output-dir/<navn>.pef (tekst som 6-punkt unicode-braille)
+
+    python dp2_stub_server.py [--port 8181] [--delay 0.2] [--remote]
+
+--remote slår localfs fra, så klienten uploader input som zip.
+"""
+
+import argparse, email, email.policy, html, io, re, tempfile, threading, time, uuid, zipfile
+import urllib.parse, urllib.request
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+NS = "http://www.daisy.org/ns/pipeline/data"
+SCRIPTS = ("word-to-dtbook", "dtbook-to-pef", "html-to-pef")
+
+# a-z -> punkt 1-6 (grundbogstaver), resten som mellemrum; nok til en stand-in
+_LETTERS = "a1b12c14d145e15f124g1245h125i24j245k13l123m134n1345o135p1234q12345r1235s234t2345u136v1236w2456x1346y13456z1356"
+_BRAILLE = {m.group(1): chr(0x2800 + sum(1 << (int(d) - 1) for d in m.group(2)))
+            for m in re.finditer(r"([a-z])(\d+)", _LETTERS)}
+
+
+def _to_braille(text: str) -> str:
+    return "".join(_BRAILLE.get(c, "⠀") for c in text.lower())
+
+
+def _pef(rows: list[str], title: str) -> str:
+    pages, page = [], []
+    for r in rows:
+        page.append(f"<row>{html.escape(r)}</row>")
+        if len(page) == 25:
+            pages.append(page)
+            page = []
+    if page or not pages:
+        pages.append(page)
+    body = "".join("<page>" + "".join(p) + "</page>" for p in pages)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<pef version="2008-1" xmlns="http://www.daisy.org/ns/2008/pef">'
+            '<head><meta xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f"<dc:format>application/x-pef+xml</dc:format><dc:title>{html.escape(title)}</dc:title>"
+            "<dc:identifier>stub</dc:identifier></meta></head>"
+            '<body><volume cols="40" rows="25" rowgap="0" duplex="false"><section>'
+            f"{body}</section></volume></body></pef>\n")
+
+
+def _text_of(path: Path) -> str:
+    if path.suffix.lower() == ".docx":
+        with zipfile.ZipFile(path) as z:
+            xml = z.read("word/document.xml").decode("utf-8", errors="replace")
+        return "\n".join(re.sub(r"<[^>]+>", "", p) for p in re.findall(r"<w:p[ >].*?</w:p>", xml, re.S))
+    raw = path.read_text(encoding="utf-8", errors="replace")
+    return html.unescape(re.sub(r"<[^>]+>", "\n", raw))
+
+
+class Job:
+    def __init__(self, script: str, source: Path, options: dict, workdir: Path):
+        self.id = uuid.uuid4().hex
+        self.script = script
+        self.source = source
+        self.options = options
+        self.workdir = workdir
+        self.status = "IDLE"
+        self.messages: list[tuple[str, str]] = []
+        self.result: bytes | None = None
+
+    def run(self, delay: float):
+        self.status = "RUNNING"
+        time.sleep(delay)
+        try:
+            if not self.source.is_file():
+                raise FileNotFoundError(f"source findes ikke: {self.source.name}")
+            text = _text_of(self.source)
+            paras = [p.strip() for p in text.split("\n") if p.strip()]
+            out = {}
+            if self.script == "word-to-dtbook":
+                body = "".join(f"<p>{html.escape(p)}</p>" for p in paras)
+                out["output-dir/dtbook.xml"] = (
+                    '<?xml version="1.0" encoding="UTF-8"?>\n<dtbook xmlns="http://www.daisy.org/z3986/2005/dtbook/" '
+                    f'version="2005-3"><book><bodymatter><level1>{body}</level1></bodymatter></book></dtbook>\n')
+            else:
+                if not (self.options.get("braille-code") or "").strip():
+                    raise ValueError("braille-code mangler")
+                rows = [_to_braille(p)[i:i+40] for p in paras for i in range(0, max(1, len(p)), 40)]
+                out[f"output-dir/{self.source.stem}.pef"] = _pef(rows, self.source.stem)
+            buf = io.BytesIO()
+            with zipfile.ZipFile(buf, "w") as z:
+                for name, data in out.items():
+                    z.writestr(name, data)
+            self.result = buf.getvalue()
+            self.status = "SUCCESS"
+        except Exception as e:
+            self.messages.append(("ERROR", str(e)))
+            self.status = "ERROR"
+
+    def xml(self, base: str) -> bytes:
+        root = ET.Element(f"{{{NS}}}job", id=self.id, href=f"{base}/jobs/{self.id}", status=self.status)
+        ET.SubElement(root, f"{{{NS}}}script", href=f"{base}/scripts/{self.script}")
+        if self.messages:
+            msgs = ET.SubElement(root, f"{{{NS}}}messages")
+            for level, content in self.messages:
+                ET.SubElement(msgs, f"{{{NS}}}message", level=level, content=content)
+        if self.result is not None:
+            ET.SubElement(root, f"{{{NS}}}results", href=f"{base}/jobs/{self.id}/result", mimeType="application/zip")
+        return ET.tostring(root, encoding="utf-8", xml_declaration=True)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, *, delay: float = 0.2, localfs: bool = True):
+        super().__init__(addr, _Handler)
+        self.delay = delay
+        self.localfs = localfs
+        self.jobs: dict[str, Job] = {}
+        self.root = Path(tempfile.mkdtemp(prefix="dp2_stub_"))
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/ws"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, code: int, body: bytes = b"", ctype: str = "application/xml", headers: dict | None = None):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _path(self) -> list[str]:
+        return [p for p in urllib.parse.urlsplit(self.path).path.split("/") if p]
+
+    def do_GET(self):
+        parts = self._path()
+        base = self.server.base_url
+        if parts == ["ws", "alive"]:
+            alive = ET.Element(f"{{{NS}}}alive", authentication="false", mode="local" if self.server.localfs else "remote",
+                               localfs=str(self.server.localfs).lower(), version="stub")
+            return self._send(200, ET.tostring(alive, encoding="utf-8", xml_declaration=True))
+        if parts == ["ws", "scripts"]:
+            root = ET.Element(f"{{{NS}}}scripts")
+            for s in SCRIPTS:
+                ET.SubElement(root, f"{{{NS}}}script", id=s, href=f"{base}/scripts/{s}")
+            return self._send(200, ET.tostring(root, encoding="utf-8", xml_declaration=True))
+        if len(parts) >= 3 and parts[:2] == ["ws", "jobs"]:
+            job = self.server.jobs.get(parts[2])
+            if job is None:
+                return self._send(404)
+            if parts[3:] == ["result"]:
+                if job.result is None:
+                    return self._send(404)
+                return self._send(200, job.result, "application/zip")
+            if not parts[3:]:
+                return self._send(200, job.xml(base))
+        self._send(404)
+
+    def do_DELETE(self):
+        parts = self._path()
+        if len(parts) == 3 and parts[:2] == ["ws", "jobs"] and self.server.jobs.pop(parts[2], None):
+            return self._send(204)
+        self._send(404)
+
+    def do_POST(self):
+        if self._path() != ["ws", "jobs"]:
+            return self._send(404)
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        ctype = self.headers.get("Content-Type") or ""
+        workdir = Path(tempfile.mkdtemp(dir=self.server.root))
+        try:
+            if ctype.startswith("multipart/"):
+                msg = email.message_from_bytes(f"Content-Type: {ctype}\r\n\r\n".encode() + body,
+                                               policy=email.policy.HTTP)
+                fields = {p.get_param("name", header="content-disposition"): p.get_payload(decode=True)
+                          for p in msg.iter_parts()}
+                request = fields["job-request"]
+                with zipfile.ZipFile(io.BytesIO(fields["job-data"])) as z:
+                    z.extractall(workdir)
+            else:
+                request = body
+            root = ET.fromstring(request)
+            script = root.findtext(f"{{{NS}}}scriptHref", "").rstrip("/").rsplit("/", 1)[-1]
+            if script not in SCRIPTS:
+                return self._send(400, f"ukendt script: {script}".encode(), "text/plain")
+            item = root.find(f"{{{NS}}}input[@name='source']/{{{NS}}}item")
+            value = item.get("value") if item is not None else ""
+            if value.startswith("file:"):
+                source = Path(urllib.request.url2pathname(urllib.parse.urlsplit(value).path))
+            else:
+                source = workdir / value
+            options = {o.get("name"): (o.text or "") for o in root.findall(f"{{{NS}}}option")}
+        except (KeyError, ET.ParseError, zipfile.BadZipFile) as e:
+            return self._send(400, f"ugyldig jobRequest: {e}".encode(), "text/plain")
+
+        job = Job(script, source, options, workdir)
+        self.server.jobs[job.id] = job
+        threading.Thread(target=job.run, args=(self.server.delay,), daemon=True).start()
+        self._send(201, job.xml(self.server.base_url), headers={"Location": f"{self.server.base_url}/jobs/{job.id}"})
+
+
+def serve_in_thread(port: int = 0, **kwargs) -> StubServer:
+    """Start en stub-server på en baggrundstråd (port 0 = vilkårlig ledig port)."""
+    server = StubServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8181)
+    ap.add_argument("--delay", type=float, default=0.2, help="simuleret jobtid i sekunder")
+    ap.add_argument("--remote", action="store_true", help="ingen localfs (klienten uploader zip)")
+    args = ap.parse_args(argv)
+    server = StubServer(("127.0.0.1", args.port), delay=args.delay, localfs=not args.remote)
+    print(f"Pipeline 2 stub på {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Lokal stand-in for ElevenLabs' TTS-API (til test og benchmark uden net og uden kreditter).
+
+Implementerer det scriptet bruger: POST /v1/text-to-speech/<voice_id> (-> MP3)
+og GET /v1/voices. Lyden er gyldige, tavse MPEG-1 Layer III-frames, hvis
+længde følger teksten (--chars-per-second), så mutagen/daisy_validate kan måle
+varigheder. Svartid og throttling kan stilles, så klientens keep-alive, retry
+og parallelitet kan måles:
+
+    --latency 0.3         sekunder pr. kald (første byte)
+    --per-char 0.0002     ekstra sekunder pr. tegn (generering)
+    --concurrency 2       flere samtidige kald end dette -> 429 (som abonnementets grænse)
+    --throttle-every 10   hvert 10. kald -> 429
+    --retry-after 0.1     Retry-After i 429-svar
+
+    python elevenlabs_stub_server.py [--port 8183] [...]
+    -> ELEVEN_API_BASE = http://127.0.0.1:8183
+"""
+
+import argparse, json, math, threading, time, urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_RATE = 44100
+SAMPLES_PER_FRAME = 1152
+# MPEG-1 Layer III bitrate-index
+_BITRATES = {32: 1, 40: 2, 48: 3, 56: 4, 64: 5, 80: 6, 96: 7, 112: 8, 128: 9, 160: 10, 192: 11, 224: 12, 256: 13, 320: 14}
+VOICES = [
+    {"voice_id": "stubDaVoice000000001", "name": "Stub Dansk", "labels": [{"language": "da"}]},
+    {"voice_id": "stubEnVoice000000002", "name": "Stub English", "labels": [{"language": "en"}]},
+]
+
+
+def silent_mp3(seconds: float, kbps: int = 128) -> bytes:
+    """Tavse CBR-frames (44,1 kHz mono) på ca. `seconds` sekunder."""
+    header = bytes((0xFF, 0xFB, _BITRATES[kbps] << 4, 0xC4))
+    frame_len = 144 * kbps * 1000 // SAMPLE_RATE
+    frames = max(1, math.ceil(seconds * SAMPLE_RATE / SAMPLES_PER_FRAME))
+    return (header + b"\0" * (frame_len - 4)) * frames
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, *, latency: float = 0.0, per_char: float = 0.0, concurrency: int = 0,
+                 throttle_every: int = 0, retry_after: float = 0.1, chars_per_second: float = 15.0,
+                 kbps: int = 128):
+        super().__init__(addr, _Handler)
+        self.latency = latency
+        self.per_char = per_char
+        self.concurrency = concurrency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.chars_per_second = chars_per_second
+        self.kbps = kbps
+        self.lock = threading.Lock()
+        self.requests = 0             # TTS-kald i alt (også throttlede)
+        self.throttled = 0
+        self.bytes_sent = 0
+        self.active = 0
+        self.max_active = 0
+        self.connections = 0          # TCP-forbindelser (keep-alive: færre end kald)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"requests": self.requests, "throttled": self.throttled, "bytes": self.bytes_sent,
+                    "max_active": self.max_active, "connections": self.connections}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubServer
+    protocol_version = "HTTP/1.1"     # keep-alive som det rigtige API
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, code: int, body: bytes = b"", ctype: str = "application/json", headers: dict | None = None):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, code: int, obj):
+        self._send(code, json.dumps(obj).encode("utf-8"))
+
+    def _path(self) -> list[str]:
+        return [p for p in urllib.parse.urlsplit(self.path).path.split("/") if p]
+
+    def do_GET(self):
+        if not self.headers.get("xi-api-key"):
+            return self._json(401, {"detail": {"status": "invalid_api_key"}})
+        if self._path() == ["v1", "voices"]:
+            return self._json(200, {"voices": VOICES})
+        self._json(404, {"detail": "not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        parts = self._path()
+        if len(parts) != 3 or parts[:2] != ["v1", "text-to-speech"]:
+            return self._json(404, {"detail": "not found"})
+        if not self.headers.get("xi-api-key"):
+            return self._json(401, {"detail": {"status": "invalid_api_key"}})
+        try:
+            text = json.loads(body or b"{}")["text"]
+        except (ValueError, KeyError, TypeError):
+            return self._json(422, {"detail": "text mangler"})
+
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+            throttle = ((srv.throttle_every and srv.requests % srv.throttle_every == 0)
+                        or (srv.concurrency and srv.active >= srv.concurrency))
+            if throttle:
+                srv.throttled += 1
+            else:
+                srv.active += 1
+                srv.max_active = max(srv.max_active, srv.active)
+        if throttle:
+            return self._send(429, b'{"detail": {"status": "too_many_concurrent_requests"}}',
+                              headers={"Retry-After": f"{srv.retry_after:g}"})
+        audio = b""
+        try:
+            time.sleep(srv.latency + srv.per_char * len(text))
+            audio = silent_mp3(len(text) / srv.chars_per_second, srv.kbps)
+        finally:
+            with srv.lock:
+                srv.active -= 1
+                srv.bytes_sent += len(audio)
+        self._send(200, audio, "audio/mpeg")
+
+
+def serve_in_thread(port: int = 0, **kwargs) -> StubServer:
+    """Start en stub-server på en baggrundstråd (port 0 = vilkårlig ledig port)."""
+    server = StubServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8183)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--per-char", type=float, default=0.0)
+    ap.add_argument("--concurrency", type=int, default=0)
+    ap.add_argument("--throttle-every", type=int, default=0)
+    ap.add_argument("--retry-after", type=float, default=0.1)
+    ap.add_argument("--chars-per-second", type=float, default=15.0)
+    ap.add_argument("--kbps", type=int, default=128, choices=sorted(_BITRATES))
+    args = ap.parse_args(argv)
+    server = StubServer(("127.0.0.1", args.port), latency=args.latency, per_char=args.per_char,
+                        concurrency=args.concurrency, throttle_every=args.throttle_every,
+                        retry_after=args.retry_after, chars_per_second=args.chars_per_second, kbps=args.kbps)
+    print(f"ElevenLabs stub på {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
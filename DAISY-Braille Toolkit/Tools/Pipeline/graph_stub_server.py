@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Lokal stand-in for Microsoft Graph's SharePoint-lister (til test af sharepoint_sync).
+
+Implementerer det sharepoint_sync bruger: site-opslag via sti, lister, items
+(POST, PATCH fields med If-Match, DELETE), items/delta med nextLink/deltaLink
+og $batch (højst 20 underkald). Alt ligger i hukommelsen; server.requests
+tæller HTTP-kald, så man kan se hvor mange requests en synkronisering koster.
+
+    python graph_stub_server.py [--port 8182] [--throttle 7]
+    -> GRAPH_BASE_URL = http://127.0.0.1:8182/v1.0
+
+--throttle N svarer 429 på hvert N'te underkald i $batch (test af retry).
+"""
+
+import argparse, json, re, threading, urllib.parse, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BATCH_MAX = 20
+PAGE_SIZE = 200
+
+
+class StubGraph:
+    def __init__(self, lists=("DBT_Productions", "DBT_Counters"), *, throttle_every: int = 0):
+        self.site_id = "stub.sharepoint.com," + uuid.uuid4().hex
+        self.lists = {uuid.uuid4().hex: {"name": name, "items": {}} for name in lists}
+        self.seq = 0                  # global ændringsnummer (delta-token)
+        self.throttle_every = throttle_every
+        self.batch_calls = 0
+        self.lock = threading.Lock()
+
+    def _touch(self, item: dict):
+        self.seq += 1
+        item["seq"] = self.seq
+        item["eTag"] = f'"{item["id"]},{self.seq}"'
+
+    def _public(self, item: dict) -> dict:
+        return {"id": item["id"], "eTag": item["eTag"], "fields": dict(item["fields"], id=item["id"])}
+
+    def handle(self, method: str, url: str, body, headers: dict, base: str) -> tuple[int, dict]:
+        """Ét Graph-kald (også underkald i $batch). url er relativ til /v1.0."""
+        parts = urllib.parse.urlsplit(url)
+        path, query = parts.path, urllib.parse.parse_qs(parts.query)
+        with self.lock:
+            if re.fullmatch(r"/sites/[^/]+:/.*:", path) and method == "GET":
+                return 200, {"id": self.site_id}
+            m = re.fullmatch(r"/sites/([^/]+)/lists", path)
+            if m and method == "GET":
+                return 200, {"value": [{"id": lid, "displayName": l["name"]} for lid, l in self.lists.items()]}
+            m = re.fullmatch(r"/sites/([^/]+)/lists/([^/]+)/items(?:/([^/]+))?(/fields)?", path)
+            if not m or m.group(1) != self.site_id or m.group(2) not in self.lists:
+                return 404, {"error": {"code": "itemNotFound", "message": path}}
+            items = self.lists[m.group(2)]["items"]
+            item_id, fields_part = m.group(3), m.group(4)
+            if item_id == "delta" and method == "GET":
+                return self._delta(items, query, base + path)
+            if item_id is None and method == "POST":
+                new_id = str(max((int(i) for i in items), default=0) + 1)
+                item = items[new_id] = {"id": new_id, "fields": dict((body or {}).get("fields") or {})}
+                self._touch(item)
+                return 201, self._public(item)
+            item = items.get(item_id or "")
+            if item is None or item.get("removed"):
+                return 404, {"error": {"code": "itemNotFound", "message": item_id}}
+            if method == "PATCH" and fields_part:
+                want = headers.get("If-Match") or headers.get("if-match")
+                if want and want != item["eTag"]:
+                    return 412, {"error": {"code": "preconditionFailed", "message": "eTag passer ikke"}}
+                item["fields"].update(body or {})
+                self._touch(item)
+                return 200, dict(item["fields"], **{"@odata.etag": item["eTag"]})
+            if method == "DELETE" and not fields_part:
+                item["removed"] = True
+                self._touch(item)
+                return 204, {}
+            if method == "GET":
+                return 200, self._public(item)
+        return 405, {"error": {"code": "methodNotAllowed", "message": method}}
+
+    def _delta(self, items: dict, query: dict, url: str) -> tuple[int, dict]:
+        since = int((query.get("token") or ["0"])[0])
+        skip = int((query.get("skip") or ["0"])[0])
+        changed = sorted((i for i in items.values() if i["seq"] > since), key=lambda i: i["seq"])
+        page = changed[skip:skip + PAGE_SIZE]
+        value = [{"id": i["id"], "@removed": {"reason": "deleted"}} if i.get("removed") else self._public(i)
+                 for i in page]
+        out = {"value": value}
+        if skip + PAGE_SIZE < len(changed):
+            out["@odata.nextLink"] = f"{url}?token={since}&skip={skip + PAGE_SIZE}"
+        else:
+            out["@odata.deltaLink"] = f"{url}?token={self.seq}"
+        return 200, out
+
+    def batch(self, body: dict, base: str) -> tuple[int, dict]:
+        reqs = (body or {}).get("requests") or []
+        if len(reqs) > BATCH_MAX:
+            return 400, {"error": {"code": "invalidRequest", "message": f"højst {BATCH_MAX} underkald pr. $batch"}}
+        responses = []
+        for r in reqs:
+            self.batch_calls += 1
+            if self.throttle_every and self.batch_calls % self.throttle_every == 0:
+                responses.append({"id": r["id"], "status": 429, "headers": {"Retry-After": "0"}, "body": {}})
+                continue
+            status, out = self.handle(r["method"], r["url"], r.get("body"), r.get("headers") or {}, base)
+            responses.append({"id": r["id"], "status": status, "headers": {}, "body": out})
+        return 200, {"responses": responses}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, **kwargs):
+        super().__init__(addr, _Handler)
+        self.graph = StubGraph(**kwargs)
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/v1.0"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _dispatch(self, method: str):
+        self.server.requests += 1
+        if not self.path.startswith("/v1.0/"):
+            return self._send(404, {})
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            return self._send(401, {"error": {"code": "InvalidAuthenticationToken", "message": "token mangler"}})
+        url = self.path[len("/v1.0"):]
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = json.loads(raw) if raw else None
+        base = self.server.base_url
+        if url == "/$batch" and method == "POST":
+            status, out = self.server.graph.batch(body, base)
+        else:
+            status, out = self.server.graph.handle(method, url, body, dict(self.headers), base)
+        self._send(status, out)
+
+    def _send(self, code: int, body: dict):
+        data = json.dumps(body).encode("utf-8") if code != 204 else b""
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+def serve_in_thread(port: int = 0, **kwargs) -> StubServer:
+    """Start en stub-server på en baggrundstråd (port 0 = vilkårlig ledig port)."""
+    server = StubServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--port", type=int, default=8182)
+    ap.add_argument("--throttle", type=int, default=0, help="429 på hvert N'te underkald i $batch")
+    args = ap.parse_args(argv)
+    server = StubServer(("127.0.0.1", args.port), throttle_every=args.throttle)
+    print(f"Graph stub på {server.base_url} (site-URL: https://stub.sharepoint.com/sites/dbt)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Hot folder: overvåger DEFAULT_ROOT og laver bøgerne, så snart de er lagt i en undermappe.
+
+Operatøren lægger .docx/.txt i en undermappe af roden (som i det interaktive
+script). En fil tages først, når størrelse og ændringstid har stået stille i
+HOTFOLDER_SETTLE_S sekunder og den kan åbnes (en .docx skal desuden være et
+helt zip-arkiv), så halvt kopierede filer aldrig sendes videre. Færdige filer
+køres igen, hvis de ændres bagefter.
+
+Indstillinger pr. bog (samme felter som en bog i daisy_batch-manifestet:
+mode, lang, voice, output, metadata) flettes i rækkefølgen
+    settings.json HOTFOLDER_DEFAULTS < <undermappe>/hotfolder.json < <bog>.json
+
+På Linux vækkes scanneren af inotify; ellers (Windows, netværksdrev) scannes
+hvert HOTFOLDER_POLL_S sekund. Jobs går gennem en begrænset kø
+(HOTFOLDER_QUEUE) til HOTFOLDER_WORKERS arbejdere. Tilstanden ligger i
+hot_folder.sqlite, så jobs der var i kø eller i gang ved et stop tages op
+igen ved næste start.
+
+    python hot_folder.py [--root DIR] [--workers 2] [--once] [--events fremdrift.jsonl] [--metrics-port 9464]
+    python hot_folder.py --status          (vis tilstand)
+    python hot_folder.py --retry           (fejlede/ugyldige prøves igen)
+"""
+
+import argparse, ctypes, ctypes.util, datetime, json, os, queue, select, signal, sqlite3, sys, threading, time, zipfile
+from pathlib import Path
+
+import daisy_batch
+import metrics
+import progress_events
+
+SUFFIXES = (".txt", ".docx")
+FOLDER_SIDECAR = "hotfolder.json"
+STATE_DB = "hot_folder.sqlite"
+DEFAULT_SETTLE_S = 10.0
+DEFAULT_POLL_S = 30.0
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE = 8
+# Word-låsefiler og skjulte filer
+IGNORE_PREFIXES = ("~$", ".")
+# pending -> queued -> running -> done/failed; invalid = sidecar/defaults kan ikke valideres
+ACTIVE = ("queued", "running")
+FINISHED = ("done", "failed", "invalid")
+
+
+class StateStore:
+    """Filernes tilstand (sti, signatur, status) - overlever genstart."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.con = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self.con.row_factory = sqlite3.Row
+        self.con.execute("PRAGMA journal_mode=WAL")
+        self.con.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, sig TEXT NOT NULL, "
+                         "status TEXT NOT NULL, updated TEXT, label TEXT, error TEXT, summary TEXT)")
+
+    def get(self, path: Path) -> sqlite3.Row | None:
+        with self.lock:
+            return self.con.execute("SELECT * FROM files WHERE path = ?", (str(path),)).fetchone()
+
+    def set(self, path: Path, status: str, *, sig: str | None = None, **fields):
+        cols = {"status": status, "updated": datetime.datetime.now().isoformat(timespec="seconds"), **fields}
+        with self.lock:
+            if sig is not None:
+                self.con.execute("INSERT INTO files(path, sig, status) VALUES(?, ?, ?) "
+                                 "ON CONFLICT(path) DO UPDATE SET sig = excluded.sig", (str(path), sig, status))
+            self.con.execute(f"UPDATE files SET {', '.join(f'{k} = ?' for k in cols)} WHERE path = ?",
+                             (*cols.values(), str(path)))
+
+    def recover(self) -> int:
+        """Jobs der var i kø/i gang da processen stoppede, skal køres igen."""
+        with self.lock:
+            return self.con.execute(f"UPDATE files SET status = 'pending' WHERE status IN {ACTIVE}").rowcount
+
+    def retry(self) -> int:
+        with self.lock:
+            return self.con.execute("UPDATE files SET status = 'pending' "
+                                    "WHERE status IN ('failed', 'invalid')").rowcount
+
+    def rows(self) -> list[sqlite3.Row]:
+        with self.lock:
+            return self.con.execute("SELECT * FROM files ORDER BY updated").fetchall()
+
+    def close(self):
+        self.con.close()
+
+
+class _Inotify:
+    """Minimal inotify via libc (ingen afhængigheder); bruges kun til at vække scanneren."""
+    # IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    MASK = 0x002 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.watched: set[str] = set()
+
+    def sync(self, dirs: list[Path]):
+        wanted = {str(d) for d in dirs}
+        # slettede mapper fjerner kernen selv; glem dem, så de overvåges igen hvis de kommer tilbage
+        self.watched &= wanted
+        for d in wanted - self.watched:
+            if self._libc.inotify_add_watch(self.fd, os.fsencode(d), self.MASK) >= 0:
+                self.watched.add(d)
+
+    def wait(self, timeout: float) -> bool:
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if ready:
+            self._drain()
+        return bool(ready)
+
+    def _drain(self):
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _open_notifier():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify()
+    except (OSError, AttributeError):
+        return None
+
+
+def _sidecar_sig(path: Path) -> str:
+    try:
+        return str(path.stat().st_mtime_ns)
+    except OSError:
+        return "-"
+
+
+def _ready(path: Path) -> bool:
+    # åben for læsning (Windows nægter mens Stifinder kopierer) og tjek at en .docx er et helt zip
+    try:
+        with path.open("rb") as f:
+            f.read(1)
+        return path.suffix.lower() != ".docx" or zipfile.is_zipfile(path)
+    except OSError:
+        return False
+
+
+class HotFolder:
+    def __init__(self, root: Path, *, script, script_dir: Path, settings: dict, api_key: str,
+                 voices: list[dict], store: StateStore, workers: int = DEFAULT_WORKERS,
+                 queue_size: int = DEFAULT_QUEUE, settle: float = DEFAULT_SETTLE_S, poll: float = DEFAULT_POLL_S):
+        self.root = Path(root)
+        self.script = script
+        self.script_dir = script_dir
+        self.settings = settings
+        self.api_key = api_key
+        self.voices = voices
+        self.store = store
+        self.settle = settle
+        self.poll = poll
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.settling: dict[Path, tuple[str, float]] = {}
+        self.stop = threading.Event()
+        # en bog der blev afbrudt (genstart, fejl) fortsætter fra sin jobmappe
+        self.options = daisy_batch.engine_options(script, script_dir, settings, api_key, resume=True)
+        self._sync_lock = threading.Lock()
+        self.workers = [threading.Thread(target=self._worker, name=f"hotfolder-{k}", daemon=True)
+                        for k in range(max(1, workers))]
+
+    # --- scanning ---
+    def folders(self) -> list[Path]:
+        try:
+            return sorted(p for p in self.root.iterdir() if p.is_dir() and not p.name.startswith("."))
+        except OSError:
+            return []
+
+    def candidates(self, folders: list[Path]):
+        for folder in folders:
+            try:
+                entries = list(folder.iterdir())
+            except OSError:
+                continue
+            for p in entries:
+                if p.suffix.lower() in SUFFIXES and not p.name.startswith(IGNORE_PREFIXES) and p.is_file():
+                    yield p
+
+    def signature(self, path: Path) -> str | None:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        # sidecars indgår, så en rettet hotfolder.json/<bog>.json også udløser en ny kørsel
+        return ":".join((str(st.st_size), str(st.st_mtime_ns), _sidecar_sig(path.with_suffix(".json")),
+                         _sidecar_sig(path.parent / FOLDER_SIDECAR)))
+
+    def scan(self, folders: list[Path] | None = None):
+        now = time.monotonic()
+        seen = set()
+        for path in self.candidates(self.folders() if folders is None else folders):
+            seen.add(path)
+            sig = self.signature(path)
+            if sig is None:
+                continue
+            row = self.store.get(path)
+            if row is not None and (row["status"] in ACTIVE or (row["sig"] == sig and row["status"] in FINISHED)):
+                self.settling.pop(path, None)
+                continue
+            prev = self.settling.get(path)
+            if prev is None or prev[0] != sig:
+                self.settling[path] = (sig, now)
+                continue
+            if now - prev[1] < self.settle or not _ready(path):
+                continue
+            if self.enqueue(path, sig):
+                del self.settling[path]
+        for gone in set(self.settling) - seen:
+            del self.settling[gone]
+
+    def next_timeout(self) -> float:
+        if not self.settling:
+            return self.poll
+        now = time.monotonic()
+        due = min(first + self.settle - now for _, first in self.settling.values())
+        return min(self.poll, max(0.2, due))
+
+    # --- kø ---
+    def book_for(self, path: Path) -> dict:
+        book = dict(self.settings.get("HOTFOLDER_DEFAULTS") or {})
+        for sidecar in (path.parent / FOLDER_SIDECAR, path.with_suffix(".json")):
+            if sidecar.exists():
+                data = json.loads(sidecar.read_text(encoding="utf-8-sig"))
+                if not isinstance(data, dict):
+                    raise ValueError(f"{sidecar.name} skal være et JSON-objekt")
+                book = daisy_batch.merge_book(book, data)
+        return daisy_batch.merge_book(book, {"input": str(path)})
+
+    def enqueue(self, path: Path, sig: str) -> bool:
+        try:
+            jobs = daisy_batch.validate([self.book_for(path)], base_dir=path.parent, settings=self.settings,
+                                        voices=self.voices, api_key=self.api_key, script=self.script)
+        except (daisy_batch.ManifestError, OSError, ValueError) as e:
+            errors = e.errors if isinstance(e, daisy_batch.ManifestError) else [str(e)]
+            self.store.set(path, "invalid", sig=sig, error="; ".join(errors))
+            print(f"[{path.name}] ugyldig: {'; '.join(errors)}")
+            return True
+        # status skrives før put, så en arbejder aldrig overskrives af "queued"
+        self.store.set(path, "queued", sig=sig, error=None)
+        try:
+            self.queue.put_nowait((path, jobs[0]))
+        except queue.Full:
+            self.store.set(path, "pending")
+            return False
+        print(f"[{path.name}] i kø ({self.queue.qsize()}/{self.queue.maxsize})")
+        progress_events.emit("queue", source="hot_folder", depth=self.queue.qsize(), capacity=self.queue.maxsize)
+        return True
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                path, job = item
+                self.store.set(path, "running")
+                progress_events.emit("queue", source="hot_folder", depth=self.queue.qsize(),
+                                     capacity=self.queue.maxsize)
+                # altid resume: process_one_file genbruger jobbets gemte label eller trækker et nyt
+                entry = daisy_batch.run_job(job, "", script=self.script, options=self.options)
+                self.store.set(path, "done" if entry["status"] == "ok" else "failed",
+                               label=", ".join(entry.get("labels") or []), error=entry["error"],
+                               summary=json.dumps(entry, ensure_ascii=False))
+                print(f"[{path.name}] {entry['status']}" + (f": {entry['error']}" if entry["error"] else ""))
+                if self.settings.get("SHAREPOINT_SYNC"):
+                    with self._sync_lock:
+                        self.script.sync_sharepoint(self.script_dir, self.settings)
+            except Exception as e:
+                print(f"ADVARSEL: hot folder-arbejder: {e}")
+                self.store.set(path, "failed", error=f"{type(e).__name__}: {e}")
+            finally:
+                self.queue.task_done()
+
+    # --- løkke ---
+    def idle(self) -> bool:
+        return not self.settling and self.queue.unfinished_tasks == 0
+
+    def run(self, *, once: bool = False):
+        recovered = self.store.recover()
+        if recovered:
+            print(f"{recovered} afbrudte jobs tages op igen.")
+        notifier = _open_notifier()
+        print(f"Overvåger {self.root} ({'inotify' if notifier else f'scanning hvert {self.poll:g}s'}, "
+              f"{len(self.workers)} arbejdere, kø {self.queue.maxsize}) ...")
+        for t in self.workers:
+            t.start()
+        try:
+            while not self.stop.is_set():
+                folders = self.folders()
+                if notifier:
+                    notifier.sync([self.root] + folders)
+                self.scan(folders)
+                if once and self.idle():
+                    break
+                timeout = min(self.next_timeout(), 1.0) if once else self.next_timeout()
+                if notifier:
+                    if notifier.wait(timeout):
+                        # en kopi giver mange events: saml dem før næste scanning
+                        self.stop.wait(0.2)
+                        notifier.wait(0)
+                else:
+                    self.stop.wait(timeout)
+        finally:
+            self.shutdown()
+            if notifier:
+                notifier.close()
+
+    def shutdown(self):
+        # jobs der stadig ligger i køen forbliver "queued" og tages op ved næste start
+        while True:
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+            except queue.Empty:
+                break
+        for _ in self.workers:
+            self.queue.put(None)
+        for t in self.workers:
+            if t.is_alive():
+                t.join()
+
+
+def open_state(script_dir: Path, settings: dict) -> StateStore:
+    path = Path(settings.get("HOTFOLDER_DB") or STATE_DB)
+    return StateStore(path if path.is_absolute() else script_dir / path)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--root", type=Path, default=None, help="standard: HOTFOLDER_ROOT eller DEFAULT_ROOT")
+    ap.add_argument("--settings", type=Path, default=None, help="settings.json (standard: ved scriptet)")
+    ap.add_argument("--workers", type=int, default=0)
+    ap.add_argument("--once", action="store_true", help="behandl det der ligger nu og stop")
+    ap.add_argument("--status", action="store_true")
+    ap.add_argument("--retry", action="store_true")
+    ap.add_argument("--events", default=None,
+                    help="fremdrifts-events som JSON lines til denne fil ('-' = stderr; standard: PROGRESS_EVENTS)")
+    ap.add_argument("--metrics-port", type=int, default=None,
+                    help="Prometheus /metrics på 127.0.0.1:<port> (standard: METRICS_PORT; 0 = fra)")
+    args = ap.parse_args(argv)
+
+    script_dir = Path(__file__).resolve().parent
+    script = daisy_batch._load_script(script_dir)
+    settings = script.load_optional_json(args.settings.resolve() if args.settings
+                                         else script_dir / "settings.json", default={})
+    store = open_state(script_dir, settings)
+    if args.status:
+        for row in store.rows():
+            print(f"{row['status']:8} {row['updated'] or '':19} {row['label'] or '':16} {row['path']}"
+                  + (f"  ({row['error']})" if row["error"] else ""))
+        return 0
+    if args.retry:
+        print(f"{store.retry()} filer prøves igen ved næste scanning.")
+        return 0
+
+    root = (args.root or Path(settings.get("HOTFOLDER_ROOT") or settings.get("DEFAULT_ROOT")
+                              or script.DEFAULT_ROOT)).resolve()
+    if not root.is_dir():
+        print(f"FEJL: roden findes ikke: {root}")
+        return 2
+    secrets = script.load_optional_json(script_dir / "secrets.json", default={})
+    api_key = (os.environ.get("ELEVEN_API_KEY") or secrets.get("ELEVEN_API_KEY") or "").strip()
+    voices = script.normalize_voices(script.load_optional_json(script_dir / "voices.json", default=None))
+    if args.events:
+        progress_events.configure(args.events if args.events == "-" else Path(args.events).resolve())
+    else:
+        progress_events.configure_from_settings(settings, script_dir)
+    metrics.configure(settings, script_dir)
+    port = args.metrics_port if args.metrics_port is not None else int(settings.get("METRICS_PORT") or 0)
+    if port:
+        server = metrics.serve_in_thread(port)
+        print(f"Metrikker: http://127.0.0.1:{server.server_address[1]}/metrics")
+    # relative stier i settings (fx CACHE_DIR) er relative til script-mappen
+    os.chdir(script_dir)
+
+    hot = HotFolder(root, script=script, script_dir=script_dir, settings=settings, api_key=api_key,
+                    voices=voices, store=store,
+                    workers=args.workers or int(settings.get("HOTFOLDER_WORKERS") or DEFAULT_WORKERS),
+                    queue_size=int(settings.get("HOTFOLDER_QUEUE") or DEFAULT_QUEUE),
+                    settle=float(settings.get("HOTFOLDER_SETTLE_S") or DEFAULT_SETTLE_S),
+                    poll=float(settings.get("HOTFOLDER_POLL_S") or DEFAULT_POLL_S))
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: hot.stop.set())
+    hot.run(once=args.once)
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
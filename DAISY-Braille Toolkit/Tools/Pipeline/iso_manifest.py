@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Checksummer for ISO-images: beregnes under mastring og verificeres bagefter.
+
+ImageHasher følger med, når iso_writer skriver imaget. SHA-256 og MD5 af hele
+imaget samt SHA-256 pr. fil beregnes i samme gennemløb, så imaget ikke skal
+læses igen for brændingsloggen. hashlib slipper GIL'en for store blokke, så
+de tre hashes køres samtidigt på hver sin tråd.
+
+Manifestet gemmes som <iso>.manifest.json ved siden af imaget:
+
+    python iso_manifest.py verify <manifest.json> <iso-fil | drev | monteret mappe> [--workers N]
+"""
+
+import argparse, datetime, hashlib, json, os, sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from iso_writer import SECTOR
+
+MANIFEST_SUFFIX = ".manifest.json"
+READ_CHUNK = 4 << 20
+PARALLEL_MIN = 64 << 10           # mindre blokke hashes direkte i kaldende tråd
+
+
+def manifest_path_for(iso_path: Path) -> Path:
+    iso_path = Path(iso_path)
+    return iso_path.with_name(iso_path.name + MANIFEST_SUFFIX)
+
+
+class ImageHasher:
+    """SHA-256 + MD5 af hele imaget og SHA-256 pr. fil, mens imaget skrives."""
+
+    def __init__(self):
+        self.sha256 = hashlib.sha256()
+        self.md5 = hashlib.md5()
+        self.size = 0
+        self.files: list[dict] = []
+        self._file = None
+        self._pool = ThreadPoolExecutor(max_workers=2)
+
+    def update(self, data, *, file_data: bool = False):
+        """Tilføj bytes til imaget; file_data=True tæller dem også med i den aktuelle fil."""
+        n = len(data)
+        if not n:
+            return
+        self.size += n
+        extra = [self.md5] + ([self._file] if file_data and self._file is not None else [])
+        if n < PARALLEL_MIN:
+            self.sha256.update(data)
+            for h in extra:
+                h.update(data)
+            return
+        futures = [self._pool.submit(h.update, data) for h in extra]
+        self.sha256.update(data)
+        for fut in futures:
+            fut.result()   # data kan være en genbrugt buffer -> vent før retur
+
+    def begin_file(self):
+        self._file = hashlib.sha256()
+
+    def end_file(self, entry):
+        self.files.append({"path": entry.path, "extent": entry.extent, "size": entry.size,
+                           "sha256": self._file.hexdigest()})
+        self._file = None
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def result(self) -> dict:
+        return {"size": self.size, "sha256": self.sha256.hexdigest(), "md5": self.md5.hexdigest(),
+                "files": self.files}
+
+
+def hash_stream(f, size: int | None = None) -> tuple[str, str, int]:
+    """SHA-256 + MD5 af en åben fil (højst size bytes)."""
+    sha, md5 = hashlib.sha256(), hashlib.md5()
+    buf = bytearray(READ_CHUNK)
+    view = memoryview(buf)
+    total = 0
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        while size is None or total < size:
+            want = len(buf) if size is None else min(len(buf), size - total)
+            n = f.readinto(view[:want])
+            if not n:
+                break
+            fut = pool.submit(md5.update, view[:n])
+            sha.update(view[:n])
+            fut.result()
+            total += n
+    return sha.hexdigest(), md5.hexdigest(), total
+
+
+def _sha256_file(path: Path) -> tuple[str, int]:
+    h = hashlib.sha256()
+    total = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_CHUNK)
+            if not block:
+                break
+            h.update(block)
+            total += len(block)
+    return h.hexdigest(), total
+
+
+def hash_existing(iso_path: Path, source_dir: Path | None = None) -> dict:
+    """Checksummer for et image lavet af et eksternt værktøj (læses én gang ekstra)."""
+    with open(iso_path, "rb") as f:
+        sha, md5, size = hash_stream(f)
+    files = []
+    if source_dir is not None:
+        paths = sorted(p for p in Path(source_dir).rglob("*") if p.is_file())
+        with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as ex:
+            for p, (digest, n) in zip(paths, ex.map(_sha256_file, paths)):
+                files.append({"path": p.relative_to(source_dir).as_posix(), "size": n, "sha256": digest})
+    return {"size": size, "sha256": sha, "md5": md5, "files": files}
+
+
+def write_manifest(iso_path: Path, checksums: dict, *, volume_label: str = "") -> Path:
+    iso_path = Path(iso_path)
+    doc = {
+        "iso": iso_path.name,
+        "volume_label": volume_label,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        **checksums,
+    }
+    out = manifest_path_for(iso_path)
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, out)
+    return out
+
+
+def load_manifest(path: Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+# ===== Verify =====
+def _verify_dir(manifest: dict, root: Path, workers: int) -> list[str]:
+    """Mountet image / brændt disk: hash alle filer parallelt."""
+    files = manifest.get("files") or []
+
+    def check(item):
+        p = root / item["path"]
+        try:
+            digest, n = _sha256_file(p)
+        except OSError as e:
+            return f"{item['path']}: kan ikke læses ({e})"
+        if n != item["size"]:
+            return f"{item['path']}: størrelse {n}, forventet {item['size']}"
+        if digest != item["sha256"]:
+            return f"{item['path']}: SHA-256 passer ikke"
+        return None
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return [msg for msg in ex.map(check, files) if msg]
+
+
+def _verify_image(manifest: dict, image: Path, workers: int, files_only: bool) -> list[str]:
+    """ISO-fil eller rå enhed: hele imaget sekventielt, eller kun filerne parallelt (pread)."""
+    errors = []
+    size = int(manifest["size"])
+    if files_only:
+        fd = os.open(str(image), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            def check(item):
+                h = hashlib.sha256()
+                pos, left = item["extent"] * SECTOR, item["size"]
+                while left:
+                    block = os.pread(fd, min(READ_CHUNK, left), pos)
+                    if not block:
+                        return f"{item['path']}: imaget er afkortet"
+                    h.update(block)
+                    pos += len(block)
+                    left -= len(block)
+                return None if h.hexdigest() == item["sha256"] else f"{item['path']}: SHA-256 passer ikke"
+
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                errors += [msg for msg in ex.map(check, manifest.get("files") or []) if msg]
+        finally:
+            os.close(fd)
+        return errors
+
+    with open(image, "rb") as f:
+        sha, md5, n = hash_stream(f, size)
+    if n != size:
+        errors.append(f"imaget er {n} bytes, forventet {size}")
+    elif sha != manifest["sha256"] or md5 != manifest["md5"]:
+        errors.append("SHA-256/MD5 for imaget passer ikke")
+    return errors
+
+
+def verify(manifest_path: Path, target: Path, *, workers: int | None = None, files_only: bool = False) -> list[str]:
+    """Sammenlign target (ISO-fil, enhed eller mappe) med manifestet. Returnerer fejl (tom = ok)."""
+    manifest = load_manifest(manifest_path)
+    workers = workers or min(32, (os.cpu_count() or 4) * 2)
+    target = Path(target)
+    if target.is_dir():
+        return _verify_dir(manifest, target, workers)
+    if files_only and (not hasattr(os, "pread") or any("extent" not in f for f in manifest.get("files") or [])):
+        files_only = False   # Windows / manifest fra eksternt værktøj: hele imaget
+    return _verify_image(manifest, target, workers, files_only)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    v = sub.add_parser("verify", help="verificér ISO-fil, enhed eller monteret disk mod manifestet")
+    v.add_argument("manifest", type=Path)
+    v.add_argument("target", type=Path)
+    v.add_argument("--workers", type=int, default=None)
+    v.add_argument("--files", action="store_true",
+                   help="kun filernes indhold (parallelt) i stedet for hele imaget")
+    args = ap.parse_args(argv)
+
+    errors = verify(args.manifest, args.target, workers=args.workers, files_only=args.files)
+    for e in errors[:50]:
+        print(f"FEJL: {e}")
+    if len(errors) > 50:
+        print(f"... og {len(errors) - 50} fejl mere")
+    print("OK" if not errors else f"{len(errors)} fejl")
+    return 0 if not errors else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
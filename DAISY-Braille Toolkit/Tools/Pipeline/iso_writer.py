@@ -0,0 +1,783 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Ren Python ISO-skriver: ISO 9660 (level 2) + Joliet + UDF 1.02 (bridge).
+
+Første gennemløb lægger alle strukturer ud (volume descriptors, path tables,
+directory records, UDF file entries/FID'er) og bygger dem i hukommelsen -
+størrelsen afhænger kun af antallet af filer. Andet gennemløb skriver imaget
+strengt sekventielt og streamer filernes data direkte ind med store skrivninger
+(copy_file_range/sendfile hvor platformen har det). Hukommelsesforbruget er
+derfor konstant uanset diskens størrelse, og modulet kører på både Windows og Linux.
+Med en hasher (iso_manifest.ImageHasher) beregnes checksummer i samme gennemløb;
+filerne læses så via bufferen i stedet for copy_file_range.
+
+    python iso_writer.py <kilde-mappe> <output.iso> [VOLUME_LABEL]
+"""
+
+import datetime, os, re, struct, sys, time
+from pathlib import Path
+
+SECTOR = 2048
+COPY_CHUNK = 8 << 20              # 8 MB pr. skrivning
+SYSTEM_ID = "WIN32"
+APPLICATION_ID = "DAISY-BRAILLE TOOLKIT"
+UDF_REVISION = 0x0102
+MAX_FILE_SIZE = (1 << 32) - 1     # ISO 9660 uden multi-extent
+UDF_AVDP_SECTOR = 256
+UDF_MAX_EXTENT = (1 << 30) - SECTOR
+
+
+def _sectors(n: int) -> int:
+    return (n + SECTOR - 1) // SECTOR
+
+
+def _pad(data: bytes, size: int) -> bytes:
+    return data + b"\0" * (size - len(data))
+
+
+def _both16(v: int) -> bytes:
+    return struct.pack("<H", v) + struct.pack(">H", v)
+
+
+def _both32(v: int) -> bytes:
+    return struct.pack("<I", v) + struct.pack(">I", v)
+
+
+# ===== Entries =====
+class IsoEntry:
+    """En fil i imaget: enten en kildefil på disk eller bytes i hukommelsen."""
+
+    def __init__(self, path: str, *, source: Path | None = None, data: bytes | None = None,
+                 mtime: float | None = None):
+        if (source is None) == (data is None):
+            raise ValueError("IsoEntry kræver enten source eller data")
+        self.path = path.strip("/").replace("\\", "/")
+        self.source = Path(source) if source is not None else None
+        self.data = data
+        if self.source is not None:
+            st = self.source.stat()
+            self.size = st.st_size
+            self.mtime = st.st_mtime if mtime is None else mtime
+        else:
+            self.size = len(data)
+            self.mtime = time.time() if mtime is None else mtime
+        if self.size > MAX_FILE_SIZE:
+            raise ValueError(f"Filen er for stor til ISO 9660: {self.path} ({self.size} bytes)")
+        self.extent = 0   # sættes ved layout
+
+
+def entries_from_dir(src_dir: Path) -> list[IsoEntry]:
+    """Alle filer under src_dir som IsoEntry (relative stier med '/')."""
+    src_dir = Path(src_dir)
+    out = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort()
+        for name in sorted(files):
+            p = Path(root) / name
+            out.append(IsoEntry(p.relative_to(src_dir).as_posix(), source=p))
+    return out
+
+
+def entries_from_manifest(manifest: list[tuple[str, bytes | Path]], *, mtime: float | None = None) -> list[IsoEntry]:
+    """Virtuelt filsæt -> IsoEntry: bytes lægges direkte i imaget, stier streames fra kildefilen."""
+    out = []
+    for name, content in manifest:
+        if isinstance(content, (bytes, bytearray)):
+            out.append(IsoEntry(name, data=bytes(content), mtime=mtime))
+        else:
+            out.append(IsoEntry(name, source=Path(content)))
+    return out
+
+
+class _Dir:
+    def __init__(self, name: str, parent):
+        self.name = name
+        self.parent = parent
+        self.dirs: dict[str, "_Dir"] = {}
+        self.files: dict[str, IsoEntry] = {}
+        self.iso_name = ""
+        self.joliet_name = ""
+        self.iso_extent = self.iso_size = 0
+        self.joliet_extent = self.joliet_size = 0
+        self.udf_fe = 0          # partition-relativ blok for File Entry
+        self.udf_data = 0        # partition-relativ blok for FID-data
+        self.udf_size = 0
+        self.unique_id = 0
+        self.mtime = time.time()
+
+    def depth(self) -> int:
+        return 0 if self.parent is None else self.parent.depth() + 1
+
+
+def _build_tree(entries: list[IsoEntry]) -> _Dir:
+    root = _Dir("", None)
+    for e in entries:
+        parts = [p for p in e.path.split("/") if p]
+        if not parts:
+            raise ValueError(f"Ugyldig sti i ISO: {e.path!r}")
+        d = root
+        for part in parts[:-1]:
+            d = d.dirs.setdefault(part, _Dir(part, d))
+        if parts[-1] in d.files or parts[-1] in d.dirs:
+            raise ValueError(f"Dubleret sti i ISO: {e.path!r}")
+        d.files[parts[-1]] = e
+    return root
+
+
+def _bfs(root: _Dir, *, joliet: bool) -> list[_Dir]:
+    """Mapper i path table-rækkefølge (niveau, forælder, navn)."""
+    def key(sub):
+        return sub.joliet_name.encode("utf-16-be") if joliet else sub.iso_name.encode("ascii")
+
+    order, queue = [], [root]
+    while queue:
+        nxt = []
+        for d in queue:
+            order.append(d)
+            nxt.extend(sorted(d.dirs.values(), key=key))
+        queue = nxt
+    return order
+
+
+# ===== Navne =====
+_NOT_D = re.compile(r"[^A-Z0-9_]")
+
+
+def _iso_names(d: _Dir):
+    """ISO 9660 level 2 navne (d-tegn, maks. 30/31 tegn), unikke pr. mappe."""
+    used = set()
+
+    def uniq(base: str, ext: str, limit: int) -> str:
+        ext = ext[: max(0, limit - 2)]
+        room = limit - len(ext) - (1 if ext else 0)
+        base = base[:room] or "_"
+        cand = f"{base}.{ext}" if ext else base
+        n = 1
+        while cand in used:
+            suffix = f"_{n}"
+            b = base[: room - len(suffix)] + suffix
+            cand = f"{b}.{ext}" if ext else b
+            n += 1
+        used.add(cand)
+        return cand
+
+    for name in sorted(d.dirs):
+        d.dirs[name].iso_name = uniq(_NOT_D.sub("_", name.upper()), "", 31)
+    names = {}
+    for name in sorted(d.files):
+        stem, dot, ext = name.upper().rpartition(".")
+        if not dot:
+            stem, ext = ext, ""
+        names[name] = uniq(_NOT_D.sub("_", stem), _NOT_D.sub("_", ext), 30)
+    return names
+
+
+def _joliet_name(name: str, limit: int = 64) -> str:
+    name = re.sub(r'[*/:;?\\]', "_", name)
+    if len(name) <= limit:
+        return name
+    stem, dot, ext = name.rpartition(".")
+    if dot and len(ext) < 16:
+        return stem[: limit - len(ext) - 1] + "." + ext
+    return name[:limit]
+
+
+# ===== ISO 9660 strukturer =====
+def _dir_datetime(ts: float) -> bytes:
+    t = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return bytes([t.year - 1900, t.month, t.day, t.hour, t.minute, t.second, 0])
+
+
+def _vd_datetime(ts: float | None) -> bytes:
+    if ts is None:
+        return b"0" * 16 + b"\0"
+    t = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return t.strftime("%Y%m%d%H%M%S").encode("ascii") + b"00\0"
+
+
+def _dir_record(file_id: bytes, extent: int, size: int, ts: float, is_dir: bool) -> bytes:
+    rec_len = 33 + len(file_id) + (1 if len(file_id) % 2 == 0 else 0)
+    rec = bytearray(rec_len)
+    rec[0] = rec_len
+    rec[2:10] = _both32(extent)
+    rec[10:18] = _both32(size)
+    rec[18:25] = _dir_datetime(ts)
+    rec[25] = 2 if is_dir else 0
+    rec[28:32] = _both16(1)
+    rec[32] = len(file_id)
+    rec[33:33 + len(file_id)] = file_id
+    return bytes(rec)
+
+
+def _pack_records(records: list[bytes]) -> bytes:
+    """Sæt directory records sammen; en record må ikke krydse en sektorgrænse."""
+    out = bytearray()
+    for r in records:
+        room = SECTOR - (len(out) % SECTOR)
+        if len(r) > room:
+            out += b"\0" * room
+        out += r
+    return bytes(_pad(bytes(out), _sectors(len(out)) * SECTOR))
+
+
+def _dir_records(d: _Dir, *, joliet: bool, file_names: dict) -> list[bytes]:
+    """Records for én mappe (med placeholders for egne extents, som fyldes bagefter)."""
+    enc = (lambda s: s.encode("utf-16-be")) if joliet else (lambda s: s.encode("ascii"))
+    parent = d.parent or d
+    self_ext, self_size = (d.joliet_extent, d.joliet_size) if joliet else (d.iso_extent, d.iso_size)
+    par_ext, par_size = (parent.joliet_extent, parent.joliet_size) if joliet else (parent.iso_extent, parent.iso_size)
+    recs = [_dir_record(b"\0", self_ext, self_size, d.mtime, True),
+            _dir_record(b"\1", par_ext, par_size, parent.mtime, True)]
+    children = []
+    for name, sub in d.dirs.items():
+        key = sub.joliet_name if joliet else sub.iso_name
+        ext, size = (sub.joliet_extent, sub.joliet_size) if joliet else (sub.iso_extent, sub.iso_size)
+        children.append((enc(key), ext, size, sub.mtime, True))
+    for name, e in d.files.items():
+        key = (_joliet_name(name, 62) if joliet else file_names[id(d)][name]) + ";1"
+        children.append((enc(key), e.extent, e.size, e.mtime, False))
+    children.sort(key=lambda c: c[0])
+    recs += [_dir_record(*c) for c in children]
+    return recs
+
+
+def _path_table(dirs: list[_Dir], *, joliet: bool, big_endian: bool) -> bytes:
+    """dirs skal være i _bfs-rækkefølge for samme navnesystem (ISO eller Joliet)."""
+    out = bytearray()
+    fmt32, fmt16 = (">I", ">H") if big_endian else ("<I", "<H")
+    number = {id(d): no for no, d in enumerate(dirs, start=1)}
+    for d in dirs:
+        if d.parent is None:
+            ident = b"\0"
+        else:
+            ident = (d.joliet_name.encode("utf-16-be") if joliet else d.iso_name.encode("ascii"))
+        ext = d.joliet_extent if joliet else d.iso_extent
+        out += bytes([len(ident), 0]) + struct.pack(fmt32, ext)
+        out += struct.pack(fmt16, number[id(d.parent or d)]) + ident
+        if len(ident) % 2:
+            out += b"\0"
+    return bytes(out)
+
+
+def _text_field(s: str, size: int, *, joliet: bool) -> bytes:
+    if joliet:
+        b = s.encode("utf-16-be")[:size]
+        return b + (" " * ((size - len(b)) // 2)).encode("utf-16-be") + b" " * ((size - len(b)) % 2)
+    return s.encode("ascii", "replace")[:size].ljust(size, b" ")
+
+
+def _volume_descriptor(*, joliet: bool, label: str, space: int, pt_size: int, l_pt: int, m_pt: int,
+                       root_rec: bytes, ts: float) -> bytes:
+    vd = bytearray(SECTOR)
+    vd[0] = 2 if joliet else 1
+    vd[1:6] = b"CD001"
+    vd[6] = 1
+    vd[8:40] = _text_field(SYSTEM_ID, 32, joliet=joliet)
+    vd[40:72] = _text_field(label, 32, joliet=joliet)
+    vd[80:88] = _both32(space)
+    if joliet:
+        vd[88:91] = b"%/E"        # UCS-2 level 3
+    vd[120:124] = _both16(1)
+    vd[124:128] = _both16(1)
+    vd[128:132] = _both16(SECTOR)
+    vd[132:140] = _both32(pt_size)
+    vd[140:144] = struct.pack("<I", l_pt)
+    vd[148:152] = struct.pack(">I", m_pt)
+    vd[156:190] = root_rec
+    vd[190:318] = _text_field("", 128, joliet=joliet)
+    vd[318:446] = _text_field("", 128, joliet=joliet)
+    vd[446:574] = _text_field("", 128, joliet=joliet)
+    vd[574:702] = _text_field(APPLICATION_ID, 128, joliet=joliet)
+    vd[702:813] = _text_field("", 111, joliet=joliet)
+    vd[813:830] = _vd_datetime(ts)
+    vd[830:847] = _vd_datetime(ts)
+    vd[847:864] = _vd_datetime(None)
+    vd[864:881] = _vd_datetime(None)
+    vd[881] = 1
+    return bytes(vd)
+
+
+def _terminator() -> bytes:
+    return _pad(b"\xffCD001\x01", SECTOR)
+
+
+# ===== UDF 1.02 strukturer =====
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def _crc16(data: bytes) -> int:
+    crc = 0
+    tbl = _CRC_TABLE
+    for b in data:
+        crc = ((crc << 8) & 0xFFFF) ^ tbl[((crc >> 8) ^ b) & 0xFF]
+    return crc
+
+
+def _udf_tag(ident: int, body: bytes, location: int) -> bytes:
+    """Descriptor tag (16 bytes) + body, med checksum og CRC udfyldt."""
+    crc = _crc16(body)
+    tag = bytearray(struct.pack("<HHBBHHHI", ident, 2, 0, 0, 1, crc, len(body), location))
+    tag[4] = sum(tag[0:4] + tag[5:16]) & 0xFF
+    return bytes(tag) + body
+
+
+def _charspec() -> bytes:
+    return _pad(b"\0OSTA Compressed Unicode", 64)
+
+
+def _osta(s: str) -> bytes:
+    """OSTA CS0 compressed unicode (8-bit hvis muligt, ellers 16-bit)."""
+    if all(ord(c) < 256 for c in s):
+        return b"\x08" + s.encode("latin-1")
+    return b"\x10" + s.encode("utf-16-be")
+
+
+def _dstring(s: str, size: int) -> bytes:
+    if not s:
+        return b"\0" * size
+    b = _osta(s)
+    if len(b) > size - 1:
+        unit = 1 if b[0] == 8 else 2
+        b = b[: 1 + ((size - 2) // unit) * unit]
+    return _pad(b, size - 1) + bytes([len(b)])
+
+
+def _regid(ident: str, suffix: bytes = b"") -> bytes:
+    return b"\0" + _pad(ident.encode("ascii"), 23) + _pad(suffix, 8)
+
+
+def _udf_suffix() -> bytes:
+    return struct.pack("<HB", UDF_REVISION, 0)
+
+
+def _domain_id() -> bytes:
+    return _regid("*OSTA UDF Compliant", _udf_suffix())
+
+
+def _impl_id() -> bytes:
+    return _regid("*DAISY-Braille Toolkit")
+
+
+def _timestamp(ts: float) -> bytes:
+    t = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc)
+    return struct.pack("<HhBBBBBBBB", (1 << 12) | 0, t.year, t.month, t.day, t.hour, t.minute,
+                       t.second, 0, 0, 0)
+
+
+def _extent_ad(length: int, loc: int) -> bytes:
+    return struct.pack("<II", length, loc)
+
+
+def _long_ad(length: int, lbn: int, unique_id: int = 0) -> bytes:
+    return struct.pack("<IIH", length, lbn, 0) + struct.pack("<HI", 0, unique_id & 0xFFFFFFFF)
+
+
+def _udf_avdp(loc: int, main_vds: int, reserve_vds: int, vds_len: int) -> bytes:
+    body = _extent_ad(vds_len * SECTOR, main_vds) + _extent_ad(vds_len * SECTOR, reserve_vds)
+    return _pad(_udf_tag(2, _pad(body, 496), loc), SECTOR)
+
+
+def _udf_vds(start: int, *, label: str, ts: float, part_start: int, part_len: int,
+             lvid_loc: int, vol_set: str) -> list[bytes]:
+    """Volume Descriptor Sequence: PVD, IUVD, PD, LVD, USD, TD (én sektor hver)."""
+    out = []
+    # Primary Volume Descriptor
+    b = bytearray(496)
+    struct.pack_into("<II", b, 0, 0, 0)
+    b[8:40] = _dstring(label, 32)
+    struct.pack_into("<HHHHII", b, 40, 1, 1, 2, 2, 1, 1)
+    b[56:184] = _dstring(vol_set, 128)
+    b[184:248] = _charspec()
+    b[248:312] = _charspec()
+    b[328:360] = _impl_id()
+    b[360:372] = _timestamp(ts)
+    b[372:404] = _impl_id()
+    out.append(_udf_tag(1, bytes(b), start))
+    # Implementation Use Volume Descriptor (UDF LV Info)
+    b = bytearray(496)
+    struct.pack_into("<I", b, 0, 1)
+    b[4:36] = _regid("*UDF LV Info", _udf_suffix())
+    b[36:100] = _charspec()
+    b[100:228] = _dstring(label, 128)
+    b[336:368] = _impl_id()
+    out.append(_udf_tag(4, bytes(b), start + 1))
+    # Partition Descriptor
+    b = bytearray(496)
+    struct.pack_into("<IHH", b, 0, 2, 1, 0)
+    b[8:40] = _regid("+NSR02")
+    struct.pack_into("<III", b, 168, 1, part_start, part_len)   # access type 1 = read-only
+    b[180:212] = _impl_id()
+    out.append(_udf_tag(5, bytes(b), start + 2))
+    # Logical Volume Descriptor (+ type 1 partition map)
+    b = bytearray(430)
+    struct.pack_into("<I", b, 0, 3)
+    b[4:68] = _charspec()
+    b[68:196] = _dstring(label, 128)
+    struct.pack_into("<I", b, 196, SECTOR)
+    b[200:232] = _domain_id()
+    b[232:248] = _long_ad(SECTOR, 0)                 # File Set Descriptor i blok 0
+    struct.pack_into("<II", b, 248, 6, 1)
+    b[256:288] = _impl_id()
+    b[416:424] = _extent_ad(2 * SECTOR, lvid_loc)
+    b[424:430] = struct.pack("<BBHH", 1, 6, 1, 0)
+    out.append(_udf_tag(6, bytes(b), start + 3))
+    # Unallocated Space Descriptor (ingen fri plads)
+    out.append(_udf_tag(7, struct.pack("<II", 4, 0), start + 4))
+    # Terminating Descriptor
+    out.append(_udf_tag(8, b"\0" * 496, start + 5))
+    return [_pad(d, SECTOR) for d in out]
+
+
+def _udf_lvid(loc: int, ts: float, part_len: int, next_unique: int, n_files: int, n_dirs: int) -> bytes:
+    b = bytearray(118)
+    b[0:12] = _timestamp(ts)
+    struct.pack_into("<I", b, 12, 1)                 # integrity type: close
+    struct.pack_into("<Q", b, 24, next_unique)
+    struct.pack_into("<IIII", b, 56, 1, 46, 0, part_len)
+    b[72:104] = _impl_id()
+    struct.pack_into("<IIHHH", b, 104, n_files, n_dirs, UDF_REVISION, UDF_REVISION, UDF_REVISION)
+    return _pad(_udf_tag(9, bytes(b), loc), SECTOR) + _pad(_udf_tag(8, b"\0" * 496, loc + 1), SECTOR)
+
+
+def _udf_fsd(ts: float, label: str, root_fe: int) -> bytes:
+    b = bytearray(496)
+    b[0:12] = _timestamp(ts)
+    struct.pack_into("<HHIIII", b, 12, 3, 3, 1, 1, 0, 0)
+    b[32:96] = _charspec()
+    b[96:224] = _dstring(label, 128)
+    b[224:288] = _charspec()
+    b[288:320] = _dstring(label, 32)
+    b[384:400] = _long_ad(SECTOR, root_fe)
+    b[400:432] = _domain_id()
+    return _pad(_udf_tag(256, bytes(b), 0), SECTOR) + _pad(_udf_tag(8, b"\0" * 496, 1), SECTOR)
+
+
+def _udf_file_entry(lbn: int, *, is_dir: bool, size: int, data_lbn: int, ts: float,
+                    unique_id: int, links: int) -> bytes:
+    ads = bytearray()
+    remaining, pos = size, data_lbn
+    while remaining > 0:
+        n = min(remaining, UDF_MAX_EXTENT)
+        ads += struct.pack("<II", n, pos)
+        remaining -= n
+        pos += _sectors(n)
+    b = bytearray(160)
+    # ICB tag: strategy 4, max 1 entry, filtype 4=dir/5=fil, flags 0 = short_ad
+    b[0:20] = struct.pack("<IHHHBB6sH", 0, 4, 0, 1, 0, 4 if is_dir else 5, b"\0" * 6, 0)
+    perms = 0x14A5                                   # r-x for ejer/gruppe/andre
+    struct.pack_into("<IIIHBBI", b, 20, 0xFFFFFFFF, 0xFFFFFFFF, perms, links, 0, 0, 0)
+    struct.pack_into("<QQ", b, 40, size, _sectors(size))
+    b[56:68] = _timestamp(ts)
+    b[68:80] = _timestamp(ts)
+    b[80:92] = _timestamp(ts)
+    struct.pack_into("<I", b, 92, 1)
+    b[112:144] = _impl_id()
+    struct.pack_into("<QII", b, 144, unique_id, 0, len(ads))
+    return _pad(_udf_tag(261, bytes(b) + bytes(ads), lbn), SECTOR)
+
+
+def _udf_fid(name: str | None, *, is_dir: bool, parent: bool, fe_lbn: int, unique_id: int) -> bytes:
+    """File Identifier Descriptor uden tag (tag/CRC sættes når blokken kendes)."""
+    ident = b"" if parent else _osta(name)
+    chars = (2 if is_dir else 0) | (8 if parent else 0)
+    body = struct.pack("<HBB", 1, chars, len(ident)) + _long_ad(SECTOR, fe_lbn, unique_id)
+    body += struct.pack("<H", 0) + ident
+    total = (16 + len(body) + 3) // 4 * 4
+    return _pad(body, total - 16)
+
+
+def _udf_dir_data(fids: list[bytes], data_lbn: int) -> bytes:
+    out = bytearray()
+    for body in fids:
+        out += _udf_tag(257, body, data_lbn + len(out) // SECTOR)
+    return bytes(out)
+
+
+# ===== Layout + skrivning =====
+class IsoLayout:
+    """Resultatet af første gennemløb: metadata-bytes + placering af hver fil."""
+
+    def __init__(self):
+        self.head = b""                   # alle sektorer før første fildata
+        self.files: list[IsoEntry] = []   # i den rækkefølge data skrives
+        self.tail = b""                   # sektorer efter fildata (UDF anchor)
+        self.total_sectors = 0
+
+
+def sanitize_volume_label(label: str) -> str:
+    vol = re.sub(r"[^A-Za-z0-9_]", "_", (label or "DAISY")).upper() or "DAISY"
+    return vol[:32]
+
+
+def plan_layout(entries: list[IsoEntry], volume_label: str, *, joliet: bool = True, udf: bool = True,
+                timestamp: float | None = None) -> IsoLayout:
+    ts = time.time() if timestamp is None else timestamp
+    label = sanitize_volume_label(volume_label)
+    root = _build_tree(entries)
+
+    def walk(d):
+        yield d
+        for k in sorted(d.dirs):
+            yield from walk(d.dirs[k])
+
+    all_dirs = list(walk(root))
+    file_names = {id(d): _iso_names(d) for d in all_dirs}
+    for d in all_dirs:
+        for name, sub in d.dirs.items():
+            sub.joliet_name = _joliet_name(name)
+        if d.depth() > 7:
+            raise ValueError("ISO 9660 tillader højst 8 mappeniveauer")
+    dirs = _bfs(root, joliet=False)
+    jol_dirs = _bfs(root, joliet=True)
+
+    # --- sektorplan ---
+    vd_count = 1 + (1 if joliet else 0) + 1                  # PVD [+ SVD] + terminator
+    sector = 16 + vd_count
+    if udf:
+        sector += 3                                          # BEA01, NSR02, TEA01
+        main_vds, reserve_vds, vds_len = 32, 48, 16
+        lvid_loc = 64
+        part_start = UDF_AVDP_SECTOR + 1
+        sector = part_start
+        udf_next = 2                                         # blok 0: FSD, blok 1: TD
+        unique = 16
+        for d in dirs:                                       # BFS: mappe-FE'er først
+            d.udf_fe = udf_next
+            if d.parent is not None:
+                d.unique_id = unique
+                unique += 1
+            udf_next += 1
+        file_fe = {}
+        for d in dirs:
+            # FID: 38 bytes + navn, afrundet til 4; den første er forælder-FID'en
+            d.udf_size = 40 + sum((38 + len(_osta(name)) + 3) // 4 * 4 for name in [*d.dirs, *d.files])
+            d.udf_data = udf_next
+            udf_next += _sectors(d.udf_size)
+        for d in dirs:
+            for name in sorted(d.files):
+                e = d.files[name]
+                file_fe[id(e)] = (udf_next, unique)
+                udf_next += 1
+                unique += 1
+        sector = part_start + udf_next
+
+    # path tables (længden afhænger ikke af extents)
+    iso_pt = len(_path_table(dirs, joliet=False, big_endian=False))
+    iso_l_pt, iso_m_pt = sector, sector + _sectors(iso_pt)
+    sector = iso_m_pt + _sectors(iso_pt)
+    if joliet:
+        jol_pt = len(_path_table(jol_dirs, joliet=True, big_endian=False))
+        jol_l_pt, jol_m_pt = sector, sector + _sectors(jol_pt)
+        sector = jol_m_pt + _sectors(jol_pt)
+
+    # directory-størrelser kendes uafhængigt af extents -> placér mapperne
+    for d in dirs:
+        d.iso_size = len(_pack_records(_dir_records(d, joliet=False, file_names=file_names)))
+        d.iso_extent = sector
+        sector += _sectors(d.iso_size)
+    if joliet:
+        for d in dirs:
+            d.joliet_size = len(_pack_records(_dir_records(d, joliet=True, file_names=file_names)))
+            d.joliet_extent = sector
+            sector += _sectors(d.joliet_size)
+
+    # fildata
+    layout = IsoLayout()
+    for d in dirs:
+        for name in sorted(d.files):
+            e = d.files[name]
+            e.extent = sector if e.size else 0
+            sector += _sectors(e.size)
+            layout.files.append(e)
+    data_end = sector
+    total = data_end + (1 if udf else 0)                    # + afsluttende UDF anchor
+
+    # --- byg metadata ---
+    head = bytearray(16 * SECTOR)
+    root_iso = _dir_record(b"\0", root.iso_extent, root.iso_size, root.mtime, True)
+    head += _volume_descriptor(joliet=False, label=label, space=total, pt_size=iso_pt,
+                               l_pt=iso_l_pt, m_pt=iso_m_pt, root_rec=root_iso, ts=ts)
+    if joliet:
+        root_jol = _dir_record(b"\0", root.joliet_extent, root.joliet_size, root.mtime, True)
+        head += _volume_descriptor(joliet=True, label=(volume_label or label)[:16], space=total,
+                                   pt_size=jol_pt, l_pt=jol_l_pt, m_pt=jol_m_pt, root_rec=root_jol, ts=ts)
+    head += _terminator()
+    if udf:
+        for ident in (b"BEA01", b"NSR02", b"TEA01"):
+            head += _pad(b"\0" + ident + b"\x01", SECTOR)
+        head += b"\0" * ((main_vds * SECTOR) - len(head))
+        vol_set = f"{int(ts) & 0xFFFFFFFF:08X}{int(ts * 1000) & 0xFFFFFFFF:08X}{label}"
+        part_len = data_end - part_start
+        for loc in (main_vds, reserve_vds):
+            vds = _udf_vds(loc, label=volume_label or label, ts=ts, part_start=part_start,
+                           part_len=part_len, lvid_loc=lvid_loc, vol_set=vol_set)
+            head += b"".join(vds) + b"\0" * ((vds_len - len(vds)) * SECTOR)
+        n_files = sum(len(d.files) for d in dirs)
+        head += _udf_lvid(lvid_loc, ts, part_len, unique, n_files, len(dirs))
+        head += b"\0" * ((UDF_AVDP_SECTOR * SECTOR) - len(head))
+        head += _udf_avdp(UDF_AVDP_SECTOR, main_vds, reserve_vds, vds_len)
+        # partition: FSD + TD, mappe-FE'er, FID-data, fil-FE'er
+        head += _udf_fsd(ts, volume_label or label, root.udf_fe)
+        for d in dirs:
+            links = 1 + len(d.dirs)
+            head += _udf_file_entry(d.udf_fe, is_dir=True, size=d.udf_size, data_lbn=d.udf_data,
+                                    ts=d.mtime, unique_id=d.unique_id, links=links)
+        for d in dirs:
+            parent = d.parent or d
+            fids = [_udf_fid(None, is_dir=True, parent=True, fe_lbn=parent.udf_fe, unique_id=parent.unique_id)]
+            for name in sorted(d.dirs):
+                sub = d.dirs[name]
+                fids.append(_udf_fid(name, is_dir=True, parent=False, fe_lbn=sub.udf_fe, unique_id=sub.unique_id))
+            for name in sorted(d.files):
+                fe_lbn, uid = file_fe[id(d.files[name])]
+                fids.append(_udf_fid(name, is_dir=False, parent=False, fe_lbn=fe_lbn, unique_id=uid))
+            data = _udf_dir_data(fids, d.udf_data)
+            head += _pad(data, _sectors(len(data)) * SECTOR)
+        for d in dirs:
+            for name in sorted(d.files):
+                e = d.files[name]
+                fe_lbn, uid = file_fe[id(e)]
+                data_lbn = (e.extent - part_start) if e.size else 0
+                head += _udf_file_entry(fe_lbn, is_dir=False, size=e.size, data_lbn=data_lbn,
+                                        ts=e.mtime, unique_id=uid, links=1)
+    else:
+        head += b"\0" * ((iso_l_pt * SECTOR) - len(head))
+
+    if len(head) != iso_l_pt * SECTOR:
+        raise AssertionError("ISO-layout: path table-placering passer ikke")
+    tables = [(False, dirs)] + ([(True, jol_dirs)] if joliet else [])
+    for j, order in tables:
+        for be in (False, True):
+            pt = _path_table(order, joliet=j, big_endian=be)
+            head += _pad(pt, _sectors(len(pt)) * SECTOR)
+    for j, _ in tables:
+        for d in dirs:
+            head += _pack_records(_dir_records(d, joliet=j, file_names=file_names))
+
+    first_data = next((e.extent for e in layout.files if e.size), None)
+    if first_data is not None and len(head) != first_data * SECTOR:
+        raise AssertionError("ISO-layout: fildata-placering passer ikke")
+    layout.head = bytes(head)
+    if udf:
+        pad = (total - 1 - data_end) * SECTOR
+        layout.tail = b"\0" * pad + _udf_avdp(total - 1, main_vds, reserve_vds, vds_len)
+    layout.total_sectors = total
+    return layout
+
+
+def _copy_into(src: Path, out, size: int, buf: bytearray, hasher=None):
+    """Kopiér en fil ind i out med store sekventielle skrivninger."""
+    out.flush()
+    with open(src, "rb") as f:
+        fd_in, fd_out = f.fileno(), out.fileno()
+        copied = 0
+        for fn in (() if hasher else ("copy_file_range", "sendfile")):
+            call = getattr(os, fn, None)
+            if call is None:
+                continue
+            try:
+                while copied < size:
+                    if fn == "copy_file_range":
+                        n = call(fd_in, fd_out, min(COPY_CHUNK, size - copied))
+                    else:
+                        n = call(fd_out, fd_in, copied, min(COPY_CHUNK, size - copied))
+                    if n <= 0:
+                        break
+                    copied += n
+                if copied == size:
+                    out.seek(0, os.SEEK_END)
+                    return
+            except OSError:
+                if copied:
+                    raise
+        f.seek(copied)
+        view = memoryview(buf)
+        while copied < size:
+            n = f.readinto(view[: min(len(buf), size - copied)])
+            if not n:
+                break
+            if hasher:
+                hasher.update(view[:n], file_data=True)
+            out.write(view[:n])
+            copied += n
+    if copied != size:
+        raise IOError(f"Filen ændrede størrelse under skrivning: {src}")
+
+
+def write_layout(layout: IsoLayout, iso_path: Path, *, on_file=None, hasher=None):
+    """Andet gennemløb: skriv imaget sekventielt. on_file(entry) kaldes pr. fil.
+
+    hasher: objekt med update()/begin_file()/end_file() (se iso_manifest.ImageHasher).
+    """
+    iso_path = Path(iso_path)
+    iso_path.parent.mkdir(parents=True, exist_ok=True)
+    buf = bytearray(COPY_CHUNK)
+    tmp = iso_path.with_name(iso_path.name + ".part")
+    with open(tmp, "wb", buffering=0) as out:
+        out.write(layout.head)
+        if hasher:
+            hasher.update(layout.head)
+        for e in layout.files:
+            if hasher:
+                hasher.begin_file()
+            if e.data is not None:
+                out.write(e.data)
+                if hasher:
+                    hasher.update(e.data, file_data=True)
+            elif e.size:
+                _copy_into(e.source, out, e.size, buf, hasher)
+            pad = _sectors(e.size) * SECTOR - e.size
+            if pad:
+                out.write(b"\0" * pad)
+                if hasher:
+                    hasher.update(b"\0" * pad)
+            if hasher:
+                hasher.end_file(e)
+            if on_file:
+                on_file(e)
+        out.write(layout.tail)
+        if hasher:
+            hasher.update(layout.tail)
+        if out.tell() != layout.total_sectors * SECTOR:
+            raise AssertionError("ISO-størrelse passer ikke med layout")
+    os.replace(tmp, iso_path)
+
+
+def write_iso(entries: list[IsoEntry], iso_path: Path, volume_label: str, *,
+              joliet: bool = True, udf: bool = True, hasher=None) -> IsoLayout:
+    layout = plan_layout(entries, volume_label, joliet=joliet, udf=udf)
+    write_layout(layout, iso_path, hasher=hasher)
+    return layout
+
+
+def create_iso_native(source_dir: Path, iso_path: Path, volume_label: str, *,
+                      joliet: bool = True, udf: bool = True, hasher=None) -> IsoLayout:
+    """ISO 9660 + Joliet + UDF af en mappe, uden eksterne værktøjer."""
+    return write_iso(entries_from_dir(source_dir), iso_path, volume_label, joliet=joliet, udf=udf,
+                     hasher=hasher)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) not in (2, 3):
+        print("Brug: python iso_writer.py <kilde-mappe> <output.iso> [VOLUME_LABEL]")
+        return 2
+    src, dst = Path(argv[0]), Path(argv[1])
+    label = argv[2] if len(argv) > 2 else src.name
+    layout = create_iso_native(src, dst, label)
+    print(f"ISO: {dst} ({layout.total_sectors * SECTOR} bytes, {len(layout.files)} filer)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
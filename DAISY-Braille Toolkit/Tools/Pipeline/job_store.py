@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Persistent jobmappe med job.json (samme layout som GUI'ens JobStore/JobManifest).
+
+    <JOB_ROOT>/<bog>_<hash>/
+        job.json  input/  dtbook/  tts/  daisy/  braille/  iso/  metadata/  logs/
+
+job.json skrives med C#-navnene (PascalCase, StepStatus/OutputMode som tal,
+UTC-tider), så GUI'en og scriptet kan læse hinandens jobs. Hvert trin
+(Import, DtBook, Tts, DaisyBuild, PefBuild, IsoAndCsv) gemmer status, tider,
+fejl, en hash af sine input (InputsHash) og sine output-filer (Outputs);
+TTS-segmenterne har deres egen status. Med resume springes trin over, hvis
+de er færdige, input-hashen er den samme og output-filerne findes stadig.
+
+    python job_store.py <jobmappe>        (vis status)
+"""
+
+import argparse, contextlib, datetime, hashlib, json, os, shutil, sys, threading, time, uuid
+from pathlib import Path
+
+import metrics
+import progress_events
+import stage_profiler
+
+SCHEMA_VERSION = "1.2"
+MANIFEST = "job.json"
+SUBDIRS = ("input", "dtbook", "tts", "daisy", "braille", "iso", "metadata", "logs")
+STEPS = ("Import", "DtBook", "Tts", "DaisyBuild", "PefBuild", "IsoAndCsv")
+# C# StepStatus / OutputMode (serialiseres som tal)
+NOT_STARTED, RUNNING, COMPLETED, FAILED = range(4)
+STATUS_NAMES = ("NotStarted", "Running", "Completed", "Failed")
+OUTPUT_MODES = {"daisy": 0, "braille": 1, "both": 2}
+DEFAULT_JOB_ROOT = "jobs"
+
+
+def _utcnow() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _new_step() -> dict:
+    return {"Status": NOT_STARTED, "StartedUtc": None, "FinishedUtc": None, "Error": None,
+            "InputsHash": None, "Outputs": []}
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_inputs(*parts) -> str:
+    """Hash af et trins input (strenge, tal, lister - alt der kan JSON-serialiseres)."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+def write_atomic(path: Path, data: bytes):
+    # en fil i jobmappen/TTS-cachen er enten hel eller findes ikke (resume stoler på det);
+    # midlertidigt navn pr. tråd, da parallelle bøger kan skrive samme cachepost
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def link_or_copy(src: Path, dst: Path):
+    # hårdt link koster ingen plads (TTS-cache og job på samme drev), ellers kopi
+    tmp = dst.with_name(f"{dst.name}.{threading.get_ident()}.part")
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class Job:
+    # job.json indeholder hele bogens tekst; under TTS gemmes højst så ofte
+    SAVE_INTERVAL_S = 2.0
+
+    def __init__(self, job_dir: Path, data: dict):
+        self.dir = Path(job_dir)
+        self.data = data
+        self._lock = threading.RLock()
+        self._saved = 0.0
+
+    @classmethod
+    def create_in_folder(cls, job_dir: Path, input_path: Path, mode: str, voice_id: str, *,
+                         language: str = "", title: str | None = None) -> "Job":
+        """Som JobStore.CreateInFolder: undermapper, kopi af input og en tom manifest."""
+        job_dir = Path(job_dir)
+        for sub in SUBDIRS:
+            (job_dir / sub).mkdir(parents=True, exist_ok=True)
+        input_copy = job_dir / "input" / Path(input_path).name
+        shutil.copy2(input_path, input_copy)
+        data = {
+            "SchemaVersion": SCHEMA_VERSION,
+            "JobId": str(uuid.uuid4()),
+            "CreatedUtc": _utcnow(),
+            "InputPath": str(input_copy),
+            "OutputRoot": str(job_dir),
+            "Mode": OUTPUT_MODES.get(mode, 2),
+            "Title": title,
+            "Author": None,
+            "ElevenLabsVoiceId": voice_id,
+            "Language": language,
+            "Tts": {"Settings": {}, "Segments": []},
+            "Steps": {step: _new_step() for step in STEPS},
+            "VolumeLabels": [],
+        }
+        job = cls(job_dir, data)
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, job_dir: Path) -> "Job":
+        data = json.loads((Path(job_dir) / MANIFEST).read_text(encoding="utf-8-sig"))
+        # sørg for at alle steps/felter findes (manifest fra en ældre version eller fra GUI'en)
+        steps = data.setdefault("Steps", {})
+        for step in STEPS:
+            steps[step] = {**_new_step(), **(steps.get(step) or {})}
+        data.setdefault("Tts", None)
+        data["Tts"] = data["Tts"] or {"Settings": {}, "Segments": []}
+        data.setdefault("VolumeLabels", [])
+        return cls(job_dir, data)
+
+    def save(self):
+        with self._lock:
+            path = self.dir / MANIFEST
+            tmp = path.with_name(path.name + ".tmp")
+            tmp.write_text(json.dumps(self.data, ensure_ascii=False, indent=2), encoding="utf-8")
+            os.replace(tmp, path)
+            self._saved = time.monotonic()
+
+    @property
+    def book(self) -> str:
+        return Path(self.data.get("InputPath") or self.dir.name).name
+
+    # --- trin ---
+    def step(self, name: str) -> dict:
+        return self.data["Steps"][name]
+
+    def completed(self, name: str) -> bool:
+        st = self.step(name)
+        return st["Status"] == COMPLETED and all(Path(p).exists() for p in st.get("Outputs") or [])
+
+    def is_done(self, name: str, inputs_hash: str) -> bool:
+        return self.completed(name) and self.step(name).get("InputsHash") == inputs_hash
+
+    @contextlib.contextmanager
+    def run_step(self, name: str, inputs_hash: str):
+        """Markér trinnet Running -> Completed/Failed; kaldet lægger output-stier i st["Outputs"]."""
+        with self._lock:
+            st = self.data["Steps"][name] = {**_new_step(), "Status": RUNNING, "StartedUtc": _utcnow(),
+                                             "InputsHash": inputs_hash}
+            self.save()
+        t0 = time.perf_counter()
+        try:
+            with progress_events.stage(self.book, name), stage_profiler.stage(self.book, name):
+                yield st
+                if stage_profiler.enabled():
+                    stage_profiler.add_bytes(stage_profiler.file_bytes(st.get("Outputs") or []))
+        except BaseException as e:
+            metrics.step_seconds.observe(time.perf_counter() - t0, step=name, status="failed")
+            with self._lock:
+                st.update(Status=FAILED, FinishedUtc=_utcnow(), Error=f"{type(e).__name__}: {e}")
+                self.save()
+            raise
+        metrics.step_seconds.observe(time.perf_counter() - t0, step=name, status="ok")
+        with self._lock:
+            st.update(Status=COMPLETED, FinishedUtc=_utcnow(),
+                      Outputs=[str(p) for p in st.get("Outputs") or []])
+            self.save()
+
+    # --- TTS-segmenter ---
+    def tts_segments(self, texts: list[str], cache_keys: list[str], *, model_id: str, max_chars: int) -> list[dict]:
+        """Segmentlisten til denne kørsel; segmenter med samme nøgle, hvis fil findes, er færdige.
+
+        Segmentfiler skrives atomisk og slettes her, når nøglen skifter - så en fil betyder
+        et færdigt segment, også hvis processen stoppede før job.json blev gemt.
+        """
+        with self._lock:
+            old = {s.get("Index"): s.get("CacheKey") for s in self.data["Tts"].get("Segments") or []}
+            segments = []
+            for i, (text, key) in enumerate(zip(texts, cache_keys), start=1):
+                path = self.segment_path(i)
+                done = old.get(i) == key and path.exists()
+                if not done:
+                    path.unlink(missing_ok=True)
+                segments.append({"Index": i, "Text": text, "CacheKey": key,
+                                 "Status": COMPLETED if done else NOT_STARTED, "Error": None})
+            # bogen er blevet kortere: gamle segmenter må ikke komme med i GUI'ens DAISY-trin
+            for i in sorted(old):
+                if isinstance(i, int) and i > len(segments):
+                    self.segment_path(i).unlink(missing_ok=True)
+            self.data["Tts"] = {"Settings": {"ModelId": model_id, "OutputFormat": "mp3_44100_128",
+                                             "MaxCharsPerSegment": max_chars},
+                                "Segments": segments}
+            self.save()
+            return segments
+
+    def segment_path(self, index: int) -> Path:
+        return self.dir / "tts" / f"seg_{index:04d}.mp3"
+
+    def segment_done(self, segment: dict, *, error: str | None = None):
+        with self._lock:
+            segment.update(Status=FAILED if error else COMPLETED, Error=error)
+            if error or time.monotonic() - self._saved >= self.SAVE_INTERVAL_S:
+                self.save()
+
+    # --- volume labels ---
+    @property
+    def volume_labels(self) -> list[str]:
+        return list(self.data.get("VolumeLabels") or [])
+
+    def set_volume_labels(self, labels: list[str]):
+        with self._lock:
+            self.data["VolumeLabels"] = list(labels)
+            self.save()
+
+    def summary(self) -> str:
+        lines = [f"{self.dir}  (oprettet {self.data.get('CreatedUtc')})"]
+        for name in STEPS:
+            st = self.step(name)
+            status = STATUS_NAMES[st["Status"]] if isinstance(st["Status"], int) else str(st["Status"])
+            lines.append(f"  {name:11} {status:10} {st.get('Error') or ''}".rstrip())
+        segs = self.data["Tts"].get("Segments") or []
+        if segs:
+            done = sum(1 for s in segs if s.get("Status") == COMPLETED)
+            lines.append(f"  TTS-segmenter: {done}/{len(segs)} færdige")
+        return "\n".join(lines)
+
+
+def job_root(script_dir: Path, settings: dict) -> Path:
+    root = Path(settings.get("JOB_ROOT") or DEFAULT_JOB_ROOT)
+    return root if root.is_absolute() else Path(script_dir) / root
+
+
+def job_dir_for(root: Path, input_file: Path) -> Path:
+    # fast navn pr. inputfil, så en ny kørsel finder jobbet igen
+    key = hashlib.sha256(str(Path(input_file).resolve()).lower().encode("utf-8")).hexdigest()[:8]
+    return Path(root) / f"{Path(input_file).stem}_{key}"
+
+
+def open_job(root: Path, input_file: Path, *, mode: str, voice_id: str, language: str = "",
+             resume: bool = False) -> Job:
+    """Genoptag jobbet for input_file (resume) eller start et nyt i samme mappe."""
+    job_dir = job_dir_for(root, input_file)
+    if resume and (job_dir / MANIFEST).exists():
+        try:
+            job = Job.load(job_dir)
+        except (OSError, ValueError) as e:
+            print(f"ADVARSEL: {job_dir / MANIFEST} kan ikke læses ({e}) - starter forfra.")
+        else:
+            with job._lock:
+                job.data.update(Mode=OUTPUT_MODES.get(mode, 2), ElevenLabsVoiceId=voice_id, Language=language)
+                job.save()
+            return job
+    shutil.rmtree(job_dir, ignore_errors=True)
+    return Job.create_in_folder(job_dir, input_file, mode, voice_id, language=language, title=Path(input_file).stem)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("job_dir", type=Path, nargs="+")
+    args = ap.parse_args(argv)
+    for d in args.job_dir:
+        print(Job.load(d).summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Produktionsmetrikker til Prometheus (textfile collector og/eller et lille /metrics-endpoint).
+
+Tællere og histogrammer (kapacitetsplanlægning mod ElevenLabs-kvoten):
+    daisy_tts_requests_total{status}          kald til TTS-API'et (ok / throttled / error)
+    daisy_tts_throttled_total                 429-svar
+    daisy_tts_characters_total                tegn sendt til TTS (det kvoten tæller)
+    daisy_tts_request_seconds                 svartid pr. kald (histogram)
+    daisy_tts_cache_hits_total / _misses_total, daisy_tts_cache_hit_ratio
+    daisy_tts_bytes_total{source}             MP3-bytes fra api / cache
+    daisy_step_seconds{step,status}           jobtrin (Import ... PefBuild, IsoAndCsv) (histogram)
+    daisy_books_total{mode,status}            færdige bøger (ok / failed)
+
+settings.json:
+    METRICS_TEXTFILE     fx /var/lib/node_exporter/textfile_collector/daisy_batch.prom
+                         (skrives atomisk hvert METRICS_INTERVAL_S sekund, efter hver bog og ved exit;
+                         værdierne i en eksisterende fil læses ind, så tællerne fortsætter på
+                         tværs af kørsler - brug én fil pr. program, fx daisy_batch.prom/hot_folder.prom)
+    METRICS_PORT         hot folder: /metrics på 127.0.0.1:<port> (også --metrics-port)
+"""
+
+import atexit, math, os, re, threading
+from pathlib import Path
+
+DEFAULT_INTERVAL_S = 15.0
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STEP_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0)
+PROM_CTYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CTYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+_lock = threading.Lock()
+_metrics: list = []
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if v != int(v) else f"{int(v)}"
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: dict[tuple, float] = {} if self.labelnames else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, v in sorted(self.values.items()):
+            yield f"{self.name}_total{_labels(self.labelnames, key)} {_fmt(v)}"
+
+    def restore(self, sample: str, labels: dict, value: float):
+        if sample == f"{self.name}_total":
+            self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), *, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.values: dict[tuple, list] = {}     # nøgle -> [kumulative bucket-tal..., sum, antal]
+
+    def _row(self, key):
+        return self.values.setdefault(key, [0.0] * len(self.buckets) + [0.0, 0.0])
+
+    def observe(self, v: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            row = self._row(key)
+            for i, le in enumerate(self.buckets):
+                if v <= le:
+                    row[i] += 1
+            row[-2] += v
+            row[-1] += 1
+
+    def samples(self):
+        for key, row in sorted(self.values.items()):
+            for le, n in zip(self.buckets, row):
+                le_label = 'le="' + _fmt(le) + '"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {_fmt(n)}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(row[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {_fmt(row[-1])}"
+
+    def restore(self, sample: str, labels: dict, value: float):
+        key = self._key(labels)
+        if sample == f"{self.name}_bucket":
+            le = math.inf if labels.get("le") == "+Inf" else float(labels.get("le", "nan"))
+            if le in self.buckets:
+                self._row(key)[self.buckets.index(le)] = value
+        elif sample == f"{self.name}_sum":
+            self._row(key)[-2] = value
+        elif sample == f"{self.name}_count":
+            self._row(key)[-1] = value
+
+
+class Gauge(_Metric):
+    """Beregnet ved udskrivning (fn() -> tal)."""
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn):
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def samples(self):
+        yield f"{self.name} {_fmt(self.fn())}"
+
+    def restore(self, sample, labels, value):
+        pass
+
+
+# --- metrikkerne ---
+tts_requests = Counter("daisy_tts_requests", "Kald til TTS-API'et.", ("status",))
+tts_throttled = Counter("daisy_tts_throttled", "429-svar fra TTS-API'et.")
+tts_characters = Counter("daisy_tts_characters", "Tegn sendt til TTS (kvoten).")
+tts_latency = Histogram("daisy_tts_request_seconds", "Svartid pr. TTS-kald.", buckets=LATENCY_BUCKETS)
+tts_cache_hits = Counter("daisy_tts_cache_hits", "TTS-segmenter fundet i cachen.")
+tts_cache_misses = Counter("daisy_tts_cache_misses", "TTS-segmenter hentet fra API'et.")
+tts_bytes = Counter("daisy_tts_bytes", "MP3-bytes pr. kilde.", ("source",))
+step_seconds = Histogram("daisy_step_seconds", "Varighed af jobtrin.", ("step", "status"), buckets=STEP_BUCKETS)
+books = Counter("daisy_books", "Færdige bøger.", ("mode", "status"))
+
+
+def _hit_ratio() -> float:
+    hits, misses = tts_cache_hits.value(), tts_cache_misses.value()
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+tts_cache_hit_ratio = Gauge("daisy_tts_cache_hit_ratio", "Andel af TTS-segmenter fra cachen.", _hit_ratio)
+
+
+def render(openmetrics: bool = False) -> str:
+    lines = []
+    with _lock:
+        for m in _metrics:
+            family = m.name if (openmetrics or m.kind != "counter") else f"{m.name}_total"
+            lines.append(f"# HELP {family} {m.help}")
+            lines.append(f"# TYPE {family} {m.kind}")
+            lines.extend(m.samples())
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][\w:]*)(?:\{(.*)\})?\s+(\S+)")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def restore(text: str):
+    """Læs værdier fra en tidligere skrevet fil (tællerne fortsætter fra dem)."""
+    with _lock:
+        for line in text.splitlines():
+            m = _SAMPLE.match(line)
+            if not m or line.startswith("#"):
+                continue
+            labels = {k: v.replace('\\"', '"').replace("\\\\", "\\") for k, v in _LABEL.findall(m.group(2) or "")}
+            try:
+                value = float(m.group(3))
+            except ValueError:
+                continue
+            for metric in _metrics:
+                if m.group(1).startswith(metric.name):
+                    metric.restore(m.group(1), labels, value)
+
+
+# --- textfile ---
+_textfile: Path | None = None
+_stop = threading.Event()
+_writer: threading.Thread | None = None
+
+
+def flush():
+    """Skriv textfilen atomisk (no-op uden METRICS_TEXTFILE)."""
+    if _textfile is None:
+        return
+    try:
+        _textfile.parent.mkdir(parents=True, exist_ok=True)
+        tmp = _textfile.with_name(f".{_textfile.name}.{os.getpid()}.tmp")
+        tmp.write_text(render(), encoding="utf-8")
+        os.replace(tmp, _textfile)
+    except OSError as e:
+        print(f"ADVARSEL: metrikker kunne ikke skrives til {_textfile}: {e}")
+
+
+def configure(settings: dict, script_dir: Path | None = None):
+    global _textfile, _writer
+    target = settings.get("METRICS_TEXTFILE") or os.environ.get("DAISY_METRICS_TEXTFILE")
+    if not target or _textfile is not None:
+        return
+    path = Path(target)
+    if not path.is_absolute() and script_dir is not None:
+        path = Path(script_dir) / path
+    if path.exists():
+        restore(path.read_text(encoding="utf-8", errors="replace"))
+    _textfile = path
+    interval = float(settings.get("METRICS_INTERVAL_S") or DEFAULT_INTERVAL_S)
+
+    def loop():
+        while not _stop.wait(interval):
+            flush()
+
+    _writer = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+    _writer.start()
+    atexit.register(flush)
+    flush()
+
+
+# --- /metrics ---
+def serve_in_thread(port: int = 0, host: str = "127.0.0.1"):
+    """Start /metrics på en baggrundstråd (port 0 = vilkårlig ledig port)."""
+    # http.server indlæses kun her (scriptet importerer metrics, men serverer aldrig selv)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            om = "application/openmetrics-text" in (self.headers.get("Accept") or "")
+            body = render(openmetrics=om).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CTYPE if om else PROM_CTYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
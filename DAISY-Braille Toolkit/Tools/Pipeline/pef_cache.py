@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Cache af færdige PEF-filer, så samme punktudgave ikke laves forfra.
+
+Nøglen er en hash af det normaliserede kildeindhold + punkttabel + værktøjets
+version (Pipeline 2 / liblouis) + script (html-to-pef, dtbook-to-pef, ...) og
+evt. layout. Kildeindholdet normaliseres, så en gemt-igen .docx (ny
+docProps/ tidsstempel) eller CRLF/LF-forskelle i en .txt stadig rammer cachen.
+
+Layout (samme stil som TTS-cachen):  <cache>/<ab>/<nøgle>.pef  +  <nøgle>.json
+Eviction: mindst nyligt brugte først (mtime opdateres ved hit), når cachen
+fylder mere end max_bytes.
+"""
+
+import datetime, hashlib, json, os, shlex, shutil, unicodedata, zipfile
+from pathlib import Path
+
+DEFAULT_MAX_BYTES = 2 << 30
+
+
+def _normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFC", text.replace("\r\n", "\n").replace("\r", "\n"))
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip("\n")
+
+
+def source_digest(path: Path) -> str:
+    """SHA-256 af kildens indhold, uafhængigt af gemme-metadata."""
+    path = Path(path)
+    h = hashlib.sha256()
+    if path.suffix.lower() in (".docx", ".odt", ".epub") and zipfile.is_zipfile(path):
+        # zip-containere: medlemmernes indhold i navneorden, uden docProps/ (forfatter, tidsstempler)
+        with zipfile.ZipFile(path) as z:
+            for name in sorted(n for n in z.namelist() if not n.startswith("docProps/")):
+                h.update(name.encode("utf-8") + b"\0")
+                h.update(hashlib.sha256(z.read(name)).digest())
+        return h.hexdigest()
+    if path.suffix.lower() in (".txt", ".html", ".htm", ".xml"):
+        h.update(_normalize_text(path.read_text(encoding="utf-8", errors="ignore")).encode("utf-8"))
+        return h.hexdigest()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_fingerprint(cmd: str | list[str]) -> str:
+    """Billig versions-id for et installeret værktøj (sti + størrelse + mtime), uden at starte det."""
+    if isinstance(cmd, str):
+        parts = shlex.split(cmd, posix=(os.name != "nt")) if " " in cmd and not os.path.exists(cmd) else [cmd]
+        cmd = parts[0].strip('"') if parts else cmd
+    else:
+        cmd = cmd[0]
+    exe = shutil.which(cmd) or cmd
+    try:
+        st = os.stat(exe)
+    except OSError:
+        return f"{cmd}:?"
+    return f"{Path(exe).name}:{st.st_size}:{int(st.st_mtime)}"
+
+
+class PefCache:
+    def __init__(self, root: Path, *, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(source_hash: str, braille_table: str, version: str, script: str, extra: str = "") -> str:
+        return hashlib.sha256("|".join((source_hash, braille_table.strip(), version, script, extra))
+                              .encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pef"
+
+    def get(self, key: str, dest: Path) -> bool:
+        """Kopiér en cachet PEF til dest. True ved hit."""
+        src = self._path(key)
+        try:
+            shutil.copyfile(src, dest)
+        except FileNotFoundError:
+            return False
+        try:
+            os.utime(src)          # LRU
+        except OSError:
+            pass
+        return True
+
+    def put(self, key: str, pef_path: Path, **meta):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        shutil.copyfile(pef_path, tmp)
+        os.replace(tmp, target)
+        meta.update(created=datetime.datetime.now().isoformat(timespec="seconds"), size=target.stat().st_size)
+        target.with_suffix(".json").write_text(json.dumps(meta, ensure_ascii=False, indent=1), encoding="utf-8")
+        self.evict()
+
+    def evict(self):
+        """Slet mindst nyligt brugte PEF'er, til cachen er under max_bytes."""
+        entries, total = [], 0
+        for p in self.root.glob("*/*.pef"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, p in sorted(entries):
+            for f in (p, p.with_suffix(".json")):
+                try:
+                    f.unlink()
+                except OSError:
+                    pass
+            total -= size
+            if total <= self.max_bytes:
+                break
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""TXT -> PEF direkte med liblouis (python-modulet `louis`), uden Pipeline 2.
+
+Til almindelig tekst (afsnit adskilt af tomme linjer) er en JVM-rundtur med
+html-to-pef unødvendig: hvert afsnit oversættes med liblouis i processen,
+ombrydes til sidebredden og lægges på sider og bind. PEF-XML'en streames til
+filen side for side, så hukommelsesforbruget ikke vokser med bogens længde.
+
+Tekst der kræver rigtig formatering (tabeller, tabulatorer, sideskift) sendes
+stadig gennem Pipeline 2 - se needs_full_formatting().
+"""
+
+import datetime, html, re, threading, uuid
+from pathlib import Path
+
+BLANK = "⠀"                  # tom braillecelle
+
+_TABLE_LINE = re.compile(r"\t|\|.*\||[┌┬┐├┼┤└┴┘─│]")
+_louis_lock = threading.Lock()   # liblouis' tabel-cache er ikke thread-safe
+
+
+class PefLayout:
+    """Side- og bindopsætning (celler/linjer som i Pipeline 2's page-width/page-height)."""
+
+    def __init__(self, cols: int = 40, rows: int = 25, *, duplex: bool = True, sheets_per_volume: int = 50,
+                 indent: int = 2, page_numbers: bool = True):
+        if cols < 10 or rows < 3:
+            raise ValueError(f"Urealistisk sideformat: {cols}x{rows}")
+        self.cols = cols
+        self.rows = rows
+        self.duplex = duplex
+        self.pages_per_volume = max(1, sheets_per_volume * (2 if duplex else 1))
+        self.indent = indent
+        self.page_numbers = page_numbers
+
+    def signature(self) -> str:
+        return f"{self.cols}x{self.rows}/{int(self.duplex)}/{self.pages_per_volume}/{self.indent}/{int(self.page_numbers)}"
+
+
+def layout_from_settings(settings: dict) -> PefLayout:
+    return PefLayout(int(settings.get("PEF_COLS") or 40), int(settings.get("PEF_ROWS") or 25),
+                     duplex=bool(settings.get("PEF_DUPLEX", True)),
+                     sheets_per_volume=int(settings.get("PEF_SHEETS_PER_VOLUME") or 50),
+                     page_numbers=bool(settings.get("PEF_PAGE_NUMBERS", True)))
+
+
+def available() -> bool:
+    try:
+        import louis  # noqa: F401  (valgfri)
+    except Exception:
+        return False
+    return True
+
+
+def version() -> str:
+    """liblouis-version + dette moduls layout-version (til PEF-cachens nøgle)."""
+    import louis
+    return f"liblouis-{louis.version()}/pef_native-1"
+
+
+def louis_translator(braille_table: str):
+    """Oversætter tekst -> unicode-braille med tabellen fra BRAILLE_TABLE_BY_LANG."""
+    import louis
+    tables = [t.strip() for t in braille_table.split(",") if t.strip()]
+    mode = louis.ucBrl | louis.dotsIO
+
+    def translate(text: str) -> str:
+        with _louis_lock:
+            cells = louis.translateString(tables, text, mode=mode)
+        return cells.replace(" ", BLANK)
+
+    translate(" ")   # fejler her (ikke midt i bogen) hvis tabellen ikke findes
+    return translate
+
+
+def needs_full_formatting(text: str) -> bool:
+    """Tabeller, tabulator-kolonner og sideskift kan kun Pipeline 2 lægge pænt op."""
+    if "\f" in text:
+        return True
+    return sum(1 for line in text.splitlines() if _TABLE_LINE.search(line)) >= 3
+
+
+def iter_paragraphs(lines):
+    """Afsnit = linjer adskilt af tomme linjer (som _text_to_simple_html)."""
+    para = []
+    for line in lines:
+        line = line.strip()
+        if line:
+            para.append(line)
+        elif para:
+            yield " ".join(para)
+            para = []
+    if para:
+        yield " ".join(para)
+
+
+def wrap_braille(cells: str, width: int, indent: int = 0) -> list[str]:
+    """Ombryd en oversat tekst ved tomme celler; for lange ord deles hårdt."""
+    lines, cur = [], BLANK * indent
+    for word in (w for w in cells.split(BLANK) if w):
+        sep = BLANK if cur.strip(BLANK) else ""
+        if len(cur) + len(sep) + len(word) <= width:
+            cur += sep + word
+            continue
+        if cur.strip(BLANK):
+            lines.append(cur)
+            cur = ""
+        while len(word) > width:
+            lines.append(word[:width])
+            word = word[width:]
+        cur = word
+    if cur.strip(BLANK):
+        lines.append(cur)
+    return lines
+
+
+class _PefStream:
+    """Skriver PEF side for side og starter nyt bind, når bindet er fuldt."""
+
+    def __init__(self, f, layout: PefLayout, number):
+        self.f = f
+        self.layout = layout
+        self.number = number          # sidenummer -> braille (tomt = intet nummer)
+        self.page_no = 0
+        self.in_volume = 0
+        self.volumes = 0
+        self.rows: list[str] = []
+
+    def _body_rows(self) -> int:
+        return self.layout.rows - (1 if self.layout.page_numbers else 0)
+
+    def add(self, row: str):
+        if len(self.rows) >= self._body_rows():
+            self.flush_page()
+        self.rows.append(row)
+
+    def flush_page(self):
+        if not self.rows:
+            return
+        lay = self.layout
+        if self.in_volume == 0:
+            self.volumes += 1
+            self.f.write(f'<volume cols="{lay.cols}" rows="{lay.rows}" rowgap="0" '
+                         f'duplex="{str(lay.duplex).lower()}"><section>\n')
+        self.page_no += 1
+        out = ["<page>"]
+        if lay.page_numbers:
+            num = self.number(self.page_no)[:lay.cols]
+            out.append(f"<row>{BLANK * (lay.cols - len(num))}{num}</row>")
+        out.extend(f"<row>{html.escape(r)}</row>" for r in self.rows)
+        out.append("</page>\n")
+        self.f.write("".join(out))
+        self.rows = []
+        self.in_volume += 1
+        if self.in_volume >= lay.pages_per_volume:
+            self.f.write("</section></volume>\n")
+            self.in_volume = 0
+
+    def close(self):
+        self.flush_page()
+        if self.in_volume:
+            self.f.write("</section></volume>\n")
+            self.in_volume = 0
+
+
+def text_to_pef(text_path: Path, pef_path: Path, braille_table: str, *, lang: str = "", title: str = "",
+                layout: PefLayout | None = None, translate=None) -> tuple[int, int]:
+    """Skriv pef_path ud fra en tekstfil. Returnerer (sider, bind).
+
+    translate: tekst -> unicode-braille (standard: liblouis med braille_table).
+    """
+    layout = layout or PefLayout()
+    translate = translate or louis_translator(braille_table)
+    pef_path = Path(pef_path)
+    tmp = pef_path.with_name(pef_path.name + ".part")
+    esc = html.escape
+    with open(text_path, encoding="utf-8", errors="ignore") as src, \
+            open(tmp, "w", encoding="utf-8", newline="\n", buffering=1 << 20) as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<pef version="2008-1" xmlns="http://www.daisy.org/ns/2008/pef">\n'
+                '<head><meta xmlns:dc="http://purl.org/dc/elements/1.1/">'
+                "<dc:format>application/x-pef+xml</dc:format>"
+                f"<dc:identifier>{uuid.uuid4()}</dc:identifier>"
+                f"<dc:title>{esc(title or Path(text_path).stem)}</dc:title>"
+                + (f"<dc:language>{esc(lang)}</dc:language>" if lang else "")
+                + f"<dc:date>{datetime.date.today().isoformat()}</dc:date>"
+                f"<dc:description>{esc(braille_table)}</dc:description>"
+                "</meta></head>\n<body>\n")
+        stream = _PefStream(f, layout, lambda n: translate(str(n)) if layout.page_numbers else "")
+        for para in iter_paragraphs(src):
+            for row in wrap_braille(translate(para), layout.cols, layout.indent):
+                stream.add(row)
+        stream.close()
+        if not stream.volumes:   # tom tekst: PEF kræver mindst ét bind med én side
+            f.write(f'<volume cols="{layout.cols}" rows="{layout.rows}" rowgap="0" duplex="false">'
+                    "<section><page></page></section></volume>\n")
+        f.write("</body>\n</pef>\n")
+    tmp.replace(pef_path)
+    return stream.page_no, max(1, stream.volumes)
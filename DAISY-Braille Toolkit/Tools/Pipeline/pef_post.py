@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Efterbehandling af PEF uden at læse hele DOM'en ind: bind-opdeling og BRF.
+
+PEF'en læses side for side med iterparse (hver side ryddes væk efter brug),
+så hukommelsesforbruget er konstant uanset bogens længde. Sider kan samles
+i nye filer á højst N sider (bind til indbinding) og skrives igen som PEF
+eller som BRF (North American Braille ASCII, linjer med CRLF, sider med
+form feed) til embossere der ikke kan læse PEF.
+
+    python pef_post.py split <bog.pef> --pages 100
+    python pef_post.py brf   <bog.pef> [--pages 100]
+
+Som trin efter PEF-generering: postprocess() med PEF_SPLIT_PAGES / PEF_EXPORT.
+"""
+
+import argparse, html, re, sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+PEF_NS = "http://www.daisy.org/ns/2008/pef"
+BRAILLE_BASE = 0x2800
+# punktmønster (bit 0 = punkt 1 ... bit 5 = punkt 6) -> Braille ASCII
+BRF_ASCII = " A1B'K2L@CIF/MSP\"E3H9O6R^DJG>NTQ,*5<-U8V.%[$+X!&;:4\\0Z7(_?W]#Y)="
+VOLUME_ATTRS = ("cols", "rows", "rowgap", "duplex")
+# punkt 7/8 kan ikke vises i BRF og droppes; alt andet end braille og mellemrum bliver mellemrum
+_BRF_TABLE = {BRAILLE_BASE + i: BRF_ASCII[i & 63] for i in range(256)}
+_BRF_UNMAPPED = re.compile("[^\u2800-\u283f ]")
+
+
+def _q(tag: str) -> str:
+    return f"{{{PEF_NS}}}{tag}"
+
+
+class Page:
+    __slots__ = ("volume", "section", "section_no", "rows")
+
+    def __init__(self, volume: dict, section: dict, section_no: int, rows: list[str]):
+        self.volume = volume          # <volume>-attributter (cols, rows, duplex, ...)
+        self.section = section        # <section>-attributter (kan overskrive volume)
+        self.section_no = section_no  # løbenummer, så sektionsgrænser kan bevares
+        self.rows = rows
+
+    @property
+    def duplex(self) -> bool:
+        return (self.section.get("duplex") or self.volume.get("duplex") or "").lower() == "true"
+
+
+def read_head(pef_path: Path) -> bytes:
+    """<head>-elementet (metadata) som XML; læser kun til head er slut."""
+    for _, el in ET.iterparse(str(pef_path), events=("end",)):
+        if el.tag == _q("head"):
+            ET.register_namespace("", PEF_NS)
+            ET.register_namespace("dc", "http://purl.org/dc/elements/1.1/")
+            return ET.tostring(el, encoding="utf-8")
+    return b""
+
+
+def iter_pages(pef_path: Path):
+    """Siderne i rækkefølge som Page-objekter; hver side fjernes fra træet efter brug."""
+    stack: list[ET.Element] = []
+    volume: dict = {}
+    section: dict = {}
+    section_no = 0
+    for event, el in ET.iterparse(str(pef_path), events=("start", "end")):
+        if event == "start":
+            stack.append(el)
+            if el.tag == _q("volume"):
+                volume = dict(el.attrib)
+            elif el.tag == _q("section"):
+                section = dict(el.attrib)
+                section_no += 1
+            continue
+        stack.pop()
+        if el.tag == _q("page"):
+            rows = ["".join(r.itertext()) for r in el if r.tag == _q("row")]
+            yield Page(volume, section, section_no, rows)
+            el.clear()
+            if stack:
+                stack[-1].remove(el)
+        elif el.tag in (_q("section"), _q("volume")) and stack:
+            stack[-1].remove(el)
+
+
+def count_pages(pef_path: Path) -> int:
+    return sum(1 for _ in iter_pages(pef_path))
+
+
+def _split_size(max_pages: int, duplex: bool) -> int:
+    # dobbeltsidet: et nyt bind må ikke starte på bagsiden af et ark
+    if duplex and max_pages > 1 and max_pages % 2:
+        return max_pages - 1
+    return max(1, max_pages)
+
+
+def _chunks(pef_path: Path, max_pages: int):
+    """(bind-nr, side) for alle sider; bind skifter efter højst max_pages sider."""
+    part, in_part, size = 1, 0, None
+    for page in iter_pages(pef_path):
+        if size is None:
+            size = _split_size(max_pages, page.duplex) if max_pages > 0 else 0
+        if size and in_part >= size:
+            part += 1
+            in_part = 0
+        in_part += 1
+        yield part, page
+
+
+def _part_paths(pef_path: Path, suffix: str, parts: int, out_dir: Path | None) -> list[Path]:
+    pef_path = Path(pef_path)
+    out_dir = Path(out_dir) if out_dir else pef_path.parent
+    if parts <= 1:
+        return [out_dir / (pef_path.stem + suffix)]
+    return [out_dir / f"{pef_path.stem}_{k}af{parts}{suffix}" for k in range(1, parts + 1)]
+
+
+def _parts_needed(pef_path: Path, max_pages: int) -> int:
+    if max_pages <= 0:
+        return 1
+    last = 0
+    for last, _ in _chunks(pef_path, max_pages):
+        pass
+    return max(1, last)
+
+
+class _PefWriter:
+    def __init__(self, path: Path, head: bytes):
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".part")
+        self.f = open(self.tmp, "w", encoding="utf-8", newline="\n", buffering=1 << 20)
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     f'<pef version="2008-1" xmlns="{PEF_NS}">\n')
+        self.f.write(head.decode("utf-8") + "\n<body>\n")
+        self.volume: dict | None = None
+        self.section_no = None
+
+    def add(self, page: Page):
+        if self.volume is not page.volume:
+            self._close_volume()
+            attrs = "".join(f' {k}="{html.escape(page.volume[k])}"' for k in VOLUME_ATTRS if k in page.volume)
+            self.f.write(f"<volume{attrs}>")
+            self.volume = page.volume
+        if self.section_no != page.section_no:
+            if self.section_no is not None:
+                self.f.write("</section>\n")
+            attrs = "".join(f' {k}="{html.escape(v)}"' for k, v in page.section.items())
+            self.f.write(f"<section{attrs}>\n")
+            self.section_no = page.section_no
+        self.f.write("<page>" + "".join(f"<row>{html.escape(r)}</row>" for r in page.rows) + "</page>\n")
+
+    def _close_volume(self):
+        if self.volume is not None:
+            self.f.write("</section></volume>\n")
+        self.volume = None
+        self.section_no = None
+
+    def close(self):
+        self._close_volume()
+        self.f.write("</body>\n</pef>\n")
+        self.f.close()
+        self.tmp.replace(self.path)
+
+
+class _BrfWriter:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.tmp = self.path.with_name(self.path.name + ".part")
+        self.f = open(self.tmp, "w", encoding="ascii", newline="", buffering=1 << 20)
+        self.pages = 0
+        self.unmapped = 0
+
+    def add(self, page: Page):
+        if self.pages:
+            self.f.write("\f")
+        self.f.write("".join(self.line(r) + "\r\n" for r in page.rows))
+        self.pages += 1
+
+    def line(self, row: str) -> str:
+        out = row.translate(_BRF_TABLE)
+        bad = _BRF_UNMAPPED.findall(row)
+        if bad:
+            self.unmapped += len(bad)
+            out = "".join(_BRF_TABLE.get(ord(c), " ") for c in row)
+        return out.rstrip()
+
+    def close(self):
+        self.f.write("\f\r\n" if self.pages else "")
+        self.f.close()
+        self.tmp.replace(self.path)
+        if self.unmapped:
+            print(f"ADVARSEL: {self.unmapped} tegn i {self.path.name} kan ikke vises i 6-punkt BRF.")
+
+
+def _convert(pef_path: Path, max_pages: int, suffix: str, make_writer, out_dir: Path | None) -> list[Path]:
+    paths = _part_paths(pef_path, suffix, _parts_needed(pef_path, max_pages), out_dir)
+    writer, current = None, 0
+    try:
+        for part, page in _chunks(pef_path, max_pages):
+            if part != current:
+                if writer:
+                    writer.close()
+                writer, current = make_writer(paths[part - 1]), part
+            writer.add(page)
+        if writer is None:          # tom PEF
+            writer = make_writer(paths[0])
+        writer.close()
+    except BaseException:
+        if writer and not writer.f.closed:
+            writer.f.close()
+            writer.tmp.unlink(missing_ok=True)
+        raise
+    return paths
+
+
+def split_pef(pef_path: Path, max_pages: int, *, out_dir: Path | None = None) -> list[Path]:
+    """Del en PEF i filer á højst max_pages sider: <navn>_1afN.pef ... (én fil = uændret)."""
+    pef_path = Path(pef_path)
+    if _parts_needed(pef_path, max_pages) <= 1 and not out_dir:
+        return [pef_path]
+    head = read_head(pef_path)
+    return _convert(pef_path, max_pages, ".pef", lambda p: _PefWriter(p, head), out_dir)
+
+
+def write_brf(pef_path: Path, *, max_pages: int = 0, out_dir: Path | None = None) -> list[Path]:
+    """PEF -> BRF (6-punkt Braille ASCII), evt. delt i bind á højst max_pages sider."""
+    return _convert(Path(pef_path), max_pages, ".brf", _BrfWriter, out_dir)
+
+
+def postprocess(pef_path: Path, settings: dict) -> list[Path]:
+    """Valgfrit trin efter PEF-generering.
+
+    settings: PEF_SPLIT_PAGES (0 = ingen opdeling), PEF_EXPORT ("brf" eller tom).
+    Returnerer de ekstra filer der blev skrevet.
+    """
+    max_pages = int(settings.get("PEF_SPLIT_PAGES") or 0)
+    formats = {f.strip().lower() for f in str(settings.get("PEF_EXPORT") or "").split(",") if f.strip()}
+    unknown = formats - {"brf"}
+    if unknown:
+        raise ValueError(f"Ukendt PEF_EXPORT: {', '.join(sorted(unknown))}")
+    written: list[Path] = []
+    if max_pages > 0:
+        written += [p for p in split_pef(pef_path, max_pages) if p != Path(pef_path)]
+    if "brf" in formats:
+        written += write_brf(pef_path, max_pages=max_pages)
+    return written
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("split", help="del PEF i bind á højst --pages sider")
+    s.add_argument("pef", type=Path)
+    s.add_argument("--pages", type=int, required=True)
+    s.add_argument("--out-dir", type=Path, default=None)
+    b = sub.add_parser("brf", help="skriv BRF (evt. delt i bind)")
+    b.add_argument("pef", type=Path)
+    b.add_argument("--pages", type=int, default=0)
+    b.add_argument("--out-dir", type=Path, default=None)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "split":
+        paths = split_pef(args.pef, args.pages, out_dir=args.out_dir)
+    else:
+        paths = write_brf(args.pef, max_pages=args.pages, out_dir=args.out_dir)
+    for p in paths:
+        print(p)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
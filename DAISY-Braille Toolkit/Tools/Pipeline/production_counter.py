@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Løbenumre til volume labels (<PREFIX>_DDMMYY_NNN) i en SQLite-database.
+
+Hver reservation er én transaktion (BEGIN IMMEDIATE), så to samtidige kørsler
+aldrig får samme nummer, og et nedbrud midt i en skrivning efterlader enten
+den gamle eller den nye tæller - aldrig en halv fil. En batch kan reservere
+en hel blok af numre på én gang.
+
+Lokalt køres databasen i WAL-mode. WAL kræver delt hukommelse og virker ikke
+på netværksdrev; med COUNTER_SHARED (fælles tæller for flere arbejdsstationer
+på et share) bruges i stedet SQLite's almindelige rollback-journal og fil-låse.
+
+Første gang databasen oprettes, overtages tællerne fra production_counter.json.
+
+    python production_counter.py [--db production_counter.sqlite]     (vis tællere)
+"""
+
+import argparse, json, sqlite3, sys
+from pathlib import Path
+
+DEFAULT_DB = "production_counter.sqlite"
+LEGACY_JSON = "production_counter.json"
+SCHEMA_VERSION = 1
+BUSY_TIMEOUT_S = 30.0
+
+
+class CounterStore:
+    def __init__(self, path: Path, *, shared: bool = False, legacy_json: Path | None = None,
+                 timeout: float = BUSY_TIMEOUT_S):
+        self.path = Path(path)
+        self.shared = shared
+        self.legacy_json = Path(legacy_json) if legacy_json else None
+        self.timeout = timeout
+        self._initialised = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # ny forbindelse pr. kald: sikker på tværs af tråde, og billig i forhold til en ISO
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+        if not self._initialised:
+            con.execute(f"PRAGMA journal_mode={'DELETE' if self.shared else 'WAL'}")
+            self._migrate(con)
+            self._initialised = True
+        con.execute("PRAGMA synchronous=FULL" if self.shared else "PRAGMA synchronous=NORMAL")
+        return con
+
+    def _migrate(self, con: sqlite3.Connection):
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            if con.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                con.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, next INTEGER NOT NULL)")
+                for key, value in self._legacy_counters().items():
+                    con.execute("INSERT INTO counters(key, next) VALUES(?, ?) "
+                                "ON CONFLICT(key) DO UPDATE SET next = max(next, excluded.next)", (key, value))
+                con.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+    def _legacy_counters(self) -> dict[str, int]:
+        if not self.legacy_json or not self.legacy_json.exists():
+            return {}
+        try:
+            data = json.loads(self.legacy_json.read_text(encoding="utf-8-sig"))
+        except (OSError, ValueError):
+            return {}
+        return {str(k): int(v or 0) for k, v in data.items() if str(v or 0).isdigit()}
+
+    def reserve(self, key: str, count: int = 1, *, max_seq: int = 999) -> int:
+        """Reservér count fortløbende numre for key og returnér det første."""
+        if count < 1:
+            raise ValueError("count skal være mindst 1")
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            row = con.execute("SELECT next FROM counters WHERE key = ?", (key,)).fetchone()
+            first = row[0] if row else 0
+            if first + count - 1 > max_seq:
+                con.execute("ROLLBACK")
+                raise RuntimeError(f"Sequence exhausted for {key}: {first + count - 1} > {max_seq}")
+            con.execute("INSERT INTO counters(key, next) VALUES(?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET next = excluded.next", (key, first + count))
+            con.execute("COMMIT")
+            return first
+        finally:
+            con.close()
+
+    def advance(self, key: str, next_no: int) -> bool:
+        """Sæt tælleren til mindst next_no (fx numre reserveret på en anden arbejdsstation). True hvis ændret."""
+        con = self._connect()
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            cur = con.execute("INSERT INTO counters(key, next) VALUES(?, ?) "
+                              "ON CONFLICT(key) DO UPDATE SET next = excluded.next WHERE next < excluded.next",
+                              (key, next_no))
+            con.execute("COMMIT")
+            return cur.rowcount > 0
+        finally:
+            con.close()
+
+    def counters(self) -> dict[str, int]:
+        con = self._connect()
+        try:
+            return dict(con.execute("SELECT key, next FROM counters ORDER BY key"))
+        finally:
+            con.close()
+
+
+def open_store(script_dir: Path, settings: dict) -> CounterStore:
+    """Tællerdatabase ud fra settings.
+
+    COUNTER_DB_PATH: databasefil (relativ til script-mappen). Peger den på en
+    gammel .json, bruges en .sqlite ved siden af, og json'en importeres.
+    COUNTER_SHARED: true når databasen ligger på et netværksdrev.
+    """
+    path = Path(settings.get("COUNTER_DB_PATH") or DEFAULT_DB)
+    if not path.is_absolute():
+        path = Path(script_dir) / path
+    legacy = path.with_name(LEGACY_JSON)
+    if path.suffix.lower() == ".json":
+        path, legacy = path.with_suffix(".sqlite"), path
+    return CounterStore(path, shared=bool(settings.get("COUNTER_SHARED", False)), legacy_json=legacy)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", type=Path, default=Path(DEFAULT_DB))
+    ap.add_argument("--shared", action="store_true")
+    args = ap.parse_args(argv)
+    store = CounterStore(args.db, shared=args.shared, legacy_json=args.db.with_name(LEGACY_JSON))
+    for key, value in store.counters().items():
+        print(f"{key}: næste {value:03d}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
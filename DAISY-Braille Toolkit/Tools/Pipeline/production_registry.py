@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Produktionsregister: alle produktioner i én lokal SQLite-database.
+
+"metadata daisy.txt" kræver, at alle produktioner gemmes, så et volume label
+kan slås op. Hver kørsel registreres i én transaktion med hele CSV-rækken
+(skabelonens felter) og indekseres på volume label, titel, dato, stemme og
+originaldokumenternes navne. Opslag er indeks-opslag, så de tager under et
+millisekund selv med titusinder af produktioner.
+
+Eksport: DBT_Productions.csv (SharePoint-listen, se provisioning/seed-data) og
+Epson Total Disc Maker: kolonnerne læses fra skabelonen i Data/Templates
+("CSV file for Epson Total Disk Maker (EN).csv"), og registrets felter placeres i dem.
+
+    python production_registry.py label DBS_241225_001
+    python production_registry.py find [--title T] [--voice V] [--date DDMMYY] [--original NAVN]
+    python production_registry.py export dbt|epson <fil.csv> [--since DDMMYY] [--template SKABELON.csv]
+    python production_registry.py import <mappe>       (gamle .csv-filer ved siden af bøgerne)
+"""
+
+import argparse, csv, datetime, getpass, json, os, platform, re, sqlite3, sys, time
+from pathlib import Path
+
+DEFAULT_DB = "production_registry.sqlite"
+SCHEMA_VERSION = 1
+BUSY_TIMEOUT_S = 30.0
+DBT_HEADERS = ["VolumeLabel", "Prefix", "DateKey", "Sequence", "Status", "ReservedAt", "ReservedBy"]
+DBT_STATUS = {"ok": "Completed", "fejl": "Cancelled", "i gang": "InProgress"}
+EPSON_TEMPLATE = (Path(__file__).resolve().parents[2] / "Data" / "Templates"
+                  / "CSV file for Epson Total Disk Maker (EN).csv")
+# Epson-kolonne (begyndelsen, små bogstaver) -> de danske kolonner i metadata-CSV'en ("metadata daisy.txt").
+# Kolonnens eget navn matches også, så en engelsk metadata-skabelon virker uden ændringer.
+EPSON_FIELDS = {
+    "duration": ("lengte",),
+    "voice": ("stemme",),
+    "language": ("sprog",),
+    "produced for": ("pruduceret for", "produceret for"),
+    "title": ("titel",),
+    "recording date": ("dato",),
+    "recording time": ("tid",),
+    "produced from": ("pruduceret af", "produceret af"),
+    "employee abbreviation": ("medarbejder", "initialer"),
+    "daisy version": ("daisy vertion", "daisy version"),
+    "return address": ("afsender",),
+    "volume label": ("volume label",),
+    "write data": ("write data",),
+    "original document": ("orginal", "original"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS productions (
+    id INTEGER PRIMARY KEY,
+    created TEXT NOT NULL,
+    date TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    voice TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    lang TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'ok',
+    user TEXT NOT NULL DEFAULT '',
+    host TEXT NOT NULL DEFAULT '',
+    csv_path TEXT NOT NULL DEFAULT '',
+    headers TEXT NOT NULL,
+    row TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS volumes (
+    label TEXT PRIMARY KEY,
+    production_id INTEGER NOT NULL REFERENCES productions(id) ON DELETE CASCADE,
+    disc INTEGER NOT NULL,
+    iso_name TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS originals (
+    name TEXT NOT NULL COLLATE NOCASE,
+    production_id INTEGER NOT NULL REFERENCES productions(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS ix_productions_title ON productions(title);
+CREATE INDEX IF NOT EXISTS ix_productions_date ON productions(date);
+CREATE INDEX IF NOT EXISTS ix_productions_voice ON productions(voice, date);
+CREATE INDEX IF NOT EXISTS ix_volumes_production ON volumes(production_id);
+CREATE INDEX IF NOT EXISTS ix_originals_name ON originals(name);
+CREATE INDEX IF NOT EXISTS ix_originals_production ON originals(production_id);
+"""
+
+_LABEL = re.compile(r"^(?P<prefix>.+)_(?P<date>\d{6})_(?P<seq>\d+)$")
+
+
+def _field(headers: list[str], row: list[str], *prefixes: str) -> str:
+    """Værdien i den første kolonne hvis navn starter med et af prefixes (som prompt_metadata)."""
+    for h, v in zip(headers, row):
+        hl = h.lower()
+        if any(hl.startswith(p) for p in prefixes):
+            return v or ""
+    return ""
+
+
+def _split_list(value: str, sep: str) -> list[str]:
+    return [x.strip() for x in (value or "").split(sep) if x.strip()]
+
+
+def epson_headers(template: Path | None = None) -> list[str]:
+    """Kolonnerne fra Total Disc Maker-skabelonen (første linje, ;-separeret)."""
+    with open(template or EPSON_TEMPLATE, encoding="utf-8-sig", newline="") as f:
+        return next(csv.reader(f, delimiter=";"), [])
+
+
+def _epson_duration(value: str) -> str:
+    """Lengte fra metadata-CSV'en ("5421.3s") -> timer:minutter; tegnantal (kun punkt) er ingen varighed."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d*)?)\s*s\s*", value or "")
+    if not m:
+        return "" if "chars" in (value or "") else (value or "")
+    minutes = round(float(m.group(1)) / 60)
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+def parse_date(value: str) -> str:
+    """DDMMYY (som i labels og CSV) eller YYYY-MM-DD -> YYYY-MM-DD."""
+    value = (value or "").strip()
+    for fmt in ("%d%m%y", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Ukendt datoformat: {value!r} (brug DDMMYY eller YYYY-MM-DD)")
+
+
+class Registry:
+    def __init__(self, path: Path, *, shared: bool = False, timeout: float = BUSY_TIMEOUT_S):
+        self.path = Path(path)
+        self.shared = shared
+        self.timeout = timeout
+        self._con: sqlite3.Connection | None = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Én forbindelse pr. Registry (opslag genbruger den); brug ikke samme objekt fra flere tråde."""
+        if self._con is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            con = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None)
+            con.row_factory = sqlite3.Row
+            # WAL kræver delt hukommelse - ikke på netværksdrev (samme regel som production_counter)
+            con.execute(f"PRAGMA journal_mode={'DELETE' if self.shared else 'WAL'}")
+            con.execute("PRAGMA foreign_keys=ON")
+            if con.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                con.executescript("BEGIN IMMEDIATE;" + _SCHEMA + f"PRAGMA user_version={SCHEMA_VERSION}; COMMIT;")
+            self._con = con
+        return self._con
+
+    def close(self):
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----- Skrivning -----
+    def record(self, headers: list[str], row: list[str], *, status: str = "ok", csv_path: Path | None = None,
+               created: datetime.datetime | None = None) -> int:
+        """Registrér (eller opdatér) en produktion ud fra metadata-rækken. Returnerer id.
+
+        Findes rækkens første volume label allerede, opdateres den produktion
+        (fx når CSV'en skrives igen efter ISO'en).
+        """
+        labels = _split_list(_field(headers, row, "volume label"), ",")
+        isos = _split_list(_field(headers, row, "write data"), ",")
+        originals = _split_list(_field(headers, row, "orginal", "original"), ";")
+        created = created or datetime.datetime.now()
+        date_raw = next((v for h, v in zip(headers, row) if "dato" in h.lower() and v), "")
+        try:
+            date = parse_date(date_raw)
+        except ValueError:
+            date = created.date().isoformat()
+        values = dict(created=created.isoformat(timespec="seconds"), date=date,
+                      title=_field(headers, row, "titel", "title"), voice=_field(headers, row, "stemme", "voice"),
+                      lang=_field(headers, row, "sprog", "lang"), status=status,
+                      user=_user(), host=platform.node(), csv_path=str(csv_path or ""),
+                      headers=json.dumps(list(headers), ensure_ascii=False),
+                      row=json.dumps(list(row), ensure_ascii=False))
+        con = self.connect()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            hit = con.execute("SELECT production_id FROM volumes WHERE label = ?", (labels[0],)).fetchone() \
+                if labels else None
+            if hit:
+                pid = hit[0]
+                values.pop("created")
+                con.execute(f"UPDATE productions SET {', '.join(f'{k} = :{k}' for k in values)} WHERE id = :id",
+                            dict(values, id=pid))
+                con.execute("DELETE FROM volumes WHERE production_id = ?", (pid,))
+                con.execute("DELETE FROM originals WHERE production_id = ?", (pid,))
+            else:
+                cols = ", ".join(values)
+                pid = con.execute(f"INSERT INTO productions({cols}) VALUES({', '.join(':' + k for k in values)})",
+                                  values).lastrowid
+            con.executemany("INSERT OR REPLACE INTO volumes(label, production_id, disc, iso_name) VALUES(?, ?, ?, ?)",
+                            [(label, pid, k, isos[k - 1] if k <= len(isos) else "")
+                             for k, label in enumerate(labels, start=1)])
+            con.executemany("INSERT INTO originals(name, production_id) VALUES(?, ?)",
+                            [(name, pid) for name in originals])
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        return pid
+
+    # ----- Opslag -----
+    def _expand(self, rows) -> list[dict]:
+        con = self.connect()
+        out = []
+        for r in rows:
+            d = dict(r)
+            d["labels"] = [v[0] for v in con.execute(
+                "SELECT label FROM volumes WHERE production_id = ? ORDER BY disc", (d["id"],))]
+            d["isos"] = [v[0] for v in con.execute(
+                "SELECT iso_name FROM volumes WHERE production_id = ? ORDER BY disc", (d["id"],)) if v[0]]
+            d["originals"] = [v[0] for v in con.execute(
+                "SELECT name FROM originals WHERE production_id = ?", (d["id"],))]
+            d["headers"] = json.loads(d["headers"])
+            d["row"] = json.loads(d["row"])
+            out.append(d)
+        return out
+
+    def by_label(self, label: str) -> dict | None:
+        rows = self.connect().execute(
+            "SELECT p.* FROM volumes v JOIN productions p ON p.id = v.production_id WHERE v.label = ?",
+            (label.strip(),)).fetchall()
+        hits = self._expand(rows)
+        return hits[0] if hits else None
+
+    def find(self, *, title: str = "", voice: str = "", date: str = "", original: str = "",
+             limit: int = 50) -> list[dict]:
+        """Søg (titel og originalnavn: begynder med, uden forskel på store/små bogstaver)."""
+        where, args = [], []
+        if title:
+            where.append("p.title LIKE ? ESCAPE '\\'")
+            args.append(_like_prefix(title))
+        if voice:
+            where.append("p.voice = ?")
+            args.append(voice)
+        if date:
+            where.append("p.date = ?")
+            args.append(parse_date(date))
+        if original:
+            where.append("p.id IN (SELECT production_id FROM originals WHERE name LIKE ? ESCAPE '\\')")
+            args.append(_like_prefix(original))
+        sql = "SELECT p.* FROM productions p"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.created DESC LIMIT ?"
+        return self._expand(self.connect().execute(sql, args + [limit]).fetchall())
+
+    def iter_all(self, *, since: str = ""):
+        sql, args = "SELECT * FROM productions", []
+        if since:
+            sql += " WHERE date >= ?"
+            args.append(parse_date(since))
+        for r in self.connect().execute(sql + " ORDER BY created, id", args):
+            yield from self._expand([r])
+
+    # ----- Eksport -----
+    def dbt_rows(self, *, since: str = ""):
+        """Én dict pr. volume label med DBT_Productions-listens kolonner (DBT_HEADERS)."""
+        for p in self.iter_all(since=since):
+            for label in p["labels"]:
+                m = _LABEL.match(label)
+                prefix, date_key, seq = (m["prefix"], m["date"], str(int(m["seq"]))) if m else ("", "", "")
+                yield dict(zip(DBT_HEADERS, (label, prefix, date_key, seq, DBT_STATUS.get(p["status"], p["status"]),
+                                             p["created"], p["user"])))
+
+    def export_dbt(self, csv_path: Path, *, since: str = "") -> int:
+        """DBT_Productions.csv-layoutet (som provisioning/seed-data)."""
+        n = 0
+        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f, quoting=csv.QUOTE_ALL)
+            w.writerow(DBT_HEADERS)
+            for r in self.dbt_rows(since=since):
+                w.writerow([r[h] for h in DBT_HEADERS])
+                n += 1
+        return n
+
+    def epson_row(self, p: dict, columns: list[str]) -> list[str]:
+        """Produktionen p (iter_all) i Total Disc Maker-skabelonens kolonner."""
+        fallback = {"voice": p["voice"], "language": p["lang"], "title": p["title"], "employee abbreviation": p["user"],
+                    "volume label": ", ".join(p["labels"]), "write data": ", ".join(p["isos"]),
+                    "original document": ";".join(p["originals"])}
+        out = []
+        for col in columns:
+            cl = col.strip().lower()
+            key = next((k for k in EPSON_FIELDS if cl.startswith(k)), "")
+            value = _field(p["headers"], p["row"], cl, *EPSON_FIELDS.get(key, ())) or fallback.get(key, "")
+            out.append(_epson_duration(value) if key == "duration" else value)
+        return out
+
+    def export_epson(self, csv_path: Path, *, since: str = "", template: Path | None = None) -> int:
+        """Én række pr. produktion i Epson Total Disc Maker-skabelonens layout (;-separeret)."""
+        columns = epson_headers(template)
+        n = 0
+        with open(csv_path, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f, delimiter=";")
+            w.writerow(columns)
+            for p in self.iter_all(since=since):
+                w.writerow(self.epson_row(p, columns))
+                n += 1
+        return n
+
+    # ----- Import -----
+    def import_csv_files(self, root: Path) -> int:
+        """Registrér gamle én-rækkes metadata-CSV'er (write_metadata_csv) under root."""
+        n = 0
+        for p in sorted(Path(root).rglob("*.csv")):
+            try:
+                with open(p, encoding="utf-8-sig", newline="") as f:
+                    rows = list(csv.reader(f, delimiter=";"))
+            except (OSError, UnicodeDecodeError):
+                continue
+            if len(rows) != 2 or not _field(rows[0], rows[1], "volume label"):
+                continue
+            self.record(rows[0], rows[1], csv_path=p,
+                        created=datetime.datetime.fromtimestamp(p.stat().st_mtime))
+            n += 1
+        return n
+
+
+def _like_prefix(text: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", text.strip()) + "%"
+
+
+def _user() -> str:
+    try:
+        return getpass.getuser()
+    except Exception:
+        return os.environ.get("USERNAME", "")
+
+
+def open_registry(script_dir: Path, settings: dict) -> Registry:
+    """REGISTRY_DB_PATH (relativ til script-mappen), REGISTRY_SHARED (netværksdrev)."""
+    path = Path(settings.get("REGISTRY_DB_PATH") or DEFAULT_DB)
+    if not path.is_absolute():
+        path = Path(script_dir) / path
+    return Registry(path, shared=bool(settings.get("REGISTRY_SHARED", False)))
+
+
+def _print(p: dict):
+    print(f"{', '.join(p['labels']) or '(intet label)'}  {p['date']}  {p['title']}  [{p['voice']}]  {p['status']}")
+    if p["isos"]:
+        print(f"    ISO: {', '.join(p['isos'])}")
+    if p["originals"]:
+        print(f"    Original: {'; '.join(p['originals'])}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--db", type=Path, default=Path(__file__).resolve().parent / DEFAULT_DB)
+    ap.add_argument("--shared", action="store_true")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    lb = sub.add_parser("label", help="slå et volume label op")
+    lb.add_argument("label")
+    fd = sub.add_parser("find", help="søg på titel, stemme, dato eller originalnavn")
+    fd.add_argument("--title", default="")
+    fd.add_argument("--voice", default="")
+    fd.add_argument("--date", default="")
+    fd.add_argument("--original", default="")
+    fd.add_argument("--limit", type=int, default=50)
+    ex = sub.add_parser("export", help="eksportér til DBT_Productions.csv eller Epson-CSV")
+    ex.add_argument("layout", choices=("dbt", "epson"))
+    ex.add_argument("csv", type=Path)
+    ex.add_argument("--since", default="")
+    ex.add_argument("--template", type=Path, default=None, help="Epson-skabelon (standard: Data/Templates)")
+    im = sub.add_parser("import", help="registrér gamle metadata-CSV'er fra en mappe")
+    im.add_argument("root", type=Path)
+    args = ap.parse_args(argv)
+
+    with Registry(args.db, shared=args.shared) as reg:
+        t0 = time.perf_counter()
+        if args.cmd == "label":
+            hit = reg.by_label(args.label)
+            if not hit:
+                print(f"{args.label}: ikke fundet")
+                return 1
+            _print(hit)
+            for h, v in zip(hit["headers"], hit["row"]):
+                print(f"    {h}: {v}")
+        elif args.cmd == "find":
+            hits = reg.find(title=args.title, voice=args.voice, date=args.date, original=args.original,
+                            limit=args.limit)
+            for p in hits:
+                _print(p)
+            print(f"{len(hits)} produktion(er), {(time.perf_counter() - t0) * 1000:.2f} ms")
+        elif args.cmd == "export":
+            if args.layout == "dbt":
+                n = reg.export_dbt(args.csv, since=args.since)
+            else:
+                n = reg.export_epson(args.csv, since=args.since, template=args.template)
+            print(f"{n} rækker -> {args.csv}")
+        else:
+            print(f"{reg.import_csv_files(args.root)} produktion(er) importeret")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
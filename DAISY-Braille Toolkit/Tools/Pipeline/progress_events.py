@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Strukturerede fremdrifts-events som JSON lines (til GUI'ens progress bar og dashboards).
+
+Én linje pr. event, fx
+    {"t": 12.034, "ts": "2026-10-19T07:40:02", "event": "segment", "book": "bog.docx",
+     "done": 17, "total": 120, "bytes": 48213, "cached": false}
+
+t er sekunder (monotont ur) siden udsenderen blev slået til, så varigheder kan
+regnes direkte; ts er vægurets tid. Events:
+    job_start / job_end      book, mode, status, seconds
+    stage_start / stage_end  book, stage, status, seconds (+ evt. skipped=true ved resume)
+    segment                  book, done, total, bytes (hentet fra API), cached
+    queue                    source, depth, capacity
+Flere tråde kan kalde emit() samtidig; hver linje skrives helt under én lås.
+Slået fra (standard) koster et kald kun et opslag af en global.
+
+Slås til med PROGRESS_EVENTS i settings.json eller miljøvariablen DAISY_PROGRESS_EVENTS:
+en filsti (tilføjes), "-" for stderr. Den resident worker sender dem som "progress"-notifikationer.
+"""
+
+import contextlib, datetime, json, os, sys, threading, time
+from pathlib import Path
+
+ENV_VAR = "DAISY_PROGRESS_EVENTS"
+
+_sink = None                 # callable(dict) eller None (slået fra)
+_lock = threading.Lock()
+_t0 = time.monotonic()
+_file = None
+
+
+def enabled() -> bool:
+    return _sink is not None
+
+
+def emit(event: str, **fields):
+    if _sink is None:
+        return
+    rec = {"t": round(time.monotonic() - _t0, 3), "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+           "event": event, **fields}
+    try:
+        _sink(rec)
+    except Exception:
+        pass                 # fremdrift må aldrig vælte en produktion
+
+
+def _stream_sink(stream):
+    def write(rec: dict):
+        line = json.dumps(rec, ensure_ascii=False, default=str) + "\n"
+        with _lock:
+            stream.write(line)
+            stream.flush()
+    return write
+
+
+def configure(target=None):
+    """target: filsti, "-" (stderr), en åben tekststrøm, en callable(dict) - eller None (slå fra)."""
+    global _sink, _file, _t0
+    with _lock:
+        if _file is not None:
+            _file.close()
+            _file = None
+    if target is None or target == "":
+        _sink = None
+        return
+    _t0 = time.monotonic()
+    if callable(target):
+        _sink = target
+    elif target == "-":
+        _sink = _stream_sink(sys.stderr)
+    elif hasattr(target, "write"):
+        _sink = _stream_sink(target)
+    else:
+        path = Path(target)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _file = open(path, "a", encoding="utf-8", buffering=1)
+        _sink = _stream_sink(_file)
+
+
+def configure_from_settings(settings: dict, script_dir: Path | None = None):
+    target = os.environ.get(ENV_VAR) or settings.get("PROGRESS_EVENTS") or None
+    if target and target != "-" and script_dir is not None and not Path(target).is_absolute():
+        target = str(Path(script_dir) / target)
+    configure(target)
+
+
+@contextlib.contextmanager
+def stage(book: str, name: str, **fields):
+    """stage_start ... stage_end med varighed og status (ok/fejl)."""
+    if _sink is None:
+        yield
+        return
+    t = time.monotonic()
+    emit("stage_start", book=book, stage=name, **fields)
+    status = "fejl"
+    try:
+        yield
+        status = "ok"
+    finally:
+        emit("stage_end", book=book, stage=name, status=status, seconds=round(time.monotonic() - t, 3), **fields)
+
+
+def skipped(book: str, name: str):
+    """Et trin der ikke køres (resume: færdigt i forvejen)."""
+    emit("stage_end", book=book, stage=name, status="ok", seconds=0.0, skipped=True)
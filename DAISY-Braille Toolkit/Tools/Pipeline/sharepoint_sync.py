@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Synkronisering af produktionsregister og tællere med SharePoint via Microsoft Graph.
+
+Listerne er dem fra Provisioning/seed-data: DBT_Productions (én række pr.
+volume label) og DBT_Counters (næste løbenummer pr. dato).
+
+Push: nye eller ændrede rækker sendes som $batch-kald á 20 underkald, så
+tusind rækker koster omkring 50 requests i stedet for tusind. Tællere
+opdateres med If-Match, så en anden arbejdsstations reservation aldrig
+overskrives (konflikten løses ved næste pull).
+
+Pull: items/delta på begge lister; efter første gennemløb hentes kun
+ændringer siden sidste deltaLink. Tællere fra andre arbejdsstationer løfter
+den lokale tæller (production_counter), og labels lavet andre steder
+registreres, så de kan slås op lokalt. Det holder tællerne tæt på hinanden,
+men kun en fælles tællerdatabase (COUNTER_SHARED) garanterer unikke labels,
+når to arbejdsstationer reserverer mellem to synkroniseringer.
+
+Adgang: SHAREPOINT_ACCESS_TOKEN (eller miljøvariablen GRAPH_ACCESS_TOKEN), eller
+app-login med SHAREPOINT_TENANT_ID/SHAREPOINT_CLIENT_ID/SHAREPOINT_CLIENT_SECRET
+(kræver pakken msal). Til test: graph_stub_server.py og GRAPH_BASE_URL.
+
+    python sharepoint_sync.py [sync|push|pull] [--settings settings.json]
+"""
+
+import argparse, datetime, hashlib, json, os, sys, time
+import urllib.error, urllib.parse, urllib.request
+from pathlib import Path
+
+import production_counter
+import production_registry
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+BATCH_MAX = 20                       # Graph's grænse pr. $batch
+MAX_RETRIES = 5
+PRODUCTIONS_LIST = "DBT_Productions"
+COUNTERS_LIST = "DBT_Counters"
+PRODUCTION_FIELDS = ("VolumeLabel", "Prefix", "DateKey", "Sequence", "Status", "ReservedAt")
+# ReservedBy er en Person-kolonne (kræver brugerens lookup-id på sitet) og sendes ikke
+
+_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sp_items (
+    list TEXT NOT NULL, key TEXT NOT NULL, item_id TEXT NOT NULL, etag TEXT NOT NULL DEFAULT '',
+    hash TEXT NOT NULL DEFAULT '', PRIMARY KEY (list, key)
+);
+CREATE TABLE IF NOT EXISTS sp_delta (list TEXT PRIMARY KEY, link TEXT NOT NULL);
+"""
+
+
+class GraphError(RuntimeError):
+    def __init__(self, message: str, status: int = 0):
+        super().__init__(message)
+        self.status = status
+
+
+class GraphClient:
+    """Tynd Graph-klient (kun standardbiblioteket) med $batch og retry ved 429/503."""
+
+    def __init__(self, base_url: str = GRAPH_URL, *, token=None, timeout: float = 60,
+                 max_retries: int = MAX_RETRIES):
+        self.base_url = base_url.rstrip("/")
+        self.token = token              # str eller callable -> str
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.requests = 0               # antal HTTP-kald (til statistik)
+
+    def _auth(self) -> str:
+        token = self.token() if callable(self.token) else self.token
+        return f"Bearer {token}" if token else ""
+
+    def request(self, method: str, path: str, body: dict | None = None, headers: dict | None = None) -> dict:
+        url = path if path.startswith("http") else self.base_url + path
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        for attempt in range(self.max_retries + 1):
+            req = urllib.request.Request(url, data=data, method=method)
+            req.add_header("Accept", "application/json")
+            if data is not None:
+                req.add_header("Content-Type", "application/json")
+            if self._auth():
+                req.add_header("Authorization", self._auth())
+            for k, v in (headers or {}).items():
+                req.add_header(k, v)
+            self.requests += 1
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                    raw = resp.read()
+                    return json.loads(raw) if raw else {}
+            except urllib.error.HTTPError as e:
+                detail = e.read().decode("utf-8", errors="replace")[:500]
+                if e.code in (429, 503) and attempt < self.max_retries:
+                    time.sleep(_retry_after(e.headers.get("Retry-After"), attempt))
+                    continue
+                raise GraphError(f"Graph {method} {path}: HTTP {e.code} {detail}", e.code) from None
+        raise GraphError(f"Graph {method} {path}: for mange forsøg")
+
+    def batch(self, calls: list[dict]) -> list[dict]:
+        """Kør calls ({method, url, body?, headers?}) som $batch á BATCH_MAX.
+
+        Returnerer svarene ({status, headers, body}) i samme rækkefølge. Underkald
+        der throttles (429/503), sendes igen efter Retry-After.
+        """
+        results: list[dict | None] = [None] * len(calls)
+        pending = list(range(len(calls)))
+        for attempt in range(self.max_retries + 1):
+            retry, wait = [], 0.0
+            for start in range(0, len(pending), BATCH_MAX):
+                chunk = pending[start:start + BATCH_MAX]
+                reqs = []
+                for i in chunk:
+                    c = calls[i]
+                    r = {"id": str(i), "method": c["method"], "url": c["url"]}
+                    headers = dict(c.get("headers") or {})
+                    if c.get("body") is not None:
+                        r["body"] = c["body"]
+                        headers.setdefault("Content-Type", "application/json")
+                    if headers:
+                        r["headers"] = headers
+                    reqs.append(r)
+                resp = self.request("POST", "/$batch", {"requests": reqs})
+                for r in resp.get("responses") or []:
+                    i = int(r["id"])
+                    if r.get("status") in (429, 503):
+                        retry.append(i)
+                        wait = max(wait, _retry_after((r.get("headers") or {}).get("Retry-After"), attempt))
+                    else:
+                        results[i] = r
+            if not retry:
+                break
+            if attempt == self.max_retries:
+                raise GraphError(f"{len(retry)} underkald blev ved med at blive throttlet")
+            time.sleep(wait)
+            pending = sorted(retry)
+        return results
+
+    def iter_delta(self, path: str, delta_link: str = ""):
+        """Alle ændrede items siden delta_link (tom = alt). Returnerer (items, nyt deltaLink)."""
+        url, items = delta_link or path, []
+        while True:
+            page = self.request("GET", url)
+            items += page.get("value") or []
+            if page.get("@odata.nextLink"):
+                url = page["@odata.nextLink"]
+                continue
+            return items, page.get("@odata.deltaLink") or ""
+
+
+def _retry_after(value, attempt: int) -> float:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return min(30.0, 0.5 * 2 ** attempt)
+
+
+def _hash(fields: dict) -> str:
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _local(iso_utc: str) -> datetime.datetime | None:
+    try:
+        return datetime.datetime.fromisoformat(iso_utc).astimezone().replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def _utc(iso_local: str) -> str:
+    try:
+        dt = datetime.datetime.fromisoformat(iso_local)
+    except ValueError:
+        return iso_local
+    return dt.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class SharePointSync:
+    def __init__(self, graph: GraphClient, registry: "production_registry.Registry",
+                 counters: "production_counter.CounterStore", *, site_url: str,
+                 productions_list: str = PRODUCTIONS_LIST, counters_list: str = COUNTERS_LIST):
+        self.graph = graph
+        self.registry = registry
+        self.counters = counters
+        self.site_url = site_url
+        self.list_names = {"productions": productions_list, "counters": counters_list}
+        self._site_id = ""
+        self._list_ids: dict[str, str] = {}
+        con = registry.connect()
+        con.executescript(_STATE_SCHEMA)
+
+    # ----- Site/lister -----
+    def site_id(self) -> str:
+        if not self._site_id:
+            u = urllib.parse.urlsplit(self.site_url)
+            path = u.path.rstrip("/") or "/"
+            self._site_id = self.graph.request("GET", f"/sites/{u.hostname}:{urllib.parse.quote(path)}:?$select=id")["id"]
+        return self._site_id
+
+    def list_path(self, which: str) -> str:
+        if not self._list_ids:
+            lists = self.graph.request("GET", f"/sites/{self.site_id()}/lists?$select=id,displayName")
+            by_name = {(l.get("displayName") or "").lower(): l["id"] for l in lists.get("value") or []}
+            for key, name in self.list_names.items():
+                if name.lower() not in by_name:
+                    raise GraphError(f"Listen '{name}' findes ikke på {self.site_url}")
+                self._list_ids[key] = by_name[name.lower()]
+        return f"/sites/{self.site_id()}/lists/{self._list_ids[which]}"
+
+    # ----- Tilstand -----
+    def _known(self, which: str) -> dict[str, tuple[str, str, str]]:
+        rows = self.registry.connect().execute("SELECT key, item_id, etag, hash FROM sp_items WHERE list = ?", (which,))
+        return {r[0]: (r[1], r[2], r[3]) for r in rows}
+
+    def _remember(self, which: str, entries: list[tuple[str, str, str, str]]):
+        con = self.registry.connect()
+        con.execute("BEGIN IMMEDIATE")
+        con.executemany("INSERT OR REPLACE INTO sp_items(list, key, item_id, etag, hash) VALUES(?, ?, ?, ?, ?)",
+                        [(which, *e) for e in entries])
+        con.execute("COMMIT")
+
+    def _delta_link(self, which: str) -> str:
+        row = self.registry.connect().execute("SELECT link FROM sp_delta WHERE list = ?", (which,)).fetchone()
+        return row[0] if row else ""
+
+    # ----- Push -----
+    def _push(self, which: str, rows: dict[str, dict], *, if_match: bool) -> dict:
+        known = self._known(which)
+        base = self.list_path(which)
+        keys, calls = [], []
+        for key, fields in rows.items():
+            h = _hash(fields)
+            item_id, etag, old = known.get(key, ("", "", ""))
+            if item_id and h == old:
+                continue
+            if item_id:
+                headers = {"If-Match": etag} if if_match and etag else {}
+                calls.append({"method": "PATCH", "url": f"{base}/items/{item_id}/fields", "body": fields,
+                              "headers": headers})
+            else:
+                calls.append({"method": "POST", "url": f"{base}/items", "body": {"fields": dict(fields, Title=key)}})
+            keys.append((key, h, item_id))
+        stats = {"sendt": len(calls), "fejl": 0, "konflikter": 0}
+        done = []
+        for (key, h, item_id), resp in zip(keys, self.graph.batch(calls)):
+            status, body = resp.get("status", 0), resp.get("body") or {}
+            if 200 <= status < 300:
+                done.append((key, body.get("id") or item_id, body.get("eTag") or body.get("@odata.etag") or "", h))
+            elif status == 412:
+                stats["konflikter"] += 1
+            else:
+                stats["fejl"] += 1
+                print(f"SharePoint {which} {key}: HTTP {status} {json.dumps(body)[:200]}")
+        self._remember(which, done)
+        return stats
+
+    def push(self) -> dict:
+        productions = {}
+        for r in self.registry.dbt_rows():
+            fields = {k: r[k] for k in PRODUCTION_FIELDS}
+            fields["Sequence"] = int(fields["Sequence"]) if fields["Sequence"].isdigit() else 0
+            fields["ReservedAt"] = _utc(fields["ReservedAt"])
+            productions[r["VolumeLabel"]] = fields
+        counters = {}
+        for key, next_no in self.counters.counters().items():
+            prefix, _, date_key = key.rpartition("_")
+            counters[key] = {"DateKey": date_key, "Prefix": prefix, "NextNumber": next_no}
+        return {"productions": self._push("productions", productions, if_match=False),
+                "counters": self._push("counters", counters, if_match=True)}
+
+    # ----- Pull -----
+    def pull(self) -> dict:
+        stats = {}
+        reverse_status = {v: k for k, v in production_registry.DBT_STATUS.items()}
+        for which in ("productions", "counters"):
+            path = f"{self.list_path(which)}/items/delta?$expand=fields"
+            try:
+                items, link = self.graph.iter_delta(path, self._delta_link(which))
+            except GraphError as e:
+                if e.status != 410:
+                    raise
+                items, link = self.graph.iter_delta(path)     # deltaLink udløbet: fuld resync
+            seen, new = [], 0
+            for item in items:
+                if "@removed" in item:
+                    continue
+                f = item.get("fields") or {}
+                etag = item.get("eTag") or item.get("@odata.etag") or ""
+                if which == "productions":
+                    label = f.get("VolumeLabel") or f.get("Title") or ""
+                    if not label:
+                        continue
+                    if self.registry.by_label(label) is None:
+                        self.registry.record(["Volume label", "Dato for Intale"], [label, f.get("DateKey") or ""],
+                                             status=reverse_status.get(f.get("Status"), f.get("Status") or ""),
+                                             csv_path="sharepoint", created=_local(f.get("ReservedAt")))
+                        new += 1
+                    key = label
+                else:
+                    key = f"{f.get('Prefix') or ''}_{f.get('DateKey') or ''}"
+                    if self.counters.advance(key, int(f.get("NextNumber") or 0)):
+                        new += 1
+                # hash af fjernrækken: er den lokale række ens, sendes den ikke igen ved push
+                remote = {k: f.get(k) for k in (PRODUCTION_FIELDS if which == "productions"
+                                                 else ("DateKey", "Prefix", "NextNumber"))}
+                for k in ("Sequence", "NextNumber"):     # talkolonner kan komme tilbage som 5.0
+                    if remote.get(k) is not None:
+                        remote[k] = int(float(remote[k]))
+                seen.append((key, item["id"], etag, _hash(remote)))
+            self._remember(which, seen)
+            if link:
+                con = self.registry.connect()
+                con.execute("INSERT OR REPLACE INTO sp_delta(list, link) VALUES(?, ?)", (which, link))
+            stats[which] = {"ændringer": len(items), "nye": new}
+        return stats
+
+    def sync(self) -> dict:
+        # pull først: item-id'er og fremmede tællere kendes, før der pushes
+        return {"pull": self.pull(), "push": self.push(), "requests": self.graph.requests}
+
+
+def token_from_settings(settings: dict):
+    token = (settings.get("SHAREPOINT_ACCESS_TOKEN") or os.environ.get("GRAPH_ACCESS_TOKEN") or "").strip()
+    if token:
+        return token
+    tenant = (settings.get("SHAREPOINT_TENANT_ID") or "").strip()
+    client_id = (settings.get("SHAREPOINT_CLIENT_ID") or "").strip()
+    secret = (settings.get("SHAREPOINT_CLIENT_SECRET") or "").strip()
+    if not (tenant and client_id and secret):
+        return None
+    try:
+        import msal  # optional
+    except Exception:
+        raise GraphError("App-login kræver pakken msal: pip install msal") from None
+    app = msal.ConfidentialClientApplication(client_id, authority=f"https://login.microsoftonline.com/{tenant}",
+                                             client_credential=secret)
+
+    def acquire() -> str:
+        result = app.acquire_token_for_client(scopes=["https://graph.microsoft.com/.default"])
+        if "access_token" not in result:
+            raise GraphError(f"Kunne ikke hente token: {result.get('error_description') or result.get('error')}")
+        return result["access_token"]
+    return acquire
+
+
+def from_settings(script_dir: Path, settings: dict) -> SharePointSync:
+    site_url = (settings.get("SHAREPOINT_SITE_URL") or "").strip()
+    if not site_url:
+        raise GraphError("SHAREPOINT_SITE_URL er ikke sat")
+    graph = GraphClient(settings.get("GRAPH_BASE_URL") or GRAPH_URL, token=token_from_settings(settings))
+    return SharePointSync(graph, production_registry.open_registry(script_dir, settings),
+                          production_counter.open_store(script_dir, settings), site_url=site_url,
+                          productions_list=settings.get("SHAREPOINT_PRODUCTIONS_LIST") or PRODUCTIONS_LIST,
+                          counters_list=settings.get("SHAREPOINT_COUNTERS_LIST") or COUNTERS_LIST)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("cmd", nargs="?", choices=("sync", "push", "pull"), default="sync")
+    ap.add_argument("--settings", type=Path, default=Path(__file__).resolve().parent / "settings.json")
+    args = ap.parse_args(argv)
+    settings = json.loads(args.settings.read_text(encoding="utf-8-sig")) if args.settings.exists() else {}
+    sp = from_settings(args.settings.resolve().parent, settings)
+    try:
+        result = getattr(sp, args.cmd)()
+    finally:
+        sp.registry.close()
+    print(json.dumps(result, ensure_ascii=False, indent=1))
+    print(f"{sp.graph.requests} Graph-requests")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
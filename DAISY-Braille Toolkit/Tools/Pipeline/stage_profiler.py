@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""--profile: hvor går tiden i en produktion? Væg-/CPU-tid og bytes pr. trin og pr. bog.
+
+Trinene er jobtrinene (Import, DtBook, Tts, DaisyBuild, PefBuild, IsoAndCsv) plus
+undertrinene Tts/api (ElevenLabs, inkl. netværk) og Tts/cache (TTS-cachen på disk).
+CPU-tiden er trådens egen (time.thread_time): Pipeline 2 kører i sin egen JVM og
+ISO-diskene i egne tråde, så deres CPU ses ikke her - kun deres vægtid.
+Bytes er output-filernes størrelse (og hentede bytes for Tts/api).
+
+Ved afslutning skrives ved siden af logfilerne:
+    logs/daisy_run_<tid>.profile.txt   tabel pr. bog og trin (+ evt. cProfile top 30)
+    logs/daisy_run_<tid>.folded        stakke til flamegraph.pl / speedscope
+                                       (samplet hvert PROFILE_SAMPLE_MS ms, bog;trin;funktioner)
+    logs/daisy_run_<tid>.prof          cProfile af de valgte trin (--profile-cprofile)
+--profile-tracemalloc tilføjer hukommelsestoppen under hvert trin (hele processen).
+"""
+
+import collections, contextlib, datetime, io, os, sys, threading, time
+from pathlib import Path
+
+DEFAULT_SAMPLE_MS = 10.0
+
+_active: "Profiler | None" = None
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+@contextlib.contextmanager
+def stage(book: str, name: str):
+    if _active is None:
+        yield
+        return
+    with _active.stage(book, name):
+        yield
+
+
+def add_bytes(n: int):
+    """Tæl bytes på trådens inderste trin."""
+    if _active is not None and n:
+        stack = _active._stacks.get(threading.get_ident())
+        if stack:
+            stack[-1]["bytes"] += int(n)
+
+
+def file_bytes(paths) -> int:
+    total = 0
+    for p in paths:
+        try:
+            total += Path(p).stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class Profiler:
+    def __init__(self, base: Path, *, cprofile_stages=(), tracemalloc: bool = False,
+                 sample_ms: float = DEFAULT_SAMPLE_MS):
+        self.base = Path(base)                 # logs/daisy_run_<tid> (uden endelse)
+        self.cprofile_stages = set(cprofile_stages)
+        self.tracemalloc = tracemalloc
+        self.sample_s = max(0.001, sample_ms / 1000.0) if sample_ms > 0 else 0.0   # 0 = ingen sampling
+        self._lock = threading.Lock()
+        self._stacks: dict[int, list[dict]] = {}
+        # (bog, trin) -> [antal, væg, cpu, bytes, maks. hukommelse]
+        self.totals: dict[tuple[str, str], list] = {}
+        self.folded: collections.Counter = collections.Counter()
+        self._profiles = []
+        self._cprofile_busy = threading.Lock()  # kun én cProfile ad gangen (én profiler pr. proces)
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="stage-profiler", daemon=True)
+
+    # --- trin ---
+    @contextlib.contextmanager
+    def stage(self, book: str, name: str):
+        tid = threading.get_ident()
+        stack = self._stacks.setdefault(tid, [])
+        rec = {"book": book, "name": name, "bytes": 0}
+        stack.append(rec)
+        prof = None
+        if name in self.cprofile_stages and self._cprofile_busy.acquire(blocking=False):
+            import cProfile
+            prof = cProfile.Profile()
+            prof.enable()
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        w0, c0 = time.perf_counter(), time.thread_time()
+        try:
+            yield rec
+        finally:
+            wall, cpu = time.perf_counter() - w0, time.thread_time() - c0
+            if prof is not None:
+                prof.disable()
+                self._cprofile_busy.release()
+            peak = 0
+            if self.tracemalloc:
+                import tracemalloc
+                peak = tracemalloc.get_traced_memory()[1]
+            stack.pop()
+            with self._lock:
+                if prof is not None:
+                    self._profiles.append(prof)
+                t = self.totals.setdefault((book, name), [0, 0.0, 0.0, 0, 0])
+                t[0] += 1
+                t[1] += wall
+                t[2] += cpu
+                t[3] += rec["bytes"]
+                t[4] = max(t[4], peak)
+
+    # --- sampling til flamegraph ---
+    def _sample(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.sample_s):
+            frames = sys._current_frames()
+            for tid, stack in list(self._stacks.items()):
+                # arbejdertråden kan poppe imellem: tag toppen i ét (atomart) slice
+                top = stack[-1:]
+                if tid == me or not top or tid not in frames:
+                    continue
+                top = top[0]
+                names = []
+                f = frames[tid]
+                while f is not None:
+                    code = f.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).stem}:{code.co_firstlineno})")
+                    f = f.f_back
+                key = ";".join([top["book"].replace(";", ","), top["name"]] + names[::-1])
+                self.folded[key] += 1
+
+    # --- start/stop ---
+    def start(self) -> "Profiler":
+        global _active
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+        self.t0, self.c0 = time.perf_counter(), time.process_time()
+        _active = self
+        if self.sample_s:
+            self._sampler.start()
+        return self
+
+    def stop(self, *, write: bool = True) -> list[Path]:
+        global _active
+        _active = None
+        self._stop.set()
+        if self._sampler.is_alive():
+            self._sampler.join()
+        self.wall, self.cpu = time.perf_counter() - self.t0, time.process_time() - self.c0
+        if self.tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+        if not write:
+            return []
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        written = []
+        txt = self.base.with_name(self.base.name + ".profile.txt")
+        txt.write_text(self.report(), encoding="utf-8")
+        written.append(txt)
+        if self.folded:
+            folded = self.base.with_name(self.base.name + ".folded")
+            folded.write_text("".join(f"{k} {v}\n" for k, v in sorted(self.folded.items())), encoding="utf-8")
+            written.append(folded)
+        if self._profiles:
+            prof = self.base.with_name(self.base.name + ".prof")
+            self._stats().dump_stats(str(prof))
+            written.append(prof)
+        return written
+
+    def _stats(self, stream=None):
+        import pstats
+        stats = pstats.Stats(self._profiles[0], stream=stream)
+        for p in self._profiles[1:]:
+            stats.add(p)
+        return stats
+
+    # --- rapport ---
+    def report(self) -> str:
+        mem = self.tracemalloc
+        head = f"{'Bog':28} {'Trin':14} {'Antal':>6} {'Væg s':>9} {'CPU s':>9} {'MB':>9}" + (f" {'Top MB':>8}" if mem else "")
+
+        def line(book, name, t):
+            s = f"{book[:28]:28} {name[:14]:14} {t[0]:6} {t[1]:9.3f} {t[2]:9.3f} {t[3] / 1e6:9.2f}"
+            return s + (f" {t[4] / 1e6:8.1f}" if mem else "")
+
+        out = [f"Profil {datetime.datetime.now().isoformat(timespec='seconds')}  (pid {os.getpid()})",
+               f"Kørsel: {self.wall:.3f} s væg, {self.cpu:.3f} s CPU (hele processen), "
+               f"{sum(self.folded.values())} samples à {self.sample_s * 1000:g} ms", "", head, "-" * len(head)]
+        books = sorted({b for b, _ in self.totals})
+        for book in books:
+            rows = sorted(((n, t) for (b, n), t in self.totals.items() if b == book), key=lambda r: -r[1][1])
+            out += [line(book, n, t) for n, t in rows]
+        out += ["", "I alt pr. trin:", head, "-" * len(head)]
+        per_stage: dict[str, list] = {}
+        for (_, name), t in self.totals.items():
+            agg = per_stage.setdefault(name, [0, 0.0, 0.0, 0, 0])
+            for i in range(4):
+                agg[i] += t[i]
+            agg[4] = max(agg[4], t[4])
+        for name, t in sorted(per_stage.items(), key=lambda r: -r[1][1]):
+            out.append(line("*", name, t))
+        if self._profiles:
+            buf = io.StringIO()
+            self._stats(buf).sort_stats("cumulative").print_stats(30)
+            out += ["", f"cProfile ({', '.join(sorted(self.cprofile_stages))}):", buf.getvalue()]
+        return "\n".join(out) + "\n"
+
+
+# --- CLI-hjælpere (fælles for scriptet og daisy_batch) ---
+def add_arguments(ap):
+    ap.add_argument("--profile", action="store_true",
+                    help="mål tid/CPU/bytes pr. trin og bog; rapport + flamegraph-stakke i logs/")
+    ap.add_argument("--profile-cprofile", default="", metavar="TRIN",
+                    help="kommaseparerede trin der også køres under cProfile (fx Tts,DaisyBuild)")
+    ap.add_argument("--profile-tracemalloc", action="store_true", help="mål hukommelsestoppen pr. trin")
+
+
+def start_from_args(args, script_dir: Path, settings: dict | None = None) -> "Profiler | None":
+    if not (args.profile or args.profile_cprofile or args.profile_tracemalloc):
+        return None
+    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    base = Path(script_dir) / "logs" / f"daisy_run_{ts}"
+    stages = [s.strip() for s in args.profile_cprofile.split(",") if s.strip()]
+    return Profiler(base, cprofile_stages=stages, tracemalloc=args.profile_tracemalloc,
+                    sample_ms=float((settings or {}).get("PROFILE_SAMPLE_MS") or DEFAULT_SAMPLE_MS)).start()
+
+
+def finish(profiler: "Profiler | None"):
+    if profiler is None:
+        return
+    for path in profiler.stop():
+        print(f"Profil: {path}")
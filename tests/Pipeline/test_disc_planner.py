@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""disc_planner.plan_volumes (tom bog, én disk, opdeling) og motorens håndtering af en bog uden tekst.
+
+    python -m pytest tests/Pipeline        (eller python -m unittest discover tests/Pipeline)
+"""
+
+import shutil, sys, tempfile, unittest
+from pathlib import Path
+
+PIPELINE = Path(__file__).resolve().parents[2] / "DAISY-Braille Toolkit" / "Tools" / "Pipeline"
+sys.path.insert(0, str(PIPELINE))
+
+import daisy_batch  # noqa: E402
+import disc_planner  # noqa: E402
+import elevenlabs_stub_server  # noqa: E402
+from daisy_pipeline import engine  # noqa: E402
+
+MB = 1 << 20
+
+
+class PlanVolumesTest(unittest.TestCase):
+    def test_empty_book_has_no_discs(self):
+        self.assertEqual(disc_planner.plan_volumes([], [], 1, disc_planner.capacity_sectors("cd")), [])
+
+    def test_small_book_fits_one_disc(self):
+        spans = disc_planner.plan_volumes([MB] * 10, ["Afsnit."] * 10, 2, disc_planner.capacity_sectors("cd"))
+        self.assertEqual(spans, [(1, 10)])
+
+    def test_large_book_is_split_evenly_at_smil_boundaries(self):
+        # 1000 afsnit á 1 MB på 700 MB-cd'er med 4 afsnit pr. SMIL
+        capacity = disc_planner.capacity_sectors("cd")
+        spans = disc_planner.plan_volumes([MB] * 1000, ["Afsnit."] * 1000, 4, capacity)
+        self.assertEqual(len(spans), 2)
+        self.assertEqual(spans[0][0], 1)
+        self.assertEqual(spans[-1][1], 1000)
+        for (_, last), (first, _) in zip(spans, spans[1:]):
+            self.assertEqual(first, last + 1)
+            self.assertEqual(last % 4, 0)
+        sizes = [last - first + 1 for first, last in spans]
+        self.assertLessEqual(max(sizes) - min(sizes), 4)
+
+    def test_segment_larger_than_medium_is_an_error(self):
+        with self.assertRaises(ValueError):
+            disc_planner.plan_volumes([800 * MB], ["Afsnit."], 1, disc_planner.capacity_sectors("cd"))
+
+
+class EmptyBookTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="disc_planner_test_"))
+        self.tts = elevenlabs_stub_server.serve_in_thread(0)
+
+    def tearDown(self):
+        engine.configure_elevenlabs({})
+        self.tts.shutdown()
+        self.tts.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_whitespace_only_book_fails_and_keeps_its_label(self):
+        book = self.tmp / "tom.txt"
+        book.write_text(" \n\n\t\n", encoding="utf-8")
+        settings = {"ELEVEN_API_BASE": self.tts.base_url, "ISO_CMD": "native",
+                    "CACHE_DIR": str(self.tmp / "tts_cache"), "JOB_ROOT": str(self.tmp / "jobs"),
+                    "COUNTER_DB_PATH": str(self.tmp / "counter.sqlite"),
+                    "REGISTRY_DB_PATH": str(self.tmp / "registry.sqlite")}
+        options = daisy_batch.engine_options(engine, self.tmp, settings, "x")
+        voice = elevenlabs_stub_server.VOICES[0]
+        with self.assertRaises(FileNotFoundError):
+            engine.process_one_file(book, voice_id=voice["voice_id"], voice_name=voice["name"], lang="da",
+                                    mode="daisy", metadata={}, out_dir=self.tmp / "out", **options)
+        self.assertEqual(list((self.tmp / "out").glob("*.iso")), [])
+        # jobbet beholder sit label til et resume
+        job = next((self.tmp / "jobs").glob("tom_*"))
+        self.assertEqual(len(engine.job_store.Job.load(job).volume_labels), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
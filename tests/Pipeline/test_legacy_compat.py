@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""De gamle scriptnavne (v10-v14) på daisy_pipeline: TTS-cachen fra før og logs/daisy_run_*.log.
+
+    python -m pytest tests/Pipeline        (eller python -m unittest discover tests/Pipeline)
+"""
+
+import os, shutil, subprocess, sys, tempfile, unittest
+from pathlib import Path
+
+PIPELINE = Path(__file__).resolve().parents[2] / "DAISY-Braille Toolkit" / "Tools" / "Pipeline"
+sys.path.insert(0, str(PIPELINE))
+
+import elevenlabs_stub_server  # noqa: E402
+from daisy_pipeline import engine  # noqa: E402
+
+VOICE, MODEL = "pNInz6obpgDQGcFmaJgB", "eleven_multilingual_v2"
+
+
+class LegacyCompatTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="legacy_compat_test_"))
+        self.tts = elevenlabs_stub_server.serve_in_thread(0)
+        engine.configure_elevenlabs({"ELEVEN_API_BASE": self.tts.base_url})
+
+    def tearDown(self):
+        engine.configure_elevenlabs({})
+        self.tts.shutdown()
+        self.tts.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_old_cache_key_is_reused_without_api_call(self):
+        cache = self.tmp / "tts_cache"
+        legacy = engine.legacy_tts_cache_path(cache, VOICE, MODEL, "Første afsnit.")
+        legacy.parent.mkdir(parents=True)
+        legacy.write_bytes(b"ID3 gammel cache")
+
+        out = self.tmp / "seg_0001.mp3"
+        fetched = engine.synthesise_segment(" Første afsnit.\n", out, api_key="x", voice_id=VOICE, model_id=MODEL,
+                                            cache_dir=cache)
+        self.assertEqual(fetched, 0)
+        self.assertEqual(self.tts.stats()["requests"], 0)
+        self.assertEqual(out.read_bytes(), b"ID3 gammel cache")
+        # flyttet over på den nye nøgle, den gamle fil bliver liggende
+        self.assertTrue(engine.tts_cache_path(cache, VOICE, MODEL, " Første afsnit.\n").exists())
+        self.assertTrue(legacy.exists())
+
+    def test_cache_miss_still_calls_api(self):
+        out = self.tmp / "seg_0001.mp3"
+        fetched = engine.synthesise_segment("Nyt afsnit.", out, api_key="x", voice_id=VOICE, model_id=MODEL,
+                                            cache_dir=self.tmp / "tts_cache")
+        self.assertGreater(fetched, 0)
+        self.assertEqual(self.tts.stats()["requests"], 1)
+
+    def test_cli_logfile(self):
+        code = ("import sys; from pathlib import Path; from daisy_pipeline import engine\n"
+                "engine.cli([], script_dir=Path(sys.argv[1]), logfile=True)")
+        proc = subprocess.run([sys.executable, "-c", code, str(self.tmp)], cwd=PIPELINE, stdin=subprocess.DEVNULL,
+                              env={**os.environ, "PYTHONPATH": str(PIPELINE)}, capture_output=True,
+                              text=True, encoding="utf-8", errors="replace", timeout=60)
+        self.assertNotEqual(proc.returncode, 0)        # ingen secrets.json og ingen konsol
+        logs = list((self.tmp / "logs").glob("daisy_run_*.log"))
+        self.assertEqual(len(logs), 1)
+        text = logs[0].read_text(encoding="utf-8")
+        self.assertIn("FEJL:", text)
+        self.assertIn("Traceback", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
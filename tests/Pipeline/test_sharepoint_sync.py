@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""sharepoint_sync mod den lokale Graph-stub (graph_stub_server): $batch, delta, If-Match og throttling.
+
+    python -m pytest tests/Pipeline        (eller python -m unittest discover tests/Pipeline)
+"""
+
+import shutil, sys, tempfile, unittest
+from pathlib import Path
+
+PIPELINE = Path(__file__).resolve().parents[2] / "DAISY-Braille Toolkit" / "Tools" / "Pipeline"
+sys.path.insert(0, str(PIPELINE))
+
+import graph_stub_server  # noqa: E402
+import production_counter  # noqa: E402
+import production_registry  # noqa: E402
+import sharepoint_sync  # noqa: E402
+
+SITE_URL = "https://stub.sharepoint.com/sites/dbt"
+KEY = "DBS_191026"
+
+
+class SharePointSyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix="sp_sync_test_"))
+        self.server = graph_stub_server.serve_in_thread(0)
+        self.registries = []
+
+    def tearDown(self):
+        for reg in self.registries:
+            reg.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def workstation(self, name: str, server=None) -> sharepoint_sync.SharePointSync:
+        reg = production_registry.Registry(self.tmp / name / "registry.sqlite")
+        self.registries.append(reg)
+        graph = sharepoint_sync.GraphClient((server or self.server).base_url, token="test")
+        return sharepoint_sync.SharePointSync(graph, reg, production_counter.CounterStore(self.tmp / name / "c.sqlite"),
+                                              site_url=SITE_URL)
+
+    @staticmethod
+    def produce(sp: sharepoint_sync.SharePointSync, count: int) -> list[str]:
+        """count bøger med hvert sit label (reserveret i tælleren og registreret)."""
+        first = sp.counters.reserve(KEY, count)
+        labels = [f"{KEY}_{no:03d}" for no in range(first, first + count)]
+        for label in labels:
+            sp.registry.record(["Titel", "Dato for Intale", "Volume label"], [f"Bog {label}", "191026", label])
+        return labels
+
+    def test_first_push_is_batched_and_resync_pushes_nothing(self):
+        sp = self.workstation("a")
+        self.produce(sp, 1000)
+        result = sp.sync()
+        self.assertEqual(result["push"]["productions"], {"sendt": 1000, "fejl": 0, "konflikter": 0})
+        self.assertEqual(result["push"]["counters"]["sendt"], 1)
+        # 1000 + 1 underkald á 20 = 51 $batch + site, lister og to tomme delta-kald
+        self.assertLessEqual(result["requests"], 56)
+        self.assertGreaterEqual(result["requests"], 51)
+
+        again = sp.sync()
+        self.assertEqual(again["push"]["productions"]["sendt"], 0)
+        self.assertEqual(again["push"]["counters"]["sendt"], 0)
+
+    def test_second_registry_pulls_labels_and_counter_via_delta(self):
+        a = self.workstation("a")
+        labels = self.produce(a, 250)
+        a.sync()
+
+        b = self.workstation("b")
+        pulled = b.sync()["pull"]
+        self.assertEqual(pulled["productions"]["nye"], 250)
+        self.assertIsNotNone(b.registry.by_label(labels[-1]))
+        self.assertEqual(b.counters.counters()[KEY], 250)
+        # næste label på b fortsætter efter a's
+        self.assertEqual(b.counters.reserve(KEY), 250)
+
+        # kun ændringer siden sidste deltaLink
+        self.produce(a, 3)
+        a.sync()
+        self.assertEqual(b.pull()["productions"], {"ændringer": 3, "nye": 3})
+
+    def test_stale_counter_etag_is_a_conflict(self):
+        a, b = self.workstation("a"), self.workstation("b")
+        self.produce(a, 5)
+        a.sync()
+        b.sync()
+        # a flytter tælleren i SharePoint; b's eTag er nu forældet
+        self.produce(a, 2)
+        a.sync()
+        self.produce(b, 1)
+        result = b.push()
+        self.assertEqual(result["counters"]["konflikter"], 1)
+        self.assertEqual(result["counters"]["fejl"], 0)
+
+    def test_throttled_sub_requests_are_retried(self):
+        server = graph_stub_server.serve_in_thread(0, throttle_every=7)
+        try:
+            sp = self.workstation("a", server)
+            self.produce(sp, 100)
+            result = sp.sync()
+            self.assertEqual(result["push"]["productions"], {"sendt": 100, "fejl": 0, "konflikter": 0})
+            items = next(l["items"] for l in server.graph.lists.values() if l["name"] == "DBT_Productions")
+            self.assertEqual(len(items), 100)
+            self.assertGreater(server.graph.batch_calls, 101)      # throttlede underkald er sendt igen
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()